@@ -0,0 +1,107 @@
+import LazyImport as LI
+
+np = LI.lazy_module('numpy')
+
+
+class AdaptiveScheduler:
+    """
+    Per-monitor polling policy based on a coarse frame signature.
+
+    The signature is a grid of tile means of the green channel (a cheap luma
+    proxy) taken from a strided sample of roughly 128 columns, so computing it
+    costs a few thousand pixel reads. While a frame's signature stays within
+    `tolerance` of the last *analysed* frame's, the previous result is reused
+    and the interval grows by `backoff` up to `max_interval`; any change drops
+    it back to `min_interval`. Comparing with the analysed frame rather than
+    the previous tick means a slow fade is re-analysed once it has drifted
+    past `tolerance` in total. Signatures and their difference are written
+    into two alternating buffers, so a steady-state tick allocates no arrays.
+    """
+    def __init__(self, min_interval=1, max_interval=30, backoff=1.5, tolerance=2.0, grid=(8, 8)):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.grid = grid
+        self.interval = min_interval
+        self.last_signature = None  # of the last analysed frame
+        self.last_result = None
+        self._spare = None  # the buffer the next signature is written into
+        self._difference = None
+        self.ticks = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a scheduler from a config mapping, or returns None when disabled."""
+        if not config.get('adaptive_polling', False):
+            return None
+        min_interval = config.get('min_interval', config.get('interval', 1))
+        return cls(
+            min_interval=min_interval,
+            max_interval=config.get('max_interval', 30),
+            backoff=config.get('polling_backoff', 1.5),
+            tolerance=config.get('change_tolerance', 2.0),
+        )
+
+    def update_config(self, config):
+        """Applies polling settings from a config mapping (e.g. after a reload) and starts over."""
+        self.min_interval = config.get('min_interval', config.get('interval', self.min_interval))
+        self.max_interval = max(config.get('max_interval', self.max_interval), self.min_interval)
+        self.backoff = config.get('polling_backoff', self.backoff)
+        self.tolerance = config.get('change_tolerance', self.tolerance)
+        self.reset()
+
+    def signature(self, frame, out=None):
+        """Returns the grid of tile means for a BGRA frame, written into `out` when it fits."""
+        rows, cols = self.grid
+        h, w = frame.shape[:2]
+        step = max(1, w // 128)
+        sample = frame[::step, ::step, 1]
+        th, tw = sample.shape[0] // rows, sample.shape[1] // cols
+        if th == 0 or tw == 0:
+            return sample.astype(np.float32)
+        if out is None or out.shape != (rows, cols):
+            out = np.empty((rows, cols), dtype=np.float32)
+        # Splitting the axes of the strided view never copies.
+        tiles = sample[:th * rows, :tw * cols].reshape(rows, th, cols, tw)
+        return tiles.mean(axis=(1, 3), dtype=np.float32, out=out)
+
+    def should_analyse(self, frame):
+        """Returns False when the frame matches the last analysed one and a result is cached."""
+        self.ticks += 1
+        reference = self.last_signature
+        signature = self.signature(frame, self._spare)
+        unchanged = reference is not None and reference.shape == signature.shape
+        if unchanged:
+            if self._difference is None or self._difference.shape != signature.shape:
+                self._difference = np.empty_like(signature)
+            np.subtract(signature, reference, out=self._difference)
+            np.abs(self._difference, out=self._difference)
+            unchanged = float(self._difference.max()) <= self.tolerance
+        if unchanged and self.last_result is not None:
+            self._spare = signature  # the reference stays until a frame is analysed
+            self.skipped += 1
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+            return False
+        self._spare, self.last_signature = reference, signature
+        self.interval = self.min_interval
+        return True
+
+    def reset(self):
+        """Forces the next frame to be analysed (e.g. after a settings change)."""
+        self.last_signature = None
+        self.last_result = None
+        self.interval = self.min_interval
+
+    def stats(self):
+        """Returns skip/analyse counters and the current polling interval."""
+        analysed = self.ticks - self.skipped
+        return {
+            'ticks': self.ticks,
+            'skipped': self.skipped,
+            'analysed': analysed,
+            'skip_rate': self.skipped / self.ticks if self.ticks else 0.0,
+            'analyse_rate': analysed / self.ticks if self.ticks else 0.0,
+            'interval': self.interval,
+        }
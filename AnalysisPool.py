@@ -0,0 +1,146 @@
+import concurrent.futures
+import multiprocessing
+import signal
+import threading
+import LazyImport as LI
+import LuminanceEngine as LE
+import TileMetering as TM
+
+np = LI.lazy_module('numpy')
+
+
+def _attach(name):
+    """Opens an existing shared memory block; the owning process keeps responsibility for unlinking it."""
+    from multiprocessing import shared_memory
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers every attachment, but spawned workers share the
+        # owner's resource tracker, where registering an existing name is a no-op.
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrameRing:
+    """
+    `slots` fixed-size frame buffers in one shared memory block.
+
+    The owning process copies frames in with put(); workers map the same
+    block and read the slot in place. A slot is only reused after the
+    analysis of the frame it holds has finished (see AnalysisPool.submit).
+    """
+    def __init__(self, slot_bytes, slots=2):
+        from multiprocessing import shared_memory
+        self.slot_bytes = slot_bytes
+        self.slots = slots
+        self.shm = shared_memory.SharedMemory(create=True, size=slot_bytes * slots)
+        self.name = self.shm.name
+        self.pending = [None] * slots  # future reading each slot
+        self._next = 0
+
+    def put(self, frame):
+        """Copies `frame` into the next free slot; returns (slot, shape, dtype name)."""
+        slot = self._next
+        self._next = (slot + 1) % self.slots
+        if self.pending[slot] is not None:
+            concurrent.futures.wait([self.pending[slot]])
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+        np.copyto(view, frame)
+        return slot, frame.shape, frame.dtype.str
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Per worker process: attached rings by name and analysers by settings.
+_worker_rings = {}
+_worker_analysers = {}
+
+
+def _analyse_slot(ring_name, slot_bytes, slot, shape, dtype, settings):
+    """Worker side: meters the frame in a ring slot without copying it out."""
+    shm = _worker_rings.get(ring_name)
+    if shm is None:
+        shm = _worker_rings[ring_name] = _attach(ring_name)
+    analyser = _worker_analysers.get(settings)
+    if analyser is None:
+        mode, step, sampling, accumulation, grid, metering, percentiles = settings
+        engine = LE.LuminanceEngine(mode, step, sampling, accumulation)
+        analyser = _worker_analysers[settings] = TM.TileAnalyser(engine, grid, metering, percentiles)
+    frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=slot * slot_bytes)
+    try:
+        # A worker meters one frame at a time, so one scratch key serves every monitor.
+        return analyser.analyse(frame, key=0)
+    finally:
+        del frame  # release the buffer export before the ring can be closed
+
+
+def _init_worker():
+    """Worker startup: leave Ctrl+C to the owning process, which shuts the pool down."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    np.empty(0)  # import numpy now rather than on the first frame
+
+
+class AnalysisPool:
+    """
+    Runs tile metering in worker processes, so analysis of several large
+    monitors is not serialised on the GIL.
+
+    Frames travel through one SharedFrameRing per monitor instead of being
+    pickled. Only the sampled grid is copied in (a strided sample is 1/step^2
+    of the frame); workers analyse it with an equivalent step-1 engine, so
+    results match in-thread metering exactly.
+    """
+    def __init__(self, workers, slots=2):
+        self.workers = workers
+        self.slots = slots
+        self._rings = {}
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker)
+
+    @staticmethod
+    def settings(tiles):
+        """Worker analyser settings equivalent to `tiles` on an already sampled frame."""
+        engine = tiles.engine
+        step = 1 if engine.sampling == 'stride' else engine.step
+        return (engine.mode, step, engine.sampling, engine.accumulation,
+                tiles.grid, tiles.metering, tiles.percentiles)
+
+    def _ring(self, monitor_id, nbytes):
+        ring = self._rings.get(monitor_id)
+        if ring is None or ring.slot_bytes < nbytes:
+            with self._lock:
+                old = self._rings.get(monitor_id)
+                if old is not None:
+                    concurrent.futures.wait([f for f in old.pending if f is not None])
+                    old.close()
+                ring = self._rings[monitor_id] = SharedFrameRing(nbytes, self.slots)
+        return ring
+
+    def submit(self, monitor_id, img, tiles):
+        """Queues metering of `img` with `tiles`' settings; returns a Future of analyse()'s dict."""
+        sample = tiles.engine.subsample(img)
+        ring = self._ring(monitor_id, sample.nbytes)
+        slot, shape, dtype = ring.put(sample)
+        future = self._executor.submit(_analyse_slot, ring.name, ring.slot_bytes, slot, shape, dtype,
+                                       self.settings(tiles))
+        ring.pending[slot] = future
+        return future
+
+    def analyse(self, monitor_id, img, tiles):
+        return self.submit(monitor_id, img, tiles).result()
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'rings': len(self._rings),
+            'shared_bytes': sum(ring.slot_bytes * ring.slots for ring in self._rings.values()),
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            for ring in self._rings.values():
+                ring.close()
+            self._rings.clear()
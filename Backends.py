@@ -0,0 +1,219 @@
+import ctypes
+import glob
+import os
+import re
+import subprocess
+import sys
+import threading
+import LazyImport as LI
+
+mss = LI.lazy_module('mss')
+np = LI.lazy_module('numpy')
+sbc = LI.lazy_module('screen_brightness_control')
+
+
+class CaptureBackend:
+    """
+    Source of screen pixels.
+
+    Regions and monitors are mss-style dicts (left, top, width, height);
+    monitors()[0] is the bounding box of all monitors, like sct.monitors.
+    """
+    def monitors(self):
+        raise NotImplementedError
+
+    def grab(self, region, sct=None):
+        """Returns the region as an (height, width, 4) uint8 BGRA array."""
+        raise NotImplementedError
+
+    def close(self):
+        """Releases resources held for the calling thread."""
+
+    def outputs(self):
+        """
+        Returns the connected monitors as they are now, in monitors() order,
+        each with its geometry and, where the platform exposes it, an 'edid'
+        (hex string) or 'pnp' (manufacturer + product code, e.g. 'DEL40F0').
+        """
+        return [dict(monitor) for monitor in self.monitors()[1:]]
+
+    def topology_fingerprint(self):
+        """A cheap value that changes when monitors are connected, removed or rearranged."""
+        return tuple(_geometry(output) for output in self.outputs())
+
+
+class BrightnessBackend:
+    """Hardware brightness get/set. Failures raise ValueError."""
+    def list_monitors(self):
+        """Returns display handles, in the order monitor indices refer to."""
+        raise NotImplementedError
+
+    def list_monitors_info(self):
+        """Returns a dict per display: its 'handle' and, where known, 'name', 'serial' and 'edid'."""
+        return [{'handle': handle, 'name': str(handle)} for handle in self.list_monitors()]
+
+    def get_brightness(self, display):
+        raise NotImplementedError
+
+    def set_brightness(self, value, display):
+        raise NotImplementedError
+
+
+class MssCaptureBackend(CaptureBackend):
+    """
+    Screen capture through mss, one session per thread (mss handles are not
+    shareable between threads). ScreenShot.raw is wrapped with np.frombuffer,
+    so the only pixel buffer per grab is the one mss fills.
+    """
+    def __init__(self):
+        self._local = threading.local()
+
+    def session(self):
+        """Returns this thread's mss session, opening it on first use."""
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+        return sct
+
+    def monitors(self):
+        return self.session().monitors
+
+    def grab(self, region, sct=None):
+        shot = (sct or self.session()).grab(region)
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def close(self):
+        sct = getattr(self._local, 'sct', None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+    def outputs(self):
+        # A fresh session: mss reads the monitor list once per session.
+        with mss.mss() as sct:
+            outputs = [dict(monitor) for monitor in sct.monitors[1:]]
+        identities = _win32_identities() if sys.platform == 'win32' else _xrandr_identities()
+        for output in outputs:
+            output.update(identities.get(_geometry(output), {}))
+        return outputs
+
+    def topology_fingerprint(self):
+        if sys.platform == 'win32':
+            return tuple(sorted(_win32_identities().items(), key=lambda item: item[0]))
+        connectors = _drm_connectors()
+        if connectors:
+            return connectors
+        return super().topology_fingerprint()
+
+
+def _geometry(monitor):
+    return (monitor['left'], monitor['top'], monitor['width'], monitor['height'])
+
+
+_XRANDR_OUTPUT = re.compile(r'^(\S+) connected(?: primary)? (\d+)x(\d+)\+(-?\d+)\+(-?\d+)')
+
+
+def _xrandr_identities():
+    """{(left, top, width, height): {'edid': hex}} of X11 outputs, from `xrandr --verbose`."""
+    try:
+        text = subprocess.run(['xrandr', '--verbose'], capture_output=True, text=True, timeout=5).stdout
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    identities = {}
+    geometry = edid = None
+    for line in text.splitlines() + ['']:
+        stripped = line.strip()
+        if edid is not None:
+            # EDID lines are indented hex; anything else ends the block.
+            if line[:1].isspace() and re.fullmatch(r'[0-9a-fA-F]+', stripped):
+                edid.append(stripped)
+                continue
+            if geometry and edid:
+                identities[geometry] = {'edid': ''.join(edid).lower()}
+            edid = None
+        if not line[:1].isspace():
+            match = _XRANDR_OUTPUT.match(line)
+            if match:
+                width, height, left, top = (int(group) for group in match.groups()[1:])
+                geometry = (left, top, width, height)
+            else:
+                geometry = None
+        elif stripped == 'EDID:':
+            edid = []
+    return identities
+
+
+def _drm_connectors():
+    """(connector, enabled) of every DRM connector; reads cached kernel state, no display I/O."""
+    connectors = []
+    for path in sorted(glob.glob('/sys/class/drm/card*-*/enabled')):
+        try:
+            with open(path) as f:
+                connectors.append((os.path.basename(os.path.dirname(path)), f.read().strip()))
+        except OSError:
+            continue
+    return tuple(connectors)
+
+
+def _win32_identities():
+    """{(left, top, width, height): {'pnp': 'DEL40F0'}} of attached monitors, from the Win32 display APIs."""
+    from ctypes import wintypes
+
+    class MonitorInfoEx(ctypes.Structure):
+        _fields_ = [('cbSize', wintypes.DWORD), ('rcMonitor', wintypes.RECT), ('rcWork', wintypes.RECT),
+                    ('dwFlags', wintypes.DWORD), ('szDevice', wintypes.WCHAR * 32)]
+
+    class DisplayDevice(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('DeviceName', wintypes.WCHAR * 32),
+                    ('DeviceString', wintypes.WCHAR * 128), ('StateFlags', wintypes.DWORD),
+                    ('DeviceID', wintypes.WCHAR * 128), ('DeviceKey', wintypes.WCHAR * 128)]
+
+    user32 = ctypes.windll.user32
+    identities = {}
+
+    def on_monitor(hmonitor, hdc, rect, data):
+        info = MonitorInfoEx()
+        info.cbSize = ctypes.sizeof(info)
+        if user32.GetMonitorInfoW(hmonitor, ctypes.byref(info)):
+            r = info.rcMonitor
+            geometry = (r.left, r.top, r.right - r.left, r.bottom - r.top)
+            device = DisplayDevice()
+            device.cb = ctypes.sizeof(device)
+            identities[geometry] = {}
+            # DeviceID looks like MONITOR\DEL40F0\{4d36e96e-...}\0001
+            if user32.EnumDisplayDevicesW(info.szDevice, 0, ctypes.byref(device), 0):
+                parts = device.DeviceID.split('\\')
+                if len(parts) > 1:
+                    identities[geometry] = {'pnp': parts[1].upper()}
+        return True
+
+    callback = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HMONITOR, wintypes.HDC,
+                                  ctypes.POINTER(wintypes.RECT), wintypes.LPARAM)(on_monitor)
+    user32.EnumDisplayMonitors(None, None, callback, 0)
+    return identities
+
+
+class SbcBrightnessBackend(BrightnessBackend):
+    """Brightness control through screen_brightness_control (DDC/CI, WMI, ...)."""
+    def list_monitors(self):
+        return sbc.list_monitors()
+
+    def list_monitors_info(self):
+        displays = []
+        for info in sbc.list_monitors_info():
+            # sbc accepts an EDID or serial as `display`, which names the same
+            # panel whatever order the displays are listed in.
+            displays.append({
+                'handle': info.get('edid') or info.get('serial') or info.get('name'),
+                'name': info.get('name'),
+                'serial': info.get('serial'),
+                'edid': info.get('edid'),
+            })
+        return displays
+
+    def get_brightness(self, display):
+        return sbc.get_brightness(display=display)[0]
+
+    def set_brightness(self, value, display):
+        sbc.set_brightness(value, display=display)
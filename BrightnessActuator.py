@@ -0,0 +1,184 @@
+import threading
+import time
+
+
+class _DisplaySlot:
+    """Pending target and worker state for one display."""
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.pending = None      # (value, fade) waiting to be applied
+        self.position = None     # last brightness known to be on the display
+        self.busy = False        # a target is being applied
+        self.last_write = None   # time.monotonic() of the last write attempt
+        self.thread = None
+
+
+class BrightnessActuator:
+    """
+    Applies brightness targets off the sampling threads.
+
+    Each display gets its own worker and a one-entry mailbox: submitting a new
+    target replaces any target that has not started yet, and a fade already in
+    progress notices the new target between steps and retargets from where it
+    is. Callers never wait on hardware I/O.
+
+    With `min_spacing` a new target is held until that many seconds after the
+    display's previous write, and targets submitted meanwhile replace it, so
+    a burst (e.g. dragging the manual slider) becomes a few writes of the
+    latest values. Replaced targets are counted as `coalesced` (skipped writes).
+    """
+    def __init__(self, write_fn, on_written=None, fade_step=1, fade_interval=0.01, retries=3, min_spacing=0.0):
+        self.write_fn = write_fn      # write_fn(monitor_id, value), raises ValueError on failure
+        self.on_written = on_written  # on_written(monitor_id, value) after each successful write
+        self.fade_step = fade_step
+        self.fade_interval = fade_interval
+        self.retries = retries
+        self.min_spacing = min_spacing
+        # Counters are shared by every display's worker and submitter; all are updated under _lock.
+        self.submitted = 0
+        self.coalesced = 0
+        self.retargeted = 0
+        self.failures = 0
+        self.writes = 0
+        self.write_time = 0.0
+        self.max_write_latency = 0.0
+        self.last_write_latency = 0.0
+        self._slots = {}
+        self._lock = threading.Lock()
+        self._running = True
+
+    def _slot(self, monitor_id):
+        with self._lock:
+            slot = self._slots.get(monitor_id)
+            if slot is None:
+                slot = _DisplaySlot()
+                slot.thread = threading.Thread(target=self._worker, args=(monitor_id, slot), daemon=True)
+                self._slots[monitor_id] = slot
+                slot.thread.start()
+            return slot
+
+    def submit(self, monitor_id, value, current=None, fade=True):
+        """Queues `value` for a display, replacing any target not yet applied."""
+        slot = self._slot(monitor_id)
+        with slot.cond:
+            with self._lock:
+                self.submitted += 1
+                if slot.pending is not None:
+                    self.coalesced += 1
+            if slot.position is None and current is not None:
+                slot.position = int(current)
+            slot.pending = (int(value), fade)
+            slot.cond.notify()
+
+    def _worker(self, monitor_id, slot):
+        while True:
+            with slot.cond:
+                while slot.pending is None and self._running:
+                    slot.cond.wait()
+                if self.min_spacing and slot.last_write is not None:
+                    # Hold the target until the spacing has passed; newer submissions replace it.
+                    remaining = slot.last_write + self.min_spacing - time.monotonic()
+                    while remaining > 0 and self._running:
+                        slot.cond.wait(remaining)
+                        remaining = slot.last_write + self.min_spacing - time.monotonic()
+                if not self._running:
+                    return
+                target, fade = slot.pending
+                slot.pending = None
+                slot.busy = True
+                start = slot.position
+            try:
+                self._apply(monitor_id, slot, target, fade, start)
+            finally:
+                slot.busy = False
+
+    def _apply(self, monitor_id, slot, target, fade, start):
+        """Moves one display to `target`, fading from `start` when it is known."""
+        if not fade or start is None or start == target:
+            self._write(monitor_id, slot, target)
+            return
+        step = self.fade_step if target > start else -self.fade_step
+        for value in list(range(start + step, target, step)) + [target]:
+            if slot.pending is not None or not self._running:
+                # A newer target arrived; pick it up from the current position.
+                with self._lock:
+                    self.retargeted += 1
+                return
+            if not self._write(monitor_id, slot, value):
+                return
+            if self.fade_interval:
+                time.sleep(self.fade_interval)
+
+    def _write(self, monitor_id, slot, value):
+        """Writes one value with retries; returns True on success."""
+        error = None
+        for attempt in range(self.retries):
+            start = time.perf_counter()
+            slot.last_write = time.monotonic()
+            try:
+                self.write_fn(monitor_id, value)
+            except ValueError as e:
+                error = e
+                if attempt + 1 < self.retries:
+                    print(f"Failed to set brightness to {value} on monitor {monitor_id}. Retrying...")
+                continue
+            latency = time.perf_counter() - start
+            with self._lock:
+                self.writes += 1
+                self.write_time += latency
+                self.last_write_latency = latency
+                self.max_write_latency = max(self.max_write_latency, latency)
+            slot.position = value
+            if self.on_written:
+                self.on_written(monitor_id, value)
+            return True
+        print(error or f"Failed to set brightness to {value} on monitor {monitor_id}.")
+        with self._lock:
+            self.failures += 1
+        return False
+
+    def wait_idle(self, timeout=None):
+        """Blocks until every display has applied its targets; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                slots = list(self._slots.values())
+            if all(slot.pending is None and not slot.busy for slot in slots):
+                return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.001)
+
+    def queue_depth(self):
+        """Returns the number of targets waiting per display (0 or 1)."""
+        with self._lock:
+            slots = dict(self._slots)
+        return {monitor_id: int(slot.pending is not None) for monitor_id, slot in slots.items()}
+
+    def stats(self):
+        """Returns queue depth, coalescing counters and write latency (seconds)."""
+        with self._lock:
+            writes, write_time = self.writes, self.write_time
+            result = {
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'retargeted': self.retargeted,
+                'failures': self.failures,
+                'writes': writes,
+                'avg_write_latency': write_time / writes if writes else 0.0,
+                'last_write_latency': self.last_write_latency,
+                'max_write_latency': self.max_write_latency,
+            }
+        result['queue_depth'] = self.queue_depth()
+        return result
+
+    def stop(self):
+        """Stops all display workers; pending targets are dropped."""
+        self._running = False
+        with self._lock:
+            slots = list(self._slots.values())
+        for slot in slots:
+            with slot.cond:
+                slot.cond.notify()
+        for slot in slots:
+            slot.thread.join(timeout=1)
@@ -25,11 +25,28 @@ Date: [Date]
 import tkinter as tk
 from tkinter import ttk
 import argparse
+import collections
+import json
 from tkinter import messagebox
-import mss
+import os
+import sys
+import time
+import AdaptiveScheduler as ASCH
 import BrightnessController as BNC
 import ConfigLoader as CFL
+import ConfigSnapshot as CS
+import ControlAPI as CAPI
+import MemoryGuard as MG
+import Metrics as MX
 import MonitorThread as MT
+import MultiplexThread as MXT
+
+STATUS_FLUSH_MS = 200  # how often queued worker status updates are applied
+STARTUP_TIMEOUT_S = 30  # --startup-timing gives up on the first adjustment after this
+
+# Launch timestamp for --startup-timing; benchmarks/bench_startup.py passes the
+# moment it spawned the process so interpreter start-up is included.
+STARTUP_T0 = float(os.environ.get('AUTOBRIGHT_STARTUP_T0', time.time()))
 
 # ----------------- Helper Classes -----------------
 
@@ -43,41 +60,92 @@ class ConfigInputFrame(ttk.Frame):
     - Brightness threshold
     - Whether to use only the center region of the screen
     - Which monitors to control
+
+    Values are published to the ConfigPublisher only when an entry is
+    committed (Return or focus-out) or the checkbox is toggled, so worker
+    threads never read Tk variables themselves.
     """
-    def __init__(self, parent):
+    def __init__(self, parent, publisher=None):
         super().__init__(parent)
+        self.publisher = publisher
         # Interval
         ttk.Label(self, text='Interval (seconds)').grid(row=0, column=0, sticky='w')
         self.interval_var = tk.IntVar(value=5)
-        ttk.Entry(self, textvariable=self.interval_var, width=10).grid(row=0, column=1)
+        self._commit_on_edit(ttk.Entry(self, textvariable=self.interval_var, width=10)).grid(row=0, column=1)
 
         # Min brightness
         ttk.Label(self, text='Min Brightness (0-100)').grid(row=1, column=0, sticky='w')
         self.min_brightness_var = tk.IntVar(value=10)
-        ttk.Entry(self, textvariable=self.min_brightness_var, width=10).grid(row=1, column=1)
+        self._commit_on_edit(ttk.Entry(self, textvariable=self.min_brightness_var, width=10)).grid(row=1, column=1)
 
         # Max brightness
         ttk.Label(self, text='Max Brightness (0-100)').grid(row=2, column=0, sticky='w')
         self.max_brightness_var = tk.IntVar(value=90)
-        ttk.Entry(self, textvariable=self.max_brightness_var, width=10).grid(row=2, column=1)
+        self._commit_on_edit(ttk.Entry(self, textvariable=self.max_brightness_var, width=10)).grid(row=2, column=1)
 
         # Threshold
         ttk.Label(self, text='Threshold').grid(row=3, column=0, sticky='w')
         self.threshold_var = tk.IntVar(value=8)
-        ttk.Entry(self, textvariable=self.threshold_var, width=10).grid(row=3, column=1)
+        self._commit_on_edit(ttk.Entry(self, textvariable=self.threshold_var, width=10)).grid(row=3, column=1)
 
         # Use center region
         self.use_center_var = tk.BooleanVar(value=True)
-        ttk.Checkbutton(self, text='Use center region', variable=self.use_center_var).grid(row=4, columnspan=2, sticky='w')
+        ttk.Checkbutton(self, text='Use center region', variable=self.use_center_var,
+                        command=self.commit).grid(row=4, columnspan=2, sticky='w')
 
         # Monitor indices
         ttk.Label(self, text='Monitors (comma-separated)').grid(row=5, column=0, sticky='w')
         self.monitors_var = tk.StringVar(value='0,2')
-        ttk.Entry(self, textvariable=self.monitors_var, width=10).grid(row=5, column=1)
+        self._commit_on_edit(ttk.Entry(self, textvariable=self.monitors_var, width=10)).grid(row=5, column=1)
 
         # Pack/present all in the frame
         self.pack(pady=10, padx=10, anchor='w')
 
+    def _commit_on_edit(self, entry):
+        """Publishes the config when the entry is confirmed or loses focus."""
+        entry.bind('<Return>', self.commit)
+        entry.bind('<FocusOut>', self.commit)
+        return entry
+
+    def commit(self, event=None):
+        """
+        Validates the inputs and publishes them as a new config snapshot.
+        Must run on the Tk main loop. Returns the snapshot, or None if an
+        entry does not hold a valid number or the values fail validate_config
+        (e.g. interval 0, min above max); the last valid snapshot stays live.
+        """
+        if self.publisher is None:
+            return None
+        try:
+            config = self.get_config()
+        except tk.TclError:
+            return None
+        current = self.publisher.current
+        merged = {key: list(value) if isinstance(value, tuple) else value for key, value in current.items()}
+        errors = CFL.validate_config({**merged, **config})
+        if errors:
+            print(f"Settings not applied: {'; '.join(errors)}")
+            return None
+        return self.publisher.publish(config)
+
+    def load(self, config):
+        """
+        Shows the values of a config mapping in the entries without publishing
+        them. Must run on the Tk main loop.
+        """
+        if 'interval' in config:
+            self.interval_var.set(config['interval'])
+        if 'min_brightness' in config:
+            self.min_brightness_var.set(config['min_brightness'])
+        if 'max_brightness' in config:
+            self.max_brightness_var.set(config['max_brightness'])
+        if 'threshold' in config:
+            self.threshold_var.set(config['threshold'])
+        if 'use_center' in config:
+            self.use_center_var.set(config['use_center'])
+        if 'monitors' in config:
+            self.monitors_var.set(','.join(str(mid) for mid in config['monitors']))
+
     def get_config(self):
         """
         Returns the current configuration as a dictionary.
@@ -93,6 +161,47 @@ class ConfigInputFrame(ttk.Frame):
             'monitors': monitors
         }
 
+class DiagnosticsWindow(tk.Toplevel):
+    """
+    Optional window showing per-monitor stage latencies and counters
+    from the controller's MetricsRegistry, refreshed once a second.
+    """
+    REFRESH_MS = 1000
+
+    def __init__(self, parent, metrics):
+        super().__init__(parent)
+        self.title("Diagnostics")
+        self.geometry("560x320")
+        self.metrics = metrics
+        self.text = tk.Text(self, font=('TkFixedFont', 9), state='disabled')
+        self.text.pack(fill='both', expand=True)
+        self.refresh()
+
+    def format_snapshot(self, snapshot):
+        """
+        Render a metrics snapshot as plain-text lines.
+        """
+        lines = [f"uptime {snapshot['uptime']:.0f}s"]
+        for monitor_id, entry in sorted(snapshot['monitors'].items()):
+            lines.append(f"\nMonitor {monitor_id}")
+            for stage, h in sorted(entry['stages'].items()):
+                lines.append(f"  {stage:<17} n={h['count']:<7} p50={h['p50'] * 1000:7.2f}ms "
+                             f"p95={h['p95'] * 1000:7.2f}ms max={h['max'] * 1000:7.2f}ms")
+            if entry['counters']:
+                counters = ', '.join(f"{name}={value}" for name, value in sorted(entry['counters'].items()))
+                lines.append(f"  {counters}")
+        return '\n'.join(lines)
+
+    def refresh(self):
+        """
+        Redraw the metrics and schedule the next refresh.
+        """
+        self.text.config(state='normal')
+        self.text.delete('1.0', 'end')
+        self.text.insert('end', self.format_snapshot(self.metrics.snapshot()))
+        self.text.config(state='disabled')
+        self.after(self.REFRESH_MS, self.refresh)
+
 # ----------------- Main Application -----------------
 
 class BrightnessApp(tk.Tk):
@@ -105,8 +214,10 @@ class BrightnessApp(tk.Tk):
         is_running: Whether auto mode is active.
         monitor_threads: List of running MonitorThread objects.
         status_labels: Dict of status labels per monitor.
+        config_publisher: ConfigPublisher the worker threads read settings from.
+        startup_timings: Startup milestones (seconds since launch) when timing, else None.
     """
-    def __init__(self, controller, config):
+    def __init__(self, controller, config, startup_timing=False):
         """
         Initialize the GUI, widgets, and state.
         """
@@ -118,10 +229,19 @@ class BrightnessApp(tk.Tk):
         self.is_running = False
         self.monitor_threads = []
         self.status_labels = {}
+        self.config_publisher = CS.ConfigPublisher(config.config)
+        self._status_queue = collections.deque()
+        self._reload_pending = False  # set when the entries must show a new snapshot, handled on the Tk thread
+        self._reloaded = collections.deque()  # config file changes from the watcher, published on the Tk thread
+        self._manual_value = None  # last slider value sent; None until the slider is used
+        self._manual_skipped_base = 0
+        self.startup_timings = {} if startup_timing else None
 
         # --- GUI Layout ---
         # Configuration input
-        self.config_frame = ConfigInputFrame(self)
+        self.config_frame = ConfigInputFrame(self, self.config_publisher)
+        self.config_frame.load(self.config_publisher.current)
+        self.config_frame.commit()
         self.config_frame.pack(pady=10, padx=10, fill='x')
 
         # Status area for per-monitor feedback
@@ -139,10 +259,94 @@ class BrightnessApp(tk.Tk):
         self.start_btn.pack(side='left', padx=10, pady=15)
         self.stop_btn = ttk.Button(self, text="Stop Auto", command=self.stop, state='disabled')
         self.stop_btn.pack(side='left', padx=10, pady=15)
+        self.diagnostics_btn = ttk.Button(self, text="Diagnostics", command=self.show_diagnostics)
+        self.diagnostics_btn.pack(side='left', padx=10, pady=15)
+        self.diagnostics_window = None
+
+        # Metrics endpoint / JSON dump, if enabled in config
+        self.metrics_exporters = MX.start_exporters(controller.metrics, config)
+        # Warn in the status area when memory stays over memory_budget_mb
+        controller.memory.on_exceeded = lambda rss: self.post_status(
+            'memory', f"Memory: {rss / MG.MB:.0f} MB, over the {controller.memory.budget_mb} MB budget")
+        # Reload the config files when they change, without restarting monitor threads
+        self.config_watcher = CFL.start_watcher(config, self.on_config_reloaded)
+        # Local control API for scripts; it publishes snapshots and never touches Tk itself
+        self.control_server = CAPI.start_server(controller, self.config_publisher, config,
+                                                on_config=self.on_control_config, start_keys=CFL.START_KEYS)
 
         # Handle window close
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+        # Apply status updates posted by worker threads in batches
+        self.after(STATUS_FLUSH_MS, self._flush_status)
+        if startup_timing:
+            self.after(0, self._on_window_shown)
+
+    def _on_window_shown(self):
+        """
+        Record time-to-window, then start auto mode to time the first adjustment.
+        """
+        self.update_idletasks()
+        self.startup_timings['time_to_window'] = time.time() - STARTUP_T0
+        self.start()
+
+    def post_status(self, monitor_id, message):
+        """
+        Queue a status update from any thread; applied by _flush_status.
+        """
+        if self.startup_timings is not None and message.endswith('(auto)'):
+            self.startup_timings.setdefault('time_to_first_adjustment', time.time() - STARTUP_T0)
+        self._status_queue.append((monitor_id, message))
+
+    def on_config_reloaded(self, changed):
+        """
+        Queue keys changed in the config files (called on the watcher thread).
+        _flush_status publishes them on the Tk main loop and refreshes the
+        entries; worker threads see the new snapshot on their next tick.
+        """
+        self._reloaded.append(changed)
+
+    def on_control_config(self, changed):
+        """
+        Show config changed through the control API in the entries (called
+        on a control connection thread; the API has already published it).
+        """
+        self._reload_pending = True
+
+    def _flush_status(self):
+        """
+        Apply queued status updates on the Tk main loop, latest per monitor,
+        and show reloaded config values in the entries.
+        """
+        while self._reloaded:
+            self.config_publisher.publish(self._reloaded.popleft())
+            self._reload_pending = True
+        if self._reload_pending:
+            self._reload_pending = False
+            self.config_frame.load(self.config_publisher.current)
+        latest = {}
+        while self._status_queue:
+            monitor_id, message = self._status_queue.popleft()
+            latest[monitor_id] = message
+        for monitor_id, message in latest.items():
+            self.update_status(monitor_id, message)
+        if self.startup_timings is not None and self._startup_timing_done():
+            return
+        self.after(STATUS_FLUSH_MS, self._flush_status)
+
+    def _startup_timing_done(self):
+        """
+        Print the startup timings as JSON and close once complete (or timed out).
+        """
+        timings = self.startup_timings
+        timed_out = time.time() - STARTUP_T0 > STARTUP_TIMEOUT_S
+        if 'time_to_first_adjustment' not in timings and not timed_out:
+            return False
+        timings.setdefault('time_to_first_adjustment', None)
+        print(json.dumps(timings), flush=True)
+        self.on_closing()
+        return True
+
     def update_status(self, monitor_id, message):
         """
         Update the status label for a specific monitor.
@@ -156,20 +360,35 @@ class BrightnessApp(tk.Tk):
 
     def manual_brightness(self, value):
         """
-        Set brightness manually for all selected monitors.
-        Only works when auto mode is not running.
+        Set brightness manually for all selected monitors (slider callback).
+        Only works when auto mode is not running. Returns at once: the
+        actuator writes the latest value per display off the Tk thread, at
+        most once per min_write_spacing, and the status shows how many
+        display writes were skipped (one skipped value counts once per display).
         """
-        if not self.is_running:
-            for mid in self.controller.monitor_list:
-                self.controller.adjust_brightness_direct(int(float(value)), monitor_id=mid)
-            # You may update a general info label here if you wish
+        if self.is_running:
+            return
+        value = int(float(value))
+        if value == self._manual_value:
+            return  # the drag moved less than one brightness unit
+        self.controller.update_user_config(self.config_publisher.current)
+        if self._manual_value is None:
+            self._manual_skipped_base = self.controller.actuator.coalesced
+        self._manual_value = value
+        self.controller.set_manual_brightness(value, self.controller.monitor_list)
+        skipped = self.controller.actuator.coalesced - self._manual_skipped_base
+        displays = len(self.controller.monitor_list)
+        self.update_status('manual', f"Manual: {value} ({skipped} display writes skipped "
+                                     f"across {displays} display{'s' if displays != 1 else ''})")
 
     def start(self):
         """
-        Start automatic brightness adjustment threads for each monitor.
+        Start automatic brightness adjustment threads for each monitor
+        (or a single multiplexed capture thread when capture_mode is 'multiplexed').
         """
         self.is_running = True
-        new_config = self.config_frame.get_config()
+        self._manual_value = None
+        new_config = self.config_frame.commit() or self.config_publisher.current
         self.controller.update_user_config(new_config)
         self.start_btn.config(state='disabled')
         self.stop_btn.config(state='normal')
@@ -183,25 +402,49 @@ class BrightnessApp(tk.Tk):
 
 
         invalid_indices = []
-        with mss.mss() as sct:
-            monitor_ids = self.controller.monitor_list
-            available = len(sct.monitors) - 1  # mss uses 1-based indexing
-            for mid in monitor_ids:
-                if mid < 0 or mid >= available:
-                   invalid_indices.append(mid)
-                   continue
-                try:
-                    monitor = sct.monitors[mid + 1]  # mss uses 1-based indexing
-                except IndexError:
-                    continue
+        selected = {}
+        capture_monitors = self.controller.capture.monitors()
+        self.controller.capture.close()  # the Tk thread only needed the monitor list
+        monitor_ids = self.controller.monitor_list
+        available = len(capture_monitors) - 1  # mss uses 1-based indexing
+        for mid in monitor_ids:
+            if mid < 0 or mid >= available:
+               invalid_indices.append(mid)
+               continue
+            try:
+                selected[mid] = capture_monitors[mid + 1]  # mss uses 1-based indexing
+            except IndexError:
+                continue
+
+        # Settings read only at start come from the snapshot, so control API and file changes apply too.
+        config = self.config_publisher.current
+        if config.get('capture_mode', 'threaded') == 'multiplexed' and selected:
+            # One capture of all selected monitors per tick, split into views
+            schedulers = {}
+            for mid in selected:
+                scheduler = ASCH.AdaptiveScheduler.from_config(config)
+                if scheduler:
+                    schedulers[mid] = scheduler
+            t = MXT.MultiplexThread(
+                self.controller,
+                selected,
+                self.config_publisher,
+                self.post_status,
+                schedulers=schedulers
+            )
+            t.start()
+            self.monitor_threads.append(t)
+        else:
+            for mid, monitor in selected.items():
                 t = MT.MonitorThread(
                     self.controller,
                     monitor,
                     mid,
-                    self.config_frame,
+                    self.config_publisher,
                     # new_config['use_center'],
                     # new_config['interval'],
-                    self.update_status
+                    self.post_status,
+                    scheduler=ASCH.AdaptiveScheduler.from_config(config)
                 )
                 t.start()
                 self.monitor_threads.append(t)
@@ -226,11 +469,27 @@ class BrightnessApp(tk.Tk):
         self.stop_btn.config(state='disabled')
         self.brightness_slider.config(state='normal')
 
+    def show_diagnostics(self):
+        """
+        Open (or raise) the diagnostics window.
+        """
+        if self.diagnostics_window is None or not self.diagnostics_window.winfo_exists():
+            self.diagnostics_window = DiagnosticsWindow(self, self.controller.metrics)
+        else:
+            self.diagnostics_window.lift()
+
     def on_closing(self):
         """
         Handle application close event.
         """
         self.stop()
+        if self.config_watcher:
+            self.config_watcher.stop()
+        if self.control_server:
+            self.control_server.stop()
+        for exporter in self.metrics_exporters:
+            exporter.stop()
+        self.controller.close()
         self.destroy()
 
 # ----------------- Main Entry Point -----------------
@@ -242,14 +501,21 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", help="Path to default config file")
     parser.add_argument("--user-config", help="Path to user config file")
+    parser.add_argument("--startup-timing", action="store_true",
+                        help="Start auto mode, print time-to-window and time-to-first-adjustment as JSON, then exit")
     args = parser.parse_args()
 
     config_loader = CFL.ConfigLoader(args.config, args.user_config)
+    if config_loader.errors:
+        sys.exit(f"Invalid settings: {'; '.join(config_loader.errors)}")
 
     controller = BNC.BrightnessController(
         min_brightness=config_loader.get('min_brightness', 0),
         max_brightness=config_loader.get('max_brightness', 100),
-        threshold=config_loader.get('threshold', 10)
+        threshold=config_loader.get('threshold', 10),
+        analysis_mode=config_loader.get('analysis_mode', 'balanced'),
+        refresh_interval=config_loader.get('brightness_refresh_interval', 30),
+        topology_cache=config_loader.get('topology_cache_path', '')
     )
-    app = BrightnessApp(controller, config_loader)
+    app = BrightnessApp(controller, config_loader, startup_timing=args.startup_timing)
     app.mainloop()
@@ -0,0 +1,103 @@
+import threading
+
+
+class BrightnessCache:
+    """
+    Last known brightness per display.
+
+    Reads go to hardware only on a miss; successful writes update the cache
+    directly, and a background thread re-reads the cached displays every
+    `refresh_interval` seconds to pick up changes made outside this app.
+
+    Hardware reads are slow (DDC/CI) and run outside the lock, so every set
+    or invalidate bumps the display's generation; a read only lands if the
+    generation is unchanged, and a write that completes during the read wins.
+    """
+    def __init__(self, read_fn, refresh_interval=30):
+        self.read_fn = read_fn  # read_fn(monitor_id) -> int, raises ValueError on failure
+        self.refresh_interval = refresh_interval
+        self.hits = 0
+        self.misses = 0
+        self._values = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def get(self, monitor_id):
+        """Returns the cached brightness, reading the hardware on a miss."""
+        with self._lock:
+            if monitor_id in self._values:
+                self.hits += 1
+                return self._values[monitor_id]
+            self.misses += 1
+            generation = self._generations.get(monitor_id, 0)
+        value = self._store_read(monitor_id, self.read_fn(monitor_id), generation)
+        self.start()
+        return value
+
+    def peek(self, monitor_id):
+        """Returns the cached brightness, or None; never touches hardware."""
+        return self._values.get(monitor_id)
+
+    def set(self, monitor_id, value):
+        """Records a brightness that is known to be on the display."""
+        with self._lock:
+            self._values[monitor_id] = value
+            self._generations[monitor_id] = self._generations.get(monitor_id, 0) + 1
+
+    def _store_read(self, monitor_id, value, generation):
+        """Caches a hardware read started at `generation`; returns the value now cached."""
+        with self._lock:
+            if self._generations.get(monitor_id, 0) != generation:
+                return self._values.get(monitor_id, value)  # a write landed during the read
+            self._values[monitor_id] = value
+            self._generations[monitor_id] = generation + 1
+            return value
+
+    def invalidate(self, monitor_id=None):
+        """Forgets one display (or all), forcing the next get to read hardware."""
+        with self._lock:
+            if monitor_id is None:
+                self._values.clear()
+                monitor_ids = list(self._generations)
+            else:
+                self._values.pop(monitor_id, None)
+                monitor_ids = [monitor_id]
+            for mid in monitor_ids:
+                self._generations[mid] = self._generations.get(mid, 0) + 1
+
+    def start(self):
+        """Starts the background refresh thread if enabled and not running."""
+        if not self.refresh_interval or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background refresh thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _refresh_loop(self):
+        while not self._stop_event.wait(self.refresh_interval or 1):
+            if not self.refresh_interval:
+                continue
+            with self._lock:
+                generations = {mid: self._generations.get(mid, 0) for mid in self._values}
+            for monitor_id, generation in generations.items():
+                try:
+                    self._store_read(monitor_id, self.read_fn(monitor_id), generation)
+                except Exception:
+                    # Never let one bad display kill the refresher; re-read on next get.
+                    self.invalidate(monitor_id)
+
+    def stats(self):
+        """Returns hit/miss counters and the hit rate."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0}
@@ -1,22 +1,112 @@
-import mss
-import numpy as np
-import screen_brightness_control as sbc
-import sys
+import threading
+import time
+import BrightnessActuator as BA
+import BrightnessCache as BCH
+import ControlLaw as CL
+import DisplayTopology as DT
+import LuminanceEngine as LE
+import MemoryGuard as MG
+import Metrics as MX
+import ResponseCurve as RC
+import Backends as BK
+import ScreenCapture as SC
+import TileMetering as TM
+import WriteDispatcher as WD
+
+
+class FrameResult:
+    """
+    Outcome of one monitor's tick. The controller keeps one per monitor and
+    updates it in place every tick, so hold on to values, not the object.
+    Also readable as result['desired_brightness'] etc.
+    """
+    __slots__ = ('Screen_background', 'scaled', 'current_brightness', 'desired_brightness', 'percentiles', 'written')
+
+    def __init__(self):
+        self.Screen_background = 0.0
+        self.scaled = 0
+        self.current_brightness = 0
+        self.desired_brightness = 0
+        self.percentiles = {}
+        self.written = None
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
 
 class BrightnessController:
-    def __init__(self, min_brightness=0, max_brightness=100, threshold=10):
+    def __init__(self, min_brightness=0, max_brightness=100, threshold=10, analysis_mode='balanced',
+                 refresh_interval=30, capture_backend=None, brightness_backend=None, topology_cache=''):
         self.threshold = threshold
         self.min_brightness = min_brightness
         self.max_brightness = max_brightness
-        self.monitors = sbc.list_monitors()
+        self.analysis_mode = analysis_mode
+        self.luminance = LE.LuminanceEngine(analysis_mode)
+        self.metering = 'average'
+        self.tile_grid = (8, 8)
+        self.tiles = TM.TileAnalyser(self.luminance, self.tile_grid, self.metering)
+        self.analysis_workers = 0
+        self.analysis_pool = None  # AnalysisPool when analysis_workers > 0
+        self.trace_path = ''
+        self.recorder = None  # SessionTrace.TraceRecorder while trace_path is set
+        self.metrics = MX.MetricsRegistry()
+        self.capture = SC.ScreenCapture(capture_backend)
+        self.brightness_backend = brightness_backend or BK.SbcBrightnessBackend()
+        # Monitor id -> capture region and brightness handle, joined by EDID; watches for hot-plugs.
+        self.topology = DT.DisplayTopology(self.capture.backend, self.brightness_backend, topology_cache)
+        self.topology.listeners.append(self._topology_changed)
+        # Display enumeration can take seconds over DDC/CI; don't block startup on it.
+        threading.Thread(target=self.topology.refresh, daemon=True).start()
+        self.brightness_cache = BCH.BrightnessCache(self.read_brightness, refresh_interval)
+        # Deadlines, retries and quarantine of failing displays live in the dispatcher.
+        self.writes = WD.WriteDispatcher(self.write_brightness)
+        self.actuator = BA.BrightnessActuator(self.writes.write, on_written=self.brightness_cache.set, retries=1)
+        self.metrics.add_source('capture', self.capture.stats)
+        self.metrics.add_source('brightness_cache', self.brightness_cache.stats)
+        self.metrics.add_source('actuator', self.actuator.stats)
+        self.metrics.add_source('write_dispatcher', self.writes.stats)
+        self.metrics.add_source('topology', self.topology.stats)
+        # RSS budget (memory_budget_mb); front-ends set memory.on_exceeded.
+        self.memory = MG.MemoryGuard(self.release_caches)
+        self.metrics.add_source('memory', self.memory.stats)
+        self.metrics.add_source('trace', lambda: self.recorder.stats() if self.recorder else None)
+        self.metrics.add_source('control_law', lambda: self.control_law.stats())
+        self.metrics.add_source('analysis_pool', lambda: self.analysis_pool.stats() if self.analysis_pool else None)
         self.monitor_list = []
+        self.paused = False  # automatic adjustment suspended (control API); manual writes still apply
+        self._results = {}  # monitor_id -> FrameResult, reused every tick
+        self.config_version = -1
+        self._config_lock = threading.RLock()  # one config applied at a time, whichever thread calls
+        self.control_config = {}
+        self.control_law = CL.create(self.control_config, threshold)
+        self._control_key = CL.settings_key(self.control_config, threshold)
+        self.response_curves = {}  # config: {monitor id or 'default': curve settings}
+        self.curves = {}  # monitor_id -> ResponseCurve; monitors without one use scale_brightness
+        self._default_curve = None
+        self._curves_key = None
+
+    @property
+    def monitors(self):
+        """Display handles by monitor id; waits for the first enumeration."""
+        return self.topology.handles()
 
     def getMonitor(self, monitor_id):
         """Fetches the monitor object by ID."""
-        if int(monitor_id) < len(self.monitors):
-            return self.monitors[monitor_id]
-        # print(f"Monitor {monitor_id} not found.")
-        return None
+        display = self.topology.display(int(monitor_id))
+        return display.handle if display else None
+
+    def _topology_changed(self, monitor_ids):
+        """A different display (or none) now has these ids: forget what was learnt about the old one."""
+        for monitor_id in monitor_ids:
+            self.brightness_cache.invalidate(monitor_id)
+            self.control_law.reset(monitor_id)
+            self.writes.reset(monitor_id)
 
     def default_brightness(self):
         """Returns the default brightness value."""
@@ -27,73 +117,346 @@ class BrightnessController:
         scaled = (value - min_value) / (max_value - min_value)
         return int(scaled * (self.max_brightness - self.min_brightness) + self.min_brightness)
 
+    def read_brightness(self, monitor_id):
+        """Reads the brightness of one display from hardware."""
+        display = self.getMonitor(monitor_id)
+        if display is None:
+            raise ValueError(f"Monitor {monitor_id} not found.")
+        with self.metrics.timed('brightness_read', monitor_id):
+            try:
+                return self.brightness_backend.get_brightness(display)
+            except ValueError:
+                self.topology.request_refresh(monitor_id)  # unplugged, or its handle went stale?
+                raise
+
     def get_current_brightness(self, monitor_id):
-        """Fetches the current brightness setting."""
+        """Fetches the current brightness setting, from cache when possible."""
         try:
-            return sbc.get_brightness()[monitor_id]
+            return self.brightness_cache.get(monitor_id)
         except ValueError:
             print(f"Monitor {monitor_id} not found or brightness control not supported.")
             return self.default_brightness()
         
-    def adjust_brightness_(self, value, monitor_id=0, attemptCount=0):
-        """Adjusts system brightness with fading."""
-        try:
-            sbc.fade_brightness(value, interval=0.01, increment=1, display=self.getMonitor(monitor_id))
-            attemptCount += 1
-        except ValueError:
-            if(attemptCount < 3):
-                print(f"Failed to set brightness to {value}. Retrying...")
-                self.adjust_brightness_(value, monitor_id, attemptCount)
-            else:
-                print(f"Failed to set brightness to {value}.")
-                sys.exit(1)
+    def write_brightness(self, monitor_id, value):
+        """Writes one brightness value to a display's hardware."""
+        display = self.getMonitor(monitor_id)
+        if display is None:
+            raise WD.DisplayDisconnected(f"Monitor {monitor_id} not found.")
+        with self.metrics.timed('brightness_write', monitor_id):
+            try:
+                self.brightness_backend.set_brightness(value, display)
+            except ValueError:
+                self.topology.request_refresh(monitor_id)  # unplugged, or its handle went stale?
+                raise
+
+    def adjust_brightness_(self, value, monitor_id=0, current=None):
+        """Queues a faded brightness change; returns without waiting on hardware."""
+        self.actuator.submit(monitor_id, value, current=current)
 
     def adjust_brightness_direct(self, value, monitor_id=0):
-        """Directly adjusts brightness without fading."""
+        """Directly adjusts brightness without fading; returns False if the write failed."""
         try:
-            sbc.set_brightness(value, display=self.getMonitor(monitor_id))
-        except ValueError:
-            print(f"Failed to set brightness to {value} on monitor {monitor_id}.")
-            sys.exit(1)
+            self.writes.write(monitor_id, value)
+        except ValueError as e:
+            print(e)
+            return False
+        self.brightness_cache.set(monitor_id, value)
+        return True
 
-    def adjust_brightness_with_hysterisis(self, current, target):
-        """Adjusts brightness with hysteresis to avoid flickering."""
-        if(abs(current - target) > self.threshold):
-            self.adjust_brightness_(target)
+    def set_manual_brightness(self, value, monitor_ids):
+        """
+        Queues a manual brightness for the listed monitors and returns at once.
+        The actuator keeps only the latest value per display and spaces writes
+        by min_write_spacing; replaced values show up as its 'coalesced' count.
+        """
+        for monitor_id in monitor_ids:
+            self.actuator.submit(monitor_id, value, fade=False)
+
+    def adjust_brightness_with_hysterisis(self, current, target, monitor_id=0):
+        """
+        Adjusts brightness through the control law (plain hysteresis by default) to avoid flickering.
+        Returns the value submitted to the display, or None.
+        """
+        if not self.writes.available(monitor_id):
+            return None  # quarantined display; the dispatcher probes it again after its cooldown
+        value = self.control_law.update(monitor_id, current, target)
+        if value is not None:
+            self.adjust_brightness_(value, monitor_id, current)
+        return value
 
     def get_avg_brightness(self, img):
-        """Calculates the mean brightness across the screenshot."""
-        gray_img = np.mean(img, axis=2)  # Simple grayscale approximation
-        return np.mean(gray_img)
+        """Calculates the mean luma across the screenshot (alpha ignored)."""
+        return self.luminance.mean_luma(img)
 
     def get_center_brightness(self, img):
-        """Calculates mean brightness in the center region of the screenshot."""
-        h, w = img.shape[:2]
-        center = img[h//4:3*h//4, w//4:3*w//4, :3]
-        gray_center = np.mean(center, axis=2)
-        return np.mean(gray_center)
+        """Calculates mean luma in the center region of the screenshot."""
+        return self.luminance.mean_luma(self.luminance.center_view(img))
+
+    def get_metered_brightness(self, img, monitor_id=0):
+        """Tile-grid statistics of the screenshot under the configured metering mask."""
+        if self.analysis_pool:
+            return self.analysis_pool.analyse(monitor_id, img, self.tiles)
+        return self.tiles.analyse(img, key=monitor_id)
 
-    def process_monitor(self, monitor, monitor_id, use_center=True):
+    def process_monitor(self, monitor, monitor_id, use_center=True, sct=None, scheduler=None):
         """Handles the workflow for a single monitor."""
-        screenshot = np.array(mss.mss().grab(monitor))
-        if use_center:
-            Screen_background = self.get_center_brightness(screenshot)
+        # In center mode only the center quarter is captured, so it is analysed whole.
+        with self.metrics.timed('capture', monitor_id):
+            screenshot = self.capture.grab(monitor, use_center, sct)
+        return self.process_frame(screenshot, monitor_id, scheduler)
+
+    def process_frame(self, screenshot, monitor_id, scheduler=None):
+        """Analyses an already captured frame and adjusts that monitor's brightness."""
+        self.metrics.increment('ticks', monitor_id)
+        with self.metrics.timed('analysis', monitor_id):
+            if scheduler and not scheduler.should_analyse(screenshot):
+                metered = None
+            else:
+                metered = self.get_metered_brightness(screenshot, monitor_id)
+        if metered is None:
+            # Outside the analysis timing: the control law's work is not analysis.
+            self.metrics.increment('skipped', monitor_id)
+            return self.reapply_result(scheduler.last_result, monitor_id)
+        return self.apply_metered(metered, monitor_id, scheduler)
+
+    def reapply_result(self, summary, monitor_id):
+        """
+        Unchanged frame: skips analysis but runs the control law again on the
+        cached target, so laws that converge over several ticks (ema's hold,
+        rate, pid) keep moving while the screen is static.
+        """
+        current_brightness = self.get_current_brightness(monitor_id)
+        written = self.adjust_brightness_with_hysterisis(current_brightness, summary.desired_brightness, monitor_id)
+        summary.current_brightness = current_brightness
+        summary.written = written
+        recorder = self.recorder
+        if recorder:
+            recorder.record(monitor_id, summary, written, self.writes.last_latency(monitor_id))
+        return summary
+
+    def response_curve(self, monitor_id):
+        """The monitor's ResponseCurve (its own or a fork of 'default'), or None."""
+        curve = self.curves.get(monitor_id)
+        if curve is None and self._default_curve is not None:
+            curve = self.curves[monitor_id] = self._default_curve.fork()
+        return curve
+
+    def set_response_curves(self, curves):
+        """Builds the lookup tables of the configured response curves for the current brightness range."""
+        self.response_curves = curves
+        built = {}
+        default = None
+        for key, spec in curves.items():
+            curve = RC.ResponseCurve.from_config(spec, self.min_brightness, self.max_brightness)
+            if key == 'default':
+                default = curve
+            else:
+                built[int(key)] = curve
+        self._default_curve = default
+        self.curves = built
+
+    def apply_metered(self, metered, monitor_id, scheduler=None):
+        """Turns a frame's metered luma into a brightness adjustment for that monitor."""
+        curve = self.response_curve(monitor_id)
+        if curve is None:
+            Screen_background = metered['mean']
+            scaled = self.scale_brightness(Screen_background)
+            desired_brightness = self.max_brightness - scaled  # Inversion logic
         else:
-            Screen_background = self.get_avg_brightness(screenshot)
-        scaled = self.scale_brightness(Screen_background)
+            # Perceived lightness of the tiles, then the inverted, calibrated setting by table lookup.
+            Screen_background = curve.level(metered)
+            desired_brightness = curve.target_for(Screen_background)
+            scaled = self.max_brightness - desired_brightness
         current_brightness = self.get_current_brightness(monitor_id)
-        desired_brightness = self.max_brightness - scaled  # Inversion logic
-        self.adjust_brightness_with_hysterisis(current_brightness, desired_brightness)
-        return {
-            "Screen_background": Screen_background,
-            "scaled": scaled,
-            "current_brightness": current_brightness,
-            "desired_brightness": desired_brightness
-        }
-    
+        written = self.adjust_brightness_with_hysterisis(current_brightness, desired_brightness, monitor_id)
+        summary = self._results.get(monitor_id)
+        if summary is None:
+            summary = self._results[monitor_id] = FrameResult()
+        summary.Screen_background = Screen_background
+        summary.scaled = scaled
+        summary.current_brightness = current_brightness
+        summary.desired_brightness = desired_brightness
+        summary.percentiles = metered['percentiles']
+        summary.written = written
+        recorder = self.recorder
+        if recorder:
+            recorder.record(monitor_id, summary, written, self.writes.last_latency(monitor_id))
+        if scheduler:
+            scheduler.last_result = summary
+        return summary
+
+    def begin_tick(self, config, schedulers, version, monitors):
+        """
+        Start of every monitor loop tick, shared by the GUI threads and the
+        daemon tasks. Applies `config` when its version differs from the
+        last one the loop applied and resets the loop's `schedulers`.
+        Returns (version, regions): regions holds the still-connected
+        {monitor_id: region} of `monitors`, or is None while paused, in
+        which case the version is forgotten so the schedulers start over
+        on resume.
+        """
+        if config.version != version:
+            self.update_user_config(config)
+            for scheduler in schedulers:
+                scheduler.update_config(config)  # settings changed, re-evaluate even a static frame
+            version = config.version
+        if self.paused:
+            return None, None
+        return version, self.connected_regions(monitors)
+
+    def connected_regions(self, monitors):
+        """
+        Current capture regions of the selected {monitor_id: monitor} that are
+        still connected. A monitor keeps its id across hot-plugs but may move;
+        before the first enumeration the given regions are used as they are.
+        """
+        regions = {}
+        for monitor_id, monitor in monitors.items():
+            region = self.topology.region(monitor_id, monitor)
+            if region is not None:
+                regions[monitor_id] = region
+        return regions
+
+    def grab_region(self, region):
+        """Captures a multi-monitor region, timed as the 'all' monitor's capture stage."""
+        with self.metrics.timed('capture', 'all'):
+            return self.capture.grab(region)
+
+    def process_frames(self, views, schedulers=None):
+        """Processes {monitor_id: frame} views from one capture in a single pass."""
+        schedulers = schedulers or {}
+        if not self.analysis_pool:
+            return {
+                monitor_id: self.process_frame(view, monitor_id, schedulers.get(monitor_id))
+                for monitor_id, view in views.items()
+            }
+        # Hand every monitor's frame to the pool before waiting on any, so they are analysed in parallel.
+        summaries = {}
+        pending = {}
+        for monitor_id, view in views.items():
+            scheduler = schedulers.get(monitor_id)
+            self.metrics.increment('ticks', monitor_id)
+            if scheduler and not scheduler.should_analyse(view):
+                self.metrics.increment('skipped', monitor_id)
+                summaries[monitor_id] = self.reapply_result(scheduler.last_result, monitor_id)
+            else:
+                pending[monitor_id] = (time.perf_counter(), self.analysis_pool.submit(monitor_id, view, self.tiles))
+        for monitor_id, (start, future) in pending.items():
+            try:
+                metered = future.result()
+            except Exception:
+                self.metrics.increment('analysis_errors', monitor_id)
+                raise
+            finally:
+                self.metrics.observe('analysis', monitor_id, time.perf_counter() - start)
+            summaries[monitor_id] = self.apply_metered(metered, monitor_id, schedulers.get(monitor_id))
+        return summaries
+
+    def set_trace_path(self, path):
+        """Starts recording ticks to a trace file, or stops with an empty path."""
+        if path == self.trace_path:
+            return
+        old_recorder, self.recorder = self.recorder, None
+        if old_recorder:
+            old_recorder.close()
+        if path:
+            import SessionTrace as ST
+            try:
+                self.recorder = ST.TraceRecorder(path)
+            except (OSError, ValueError) as e:
+                print(f"Failed to open trace {path}: {e}")
+        self.trace_path = path
+
+    def set_analysis_workers(self, workers):
+        """Moves frame analysis to `workers` processes, or back into the calling threads with 0."""
+        if workers == self.analysis_workers:
+            return
+        old_pool, self.analysis_pool = self.analysis_pool, None
+        if old_pool:
+            old_pool.close()
+        if workers > 0:
+            import AnalysisPool as AP
+            self.analysis_pool = AP.AnalysisPool(workers)
+        self.analysis_workers = workers
+
+    def state(self):
+        """Per-monitor name, connection, cached and last desired brightness (no hardware reads)."""
+        monitors = {}
+        for display in self.topology.displays:
+            result = self._results.get(display.monitor_id)
+            monitors[str(display.monitor_id)] = {
+                'name': display.name,
+                'connected': display.handle is not None,
+                'brightness': self.brightness_cache.peek(display.monitor_id),
+                'desired': result.desired_brightness if result else None,
+            }
+        return {'paused': self.paused, 'monitors': monitors}
+
+    def release_caches(self):
+        """Drops buffers that are rebuilt on demand (tile layouts and analysis scratch)."""
+        self.tiles.release()
+
+    def close(self):
+        """Stops background workers (cache refresh, actuator, write threads, analysis processes, watchers)."""
+        self.topology.stop()
+        self.memory.stop()
+        self.actuator.stop()
+        self.writes.close()
+        self.brightness_cache.stop()
+        self.set_analysis_workers(0)
+        self.set_trace_path('')
+
     # IMP: update user input configs dynamically
     def update_user_config(self, new_config):
+        """
+        Applies a config mapping. Monitor threads, the Tk thread and control
+        API connections all call this, so the version check and the apply
+        run under one lock: a snapshot version is applied once, and worker
+        pools, trace files and watchers are never set up twice.
+        """
+        with self._config_lock:
+            version = getattr(new_config, 'version', None)
+            if version is not None:
+                # Versioned snapshot: apply each version once, however many threads see it.
+                if version <= self.config_version:
+                    return
+                self.config_version = version
+            self._apply_user_config(new_config)
+
+    def _apply_user_config(self, new_config):
         self.min_brightness = new_config.get('min_brightness', self.min_brightness)
         self.max_brightness = new_config.get('max_brightness', self.max_brightness)
         self.threshold = new_config.get('threshold', self.threshold)
-        self.monitor_list = new_config.get('monitors', self.monitor_list)
\ No newline at end of file
+        self.monitor_list = new_config.get('monitors', self.monitor_list)
+        analysis_mode = new_config.get('analysis_mode', self.analysis_mode)
+        if analysis_mode != self.analysis_mode:
+            self.analysis_mode = analysis_mode
+            self.luminance.configure(analysis_mode)
+        metering = new_config.get('metering', self.metering)
+        tile_grid = tuple(new_config.get('tile_grid', self.tile_grid))
+        if metering != self.metering or tile_grid != self.tile_grid:
+            self.metering, self.tile_grid = metering, tile_grid
+            self.tiles.configure(tile_grid, metering)
+        self.set_analysis_workers(new_config.get('analysis_workers', self.analysis_workers))
+        self.set_trace_path(new_config.get('trace_path', self.trace_path))
+        self.writes.configure(
+            timeout=new_config.get('write_timeout'),
+            retries=new_config.get('write_retries'),
+            failure_threshold=new_config.get('quarantine_after'),
+            cooldown=new_config.get('quarantine_cooldown'),
+        )
+        self.memory.configure(new_config.get('memory_budget_mb'), new_config.get('memory_check_interval'))
+        self.topology.configure(new_config.get('topology_cache_path'), new_config.get('topology_poll_interval'))
+        self.actuator.min_spacing = new_config.get('min_write_spacing', self.actuator.min_spacing)
+        self.brightness_cache.refresh_interval = new_config.get('brightness_refresh_interval',
+                                                                self.brightness_cache.refresh_interval)
+        response_curves = new_config.get('response_curves', self.response_curves)
+        curves_key = (self.min_brightness, self.max_brightness, response_curves)
+        if curves_key != self._curves_key:
+            self._curves_key = curves_key
+            self.set_response_curves(response_curves)
+        self.control_config.update({key: value for key, value in new_config.items() if key.startswith('control_')})
+        control_key = CL.settings_key(self.control_config, self.threshold)
+        if control_key != self._control_key:
+            self._control_key = control_key
+            self.control_law = CL.reconfigure(self.control_law, self.control_config, self.threshold)
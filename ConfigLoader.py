@@ -1,13 +1,102 @@
-import yaml
+import os
+import threading
+import ControlLaw as CL
+import LazyImport as LI
+import LuminanceEngine as LE
+import ResponseCurve as RC
+import TileMetering as TM
+
+yaml = LI.lazy_module('yaml')
+
+
+def _number(check):
+    return ((int, float), check)
+
+
+# key -> (accepted types, value check or None). Keys not listed are accepted as-is.
+CONFIG_SCHEMA = {
+    'interval': _number(lambda v: v > 0),
+    'min_brightness': (int, lambda v: 0 <= v <= 100),
+    'max_brightness': (int, lambda v: 0 <= v <= 100),
+    'threshold': _number(lambda v: v >= 0),
+    'use_center': (bool, None),
+    'monitors': (list, lambda v: all(isinstance(i, int) and i >= 0 for i in v)),
+    'analysis_mode': (str, lambda v: v in LE.ANALYSIS_MODES),
+    'metering': (str, lambda v: v in TM.METERING_MODES),
+    'tile_grid': (list, lambda v: len(v) == 2 and all(isinstance(i, int) and i > 0 for i in v)),
+    'response_curves': (dict, RC.valid_curves),
+    'analysis_workers': (int, lambda v: v >= 0),
+    'brightness_refresh_interval': _number(lambda v: v >= 0),
+    'write_timeout': _number(lambda v: v > 0),
+    'write_retries': (int, lambda v: v >= 1),
+    'quarantine_after': (int, lambda v: v >= 1),
+    'quarantine_cooldown': _number(lambda v: v > 0),
+    'min_write_spacing': _number(lambda v: v >= 0),
+    'adaptive_polling': (bool, None),
+    'min_interval': _number(lambda v: v > 0),
+    'max_interval': _number(lambda v: v > 0),
+    'change_tolerance': _number(lambda v: v >= 0),
+    'polling_backoff': _number(lambda v: v >= 1),
+    'capture_mode': (str, lambda v: v in ('threaded', 'multiplexed')),
+    'metrics_port': (int, lambda v: 0 <= v <= 65535),
+    'metrics_dump_path': (str, None),
+    'metrics_dump_interval': _number(lambda v: v > 0),
+    'config_watch_interval': _number(lambda v: v >= 0),
+    'trace_path': (str, None),
+    'memory_budget_mb': _number(lambda v: v >= 0),
+    'memory_check_interval': _number(lambda v: v > 0),
+    'topology_cache_path': (str, None),
+    'topology_poll_interval': _number(lambda v: v >= 0),
+    'api_socket': (str, None),
+    'api_port': (int, lambda v: 0 <= v <= 65535),
+    'control_law': (str, lambda v: v in CL.CONTROL_LAWS),
+    'control_deadband': _number(lambda v: v >= 0),
+    'control_time_constant': _number(lambda v: v >= 0),
+    'control_hold': _number(lambda v: v >= 0),
+    'control_max_rate': _number(lambda v: v > 0),
+    'control_kp': _number(None),
+    'control_ki': _number(None),
+    'control_kd': _number(None),
+}
+
+# Settings read only when monitoring (re)starts: the GUI's Start takes them from the current
+# snapshot, the daemon from the files at launch. A reload changes them for the next start.
+START_KEYS = ('monitors', 'capture_mode', 'adaptive_polling')
+# START_KEYS plus settings read from the files only when the app is launched.
+RESTART_KEYS = START_KEYS + ('metrics_port', 'metrics_dump_path', 'metrics_dump_interval', 'config_watch_interval',
+                             'api_socket', 'api_port')
+# Files the app writes; a relative path is taken from the directory of the config file that sets it.
+PATH_KEYS = ('topology_cache_path',)
+
+
+def validate_config(config):
+    """Returns a list of problems with a merged config (empty when valid)."""
+    errors = []
+    for key, (types, check) in CONFIG_SCHEMA.items():
+        if key not in config:
+            continue
+        value = config[key]
+        # bool is an int subclass; only accept it where a bool is expected.
+        if not isinstance(value, types) or (isinstance(value, bool) and types is not bool):
+            errors.append(f"{key}: unexpected value {value!r}")
+        elif check is not None and not check(value):
+            errors.append(f"{key}: {value!r} is out of range")
+    if not errors and config.get('min_brightness', 0) > config.get('max_brightness', 100):
+        errors.append("min_brightness is greater than max_brightness")
+    return errors
+
 
 class ConfigLoader:
     def __init__(self, default_config_path=None, user_config_path=None):
         self.default_config_path = default_config_path
         self.user_config_path = user_config_path
         self.config = self.load_and_merge_configs()
+        self.errors = validate_config(self.config)  # front ends refuse to start on these
 
     def load_yaml(self, filename):
         """Load YAML from a file gracefully, returning empty dict if file not found or empty."""
+        if not filename:
+            return {}
         try:
             with open(filename, 'r') as f:
                 content = yaml.safe_load(f)
@@ -17,20 +106,136 @@ class ConfigLoader:
 
     def load_and_merge_configs(self):
         """Merge user config over default config with fallback for missing keys."""
-        default_config = self.load_yaml(self.default_config_path)
-        user_config = self.load_yaml(self.user_config_path)
+        default_config = self.resolve_paths(self.load_yaml(self.default_config_path), self.default_config_path)
+        user_config = self.resolve_paths(self.load_yaml(self.user_config_path), self.user_config_path)
         # Merge: user values override default values
         merged_config = {**default_config, **user_config}
         return merged_config
 
+    @staticmethod
+    def resolve_paths(config, filename):
+        """Makes the PATH_KEYS in a file's config relative to that file rather than the working directory."""
+        for key in PATH_KEYS:
+            value = config.get(key)
+            if isinstance(value, str) and value and not os.path.isabs(value):
+                config[key] = os.path.join(os.path.dirname(os.path.abspath(filename)), value)
+        return config
+
     def get(self, key, default=None):
         """Safe getter for configuration values."""
         return self.config.get(key, default)
-    
+
+    def reload(self):
+        """
+        Re-reads and validates both files. Returns the changed keys and values,
+        or None when the files cannot be parsed or fail validation (the
+        current config then stays in effect). A key deleted from the user file
+        changes back to the default file's value; one deleted from both is
+        reported as None, which ConfigPublisher.publish and update() drop.
+        """
+        try:
+            merged = self.load_and_merge_configs()
+        except (OSError, TypeError, yaml.YAMLError) as e:
+            print(f"Config reload failed: {e}")
+            return None
+        errors = validate_config(merged)
+        if errors:
+            print(f"Config reload rejected: {'; '.join(errors)}")
+            return None
+        changed = {key: value for key, value in merged.items() if self.config.get(key) != value}
+        changed.update({key: None for key in self.config if key not in merged})
+        if changed:
+            self.update(changed)
+        return changed
+
     # IMP: Add a method to update the config dynamically with input of dictionary.
     def update(self, new_config):
         self.config.update(new_config)
+        for key in [key for key, value in new_config.items() if value is None]:
+            del self.config[key]
         self.interval = self.get('interval')
         self.use_center = self.get('use_center')
         # print(f"Updated interval: {self.interval}, use_center: {self.use_center}")
         self.monitors = self.get('monitors')
+
+
+class ConfigWatcher(threading.Thread):
+    """
+    Reloads the config files when they change and hands the changed keys to
+    `on_change`. It is called on the watcher thread; front ends pass them on
+    to the thread that publishes their config (the Tk main loop, the
+    daemon's event loop), and running monitor threads pick them up on their
+    next tick.
+
+    Polls file mtimes and sizes every `interval` seconds, which works the same
+    on every platform. Editors often save in several writes, so a change is
+    only reloaded once the files have stayed the same for `debounce` seconds.
+    """
+    def __init__(self, loader, on_change, interval=2.0, debounce=0.5):
+        super().__init__(daemon=True)
+        self.loader = loader
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self.reloads = 0
+        self.rejected = 0
+        self._stop_event = threading.Event()
+
+    def fingerprint(self):
+        """(mtime, size) of each config file, None for a missing one."""
+        stamps = []
+        for path in (self.loader.default_config_path, self.loader.user_config_path):
+            try:
+                stat = os.stat(path) if path else None
+                stamps.append((stat.st_mtime_ns, stat.st_size) if stat else None)
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def run(self):
+        seen = self.fingerprint()
+        while not self._stop_event.wait(self.interval):
+            current = self.fingerprint()
+            if current == seen:
+                continue
+            while not self._stop_event.wait(self.debounce):
+                latest = self.fingerprint()
+                if latest == current:
+                    break
+                current = latest
+            seen = current
+            changed = self.loader.reload()
+            if changed is None:
+                self.rejected += 1
+                continue
+            self.reloads += 1
+            if not changed:
+                continue
+            print(f"Config reloaded: {', '.join(sorted(changed))} changed.")
+            pending = sorted(key for key in changed if key in START_KEYS)
+            if pending:
+                print(f"{', '.join(pending)} will apply the next time monitoring starts.")
+            pending = sorted(key for key in changed if key in RESTART_KEYS and key not in START_KEYS)
+            if pending:
+                print(f"{', '.join(pending)} will apply the next time the app is launched.")
+            try:
+                self.on_change(changed)
+            except Exception as e:
+                print(f"Failed to apply reloaded config: {e}")
+
+    def stats(self):
+        return {'reloads': self.reloads, 'rejected': self.rejected}
+
+    def stop(self):
+        self._stop_event.set()
+        self.join(timeout=1)
+
+
+def start_watcher(loader, on_change):
+    """Starts a ConfigWatcher when config_watch_interval is set; returns it, or None."""
+    interval = loader.get('config_watch_interval', 0)
+    if not interval:
+        return None
+    watcher = ConfigWatcher(loader, on_change, interval)
+    watcher.start()
+    return watcher
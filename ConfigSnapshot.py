@@ -0,0 +1,64 @@
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+
+
+class ConfigSnapshot(Mapping):
+    """
+    Immutable, versioned copy of the settings.
+
+    Lists are frozen into tuples so a snapshot can be shared between threads
+    without copying or locking.
+    """
+    __slots__ = ('version', '_values')
+
+    def __init__(self, values, version=0):
+        frozen = {key: tuple(value) if isinstance(value, list) else value for key, value in values.items()}
+        self._values = MappingProxyType(frozen)
+        self.version = version
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f"ConfigSnapshot(version={self.version}, {dict(self._values)})"
+
+
+class ConfigPublisher:
+    """
+    Holds the current ConfigSnapshot.
+
+    Publishers are the front end's own loop (the Tk main loop or the
+    daemon's event loop, which also apply config file reloads) and control
+    API connections, serialised by a lock; readers just take
+    `publisher.current`, a single attribute read, and compare versions to
+    notice changes.
+    """
+    def __init__(self, initial=None):
+        self._lock = threading.Lock()
+        self._snapshot = ConfigSnapshot(initial or {}, 0)
+
+    @property
+    def current(self):
+        return self._snapshot
+
+    def publish(self, values):
+        """
+        Merges `values` over the current snapshot; bumps the version only if
+        something changed. A None value removes the key, so readers fall back
+        to their own default.
+        """
+        with self._lock:
+            current = self._snapshot
+            merged = {key: value for key, value in {**current, **values}.items() if value is not None}
+            candidate = ConfigSnapshot(merged, current.version + 1)
+            if dict(candidate) == dict(current):
+                return current
+            self._snapshot = candidate
+            return candidate
@@ -0,0 +1,327 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+import ConfigLoader as CFL
+
+MAX_REQUEST_BYTES = 1 << 20  # one request line; longer ones are rejected
+
+
+class CommandError(ValueError):
+    """A batch was rejected; nothing in it was applied."""
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+if hasattr(socket, 'AF_UNIX'):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def _remove_stale_socket(path):
+    """Removes a socket left behind by a run that is gone; raises OSError for anything else at `path`."""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"another instance is already listening on {path}")
+
+
+def _monitor_id(value):
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise CommandError(f"invalid monitor id {value!r}")
+    return value
+
+
+def _brightness(value):
+    if not isinstance(value, int) or isinstance(value, bool) or not 0 <= value <= 100:
+        raise CommandError(f"brightness must be an integer 0-100, got {value!r}")
+    return value
+
+
+def _plain(config):
+    """A snapshot as a plain dict, with tuples back to lists (what validate_config and JSON expect)."""
+    return {key: list(value) if isinstance(value, tuple) else value for key, value in config.items()}
+
+
+class ControlServer:
+    """
+    Local control API: newline-delimited JSON over a Unix socket (`path`)
+    or, where there are none or no path is set, a loopback TCP `port`.
+
+    A request is one line holding a list of commands (or one command, or
+    {"id": ..., "commands": [...]}); the reply is one line
+    {"id": ..., "ok": true, "results": [...]} with a result per command, or
+    {"id": ..., "ok": false, "error": "..."}. Commands:
+
+        {"cmd": "set_brightness", "value": 40, "monitors": [0, 1]}
+        {"cmd": "set_brightness", "values": {"0": 40, "1": 60}}
+        {"cmd": "pause"}, {"cmd": "resume"}     automatic adjustment
+        {"cmd": "config", "values": {"threshold": 5}}
+        {"cmd": "state"}
+
+    set_brightness defaults to the configured `monitors`. A batch is
+    validated as a whole before anything is applied, and batches are
+    applied one at a time, so a rejected batch changes nothing and no
+    client sees half of another's. The config commands of a batch are
+    merged and published first, as one snapshot version, so monitor
+    threads never see half of a batch's settings. Settings in
+    ConfigLoader.RESTART_KEYS are rejected unless they are in `start_keys`,
+    the ones the front end reads from the snapshot when monitoring next
+    starts; those are listed under "on_restart". Each connection has its
+    own thread, and commands only publish snapshots and queue actuator
+    targets, so a request never waits on display hardware or on the Tk
+    main loop.
+    """
+    def __init__(self, controller, publisher, path='', port=0, on_config=None, start_keys=()):
+        self.controller = controller
+        self.publisher = publisher  # ConfigSnapshot.ConfigPublisher the monitor threads read
+        self.on_config = on_config  # on_config(changed_values), e.g. to refresh the GUI entries
+        self.start_keys = start_keys
+        self.requests = 0
+        self.rejected = 0
+        self.commands = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    line = self.rfile.readline(MAX_REQUEST_BYTES + 1)
+                    if not line:
+                        return
+                    if len(line) > MAX_REQUEST_BYTES and not line.endswith(b'\n'):
+                        # Skip the rest of the oversized line, so the next read starts at the next request.
+                        rest = line
+                        while rest and not rest.endswith(b'\n'):
+                            rest = self.rfile.readline(MAX_REQUEST_BYTES + 1)
+                    reply = server.handle_line(line)
+                    self.wfile.write(json.dumps(reply, default=str).encode() + b'\n')
+
+        if path and hasattr(socket, 'AF_UNIX'):
+            _remove_stale_socket(path)
+            # Created 0600 from the start: only this user may drive the displays.
+            umask = os.umask(0o177)
+            try:
+                self.server = _UnixServer(path, Handler)
+            finally:
+                os.umask(umask)
+            self.address = path
+        else:
+            self.server = _TCPServer(('127.0.0.1', port), Handler)
+            self.address = self.server.server_address
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if isinstance(self.address, str):
+            try:
+                os.remove(self.address)
+            except OSError:
+                pass
+
+    def handle_line(self, line):
+        """Parses and runs one request line; returns the reply object."""
+        request_id = None
+        try:
+            if len(line) > MAX_REQUEST_BYTES:
+                raise CommandError(f"request longer than {MAX_REQUEST_BYTES} bytes")
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                raise CommandError(f"invalid JSON: {e}")
+            if isinstance(request, dict) and 'commands' in request:
+                request_id = request.get('id')
+                commands = request['commands']
+            else:
+                commands = request
+            if isinstance(commands, dict):
+                commands = [commands]
+            if not isinstance(commands, list):
+                raise CommandError("expected a command or a list of commands")
+            results = self.execute(commands)
+        except CommandError as e:
+            with self._lock:
+                self.requests += 1
+                self.rejected += 1
+            return {'id': request_id, 'ok': False, 'error': str(e)}
+        except Exception as e:
+            print(f"Control API request failed: {e}")
+            return {'id': request_id, 'ok': False, 'error': str(e)}
+        return {'id': request_id, 'ok': True, 'results': results}
+
+    def execute(self, commands):
+        """Validates a batch, then applies it atomically; returns a result per command."""
+        with self._lock:
+            self.requests += 1
+            plan = self._validate(commands)
+            updated = self._publish({key: value for kind, argument in plan if kind == 'config'
+                                     for key, value in argument.items()})
+            results = [self._apply(kind, argument, updated) for kind, argument in plan]
+            self.commands += len(plan)
+        return results
+
+    def _validate(self, commands):
+        """Checks every command against the config as the batch leaves it; returns [(kind, argument)]."""
+        config = _plain(self.publisher.current)
+        plan = []
+        for index, command in enumerate(commands):
+            if not isinstance(command, dict):
+                raise CommandError(f"command {index}: expected an object")
+            kind = command.get('cmd')
+            try:
+                if kind == 'set_brightness':
+                    if 'values' in command:
+                        if not isinstance(command['values'], dict):
+                            raise CommandError("'values' must map monitor ids to brightness")
+                        targets = {_monitor_id(mid): _brightness(value) for mid, value in command['values'].items()}
+                    else:
+                        monitors = command.get('monitors', config.get('monitors', []))
+                        if not isinstance(monitors, list):
+                            raise CommandError("'monitors' must be a list")
+                        value = _brightness(command.get('value'))
+                        targets = {_monitor_id(mid): value for mid in monitors}
+                    missing = [mid for mid in targets if self.controller.getMonitor(mid) is None]
+                    if missing:
+                        raise CommandError(f"no brightness control for monitors {missing}")
+                    plan.append((kind, targets))
+                elif kind == 'config':
+                    values = command.get('values')
+                    if not isinstance(values, dict) or not values:
+                        raise CommandError("'values' must be a non-empty object")
+                    unknown = sorted(key for key in values if key not in CFL.CONFIG_SCHEMA)
+                    if unknown:
+                        raise CommandError(f"unknown settings {unknown}")
+                    fixed = sorted(key for key in values if key in CFL.RESTART_KEYS and key not in self.start_keys)
+                    if fixed:
+                        raise CommandError(f"{fixed} are only read at launch; change them in the config file")
+                    errors = CFL.validate_config({**config, **values})
+                    if errors:
+                        raise CommandError('; '.join(errors))
+                    config.update(values)
+                    plan.append((kind, values))
+                elif kind in ('pause', 'resume', 'state'):
+                    plan.append((kind, None))
+                else:
+                    raise CommandError(f"unknown command {kind!r}")
+            except CommandError as e:
+                raise CommandError(f"command {index} ({kind}): {e}")
+        return plan
+
+    def _publish(self, values):
+        """Publishes a batch's merged config values as one snapshot; returns (snapshot, changed) or None."""
+        if not values:
+            return None
+        before = self.publisher.current
+        snapshot = self.publisher.publish(values)
+        self.controller.update_user_config(snapshot)
+        changed = {key: value for key, value in values.items() if before.get(key) != snapshot.get(key)}
+        if changed and self.on_config:
+            self.on_config(changed)
+        return snapshot, changed
+
+    def _apply(self, kind, argument, updated):
+        controller = self.controller
+        if kind == 'set_brightness':
+            by_value = {}
+            for monitor_id, value in argument.items():
+                by_value.setdefault(value, []).append(monitor_id)
+            for value, monitor_ids in by_value.items():
+                controller.set_manual_brightness(value, monitor_ids)
+            return {'queued': {str(mid): value for mid, value in argument.items()}}
+        if kind == 'config':
+            snapshot, changed = updated
+            changed = [key for key in argument if key in changed]
+            return {'version': snapshot.version, 'changed': sorted(changed),
+                    'on_restart': sorted(key for key in changed if key in self.start_keys)}
+        if kind in ('pause', 'resume'):
+            controller.paused = kind == 'pause'
+            return {'paused': controller.paused}
+        config = self.publisher.current
+        return {**controller.state(), 'config_version': config.version, 'config': _plain(config)}
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'rejected': self.rejected, 'commands': self.commands}
+
+
+class ControlClient:
+    """
+    Connection to a ControlServer. It stays open between calls, so
+    scripts sending many requests pay for the connect once.
+    """
+    def __init__(self, path='', port=0, timeout=5.0):
+        if path and hasattr(socket, 'AF_UNIX'):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            address = path
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            address = ('127.0.0.1', port)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+        self._reader = self.sock.makefile('rb')
+
+    def request(self, commands, request_id=None):
+        """Sends one batch and returns the raw reply object."""
+        payload = {'id': request_id, 'commands': list(commands)}
+        self.sock.sendall(json.dumps(payload).encode() + b'\n')
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("control server closed the connection")
+        return json.loads(line)
+
+    def call(self, commands):
+        """Sends one batch; returns its results, or raises CommandError if it was rejected."""
+        reply = self.request(commands)
+        if not reply.get('ok'):
+            raise CommandError(reply.get('error'))
+        return reply['results']
+
+    def close(self):
+        self._reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def start_server(controller, publisher, config, on_config=None, start_keys=()):
+    """Starts the control API enabled in config (api_socket / api_port); returns it or None."""
+    path = config.get('api_socket', '')
+    port = config.get('api_port', 0)
+    if not path and not port:
+        return None
+    try:
+        server = ControlServer(controller, publisher, path, port, on_config, start_keys).start()
+    except OSError as e:
+        print(f"Failed to start control API on {path or port}: {e}")
+        return None
+    controller.metrics.add_source('control_api', server.stats)
+    print(f"Control API listening on {server.address}")
+    return server
@@ -0,0 +1,207 @@
+import math
+import threading
+import time
+
+CONTROL_LAWS = ('threshold', 'ema', 'rate', 'pid')
+
+
+class ControlLaw:
+    """
+    Turns (current, target) brightness pairs into hardware writes.
+
+    update() returns the value to write, or None to leave the display alone.
+    State is kept per monitor. A "write avoided" is a tick where the target
+    differs from the current brightness but the law chose not to write.
+    """
+    def __init__(self, deadband=0, clock=None):
+        self.deadband = deadband
+        self.clock = clock or time.monotonic
+        self.updates = 0
+        self.writes = 0
+        self.writes_avoided = 0
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def update(self, monitor_id, current, target):
+        """Returns the brightness to write for this monitor, or None."""
+        now = self.clock()
+        with self._lock:
+            state = self._state.setdefault(monitor_id, {'last': None})
+            dt = 0.0 if state['last'] is None else now - state['last']
+            state['last'] = now
+            value = self.step(state, current, target, dt)
+            if value is not None:
+                value = int(round(max(0, min(100, value))))
+                if value == current:
+                    value = None
+            self.updates += 1
+            if value is None:
+                if target != current:
+                    self.writes_avoided += 1
+            else:
+                self.writes += 1
+            return value
+
+    def step(self, state, current, target, dt):
+        """Law-specific update; returns a candidate value, or None inside the deadband."""
+        raise NotImplementedError
+
+    def reset(self, monitor_id=None):
+        """Drops per-monitor state (all monitors if None)."""
+        with self._lock:
+            if monitor_id is None:
+                self._state.clear()
+            else:
+                self._state.pop(monitor_id, None)
+
+    def stats(self):
+        return {
+            'law': type(self).__name__,
+            'updates': self.updates,
+            'writes': self.writes,
+            'writes_avoided': self.writes_avoided,
+        }
+
+
+class ThresholdLaw(ControlLaw):
+    """The original hysteresis: jump straight to the target once it is more than `deadband` away."""
+    def step(self, state, current, target, dt):
+        if abs(target - current) <= self.deadband:
+            return None
+        return target
+
+
+class EmaLaw(ControlLaw):
+    """
+    Exponential moving average of the target with time constant `time_constant`
+    seconds; writes when the filtered value drifts more than `deadband` from
+    the display. A target that has held steady (within `deadband`) for `hold`
+    seconds is taken as settled content and applied in one write, so a long
+    time constant can tame video without making window switches sluggish.
+    """
+    def __init__(self, time_constant=60.0, deadband=8, hold=10.0, clock=None):
+        super().__init__(deadband, clock)
+        self.time_constant = time_constant
+        self.hold = hold
+
+    def step(self, state, current, target, dt):
+        filtered = state.get('filtered')
+        if filtered is None:
+            filtered = float(current)
+        anchor = state.get('anchor')
+        if anchor is None or abs(target - anchor) > self.deadband:
+            state['anchor'], state['held'] = target, 0.0
+        else:
+            state['held'] += dt
+        if self.hold and state['held'] >= self.hold:
+            filtered = float(target)
+        elif self.time_constant > 0:
+            alpha = 1.0 - math.exp(-dt / self.time_constant) if dt > 0 else 0.0
+            filtered += alpha * (target - filtered)
+        else:
+            filtered = float(target)
+        state['filtered'] = filtered
+        if abs(filtered - current) <= self.deadband:
+            return None
+        return filtered
+
+
+class RateLimitedLaw(ControlLaw):
+    """
+    Ramps toward the target at most `max_rate` brightness units per second.
+    The ramp runs internally; the display is only written once the ramp is
+    more than `deadband` away from it, so a ramp costs one write per
+    `deadband` units instead of one per tick.
+    """
+    def __init__(self, max_rate=8.0, deadband=8, clock=None):
+        super().__init__(deadband, clock)
+        self.max_rate = max_rate
+
+    def step(self, state, current, target, dt):
+        limit = self.max_rate * dt
+        position = state.get('position')
+        if position is None or abs(position - current) > self.deadband + 1:
+            position = float(current)  # first tick, or the display was set by someone else
+        if abs(target - current) <= self.deadband:
+            state['position'] = position
+            return None
+        position += max(-limit, min(limit, target - position))
+        state['position'] = position
+        if abs(position - current) <= self.deadband and position != target:
+            return None
+        return position
+
+
+class PidLaw(ControlLaw):
+    """
+    Incremental PID on the error `target - current`, with a clamped integral
+    (anti-windup). Errors inside `deadband` leave the display alone and bleed
+    off the integral.
+    """
+    def __init__(self, kp=0.8, ki=0.05, kd=0.0, deadband=8, integral_limit=50.0, clock=None):
+        super().__init__(deadband, clock)
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.integral_limit = integral_limit
+
+    def step(self, state, current, target, dt):
+        error = target - current
+        integral = state.get('integral', 0.0)
+        previous = state.get('error')
+        state['error'] = error
+        if abs(error) <= self.deadband:
+            state['integral'] = integral * 0.5
+            return None
+        integral = max(-self.integral_limit, min(self.integral_limit, integral + error * dt))
+        state['integral'] = integral
+        derivative = (error - previous) / dt if previous is not None and dt > 0 else 0.0
+        value = current + self.kp * error + self.ki * integral + self.kd * derivative
+        if abs(value - current) <= self.deadband:
+            return None  # too small a correction to spend a write on; the integral keeps growing
+        return value
+
+
+def law_settings(config, threshold):
+    """The class and constructor arguments of the law named by config['control_law'] (default: threshold)."""
+    name = config.get('control_law', 'threshold')
+    deadband = config.get('control_deadband', 8)
+    if name == 'ema':
+        return EmaLaw, {'time_constant': config.get('control_time_constant', 60.0), 'deadband': deadband,
+                        'hold': config.get('control_hold', 10.0)}
+    if name == 'rate':
+        return RateLimitedLaw, {'max_rate': config.get('control_max_rate', 8.0), 'deadband': deadband}
+    if name == 'pid':
+        return PidLaw, {'kp': config.get('control_kp', 0.8), 'ki': config.get('control_ki', 0.05),
+                        'kd': config.get('control_kd', 0.0), 'deadband': deadband}
+    if name != 'threshold':
+        print(f"Unknown control law '{name}', falling back to 'threshold'.")
+    return ThresholdLaw, {'deadband': threshold}
+
+
+def create(config, threshold):
+    """Builds the control law named by config['control_law'] (default: threshold)."""
+    cls, settings = law_settings(config, threshold)
+    return cls(**settings)
+
+
+def reconfigure(law, config, threshold):
+    """
+    Applies new settings to `law` in place when the configured law is of the
+    same kind, keeping its per-monitor state and counters; otherwise returns
+    a newly built law.
+    """
+    cls, settings = law_settings(config, threshold)
+    if type(law) is not cls:
+        return cls(**settings)
+    with law._lock:
+        for name, value in settings.items():
+            setattr(law, name, value)
+    return law
+
+
+def settings_key(config, threshold):
+    """The config values a law depends on, to detect when it must be rebuilt."""
+    keys = ('control_law', 'control_deadband', 'control_time_constant', 'control_hold', 'control_max_rate',
+            'control_kp', 'control_ki', 'control_kd')
+    return (threshold,) + tuple(config.get(key) for key in keys)
@@ -0,0 +1,355 @@
+import json
+import os
+import threading
+
+
+def edid_base(edid):
+    """Normalised first 128-byte block of a hex EDID (what every source reports), or None."""
+    if not edid or not isinstance(edid, str):
+        return None
+    edid = ''.join(edid.split()).lower()
+    return edid[:256] if len(edid) >= 24 else None
+
+
+def edid_pnp(edid):
+    """Manufacturer + product code of a hex EDID, e.g. 'DEL40F0' (the Windows PnP id), or None."""
+    edid = edid_base(edid)
+    if edid is None:
+        return None
+    try:
+        raw = bytes.fromhex(edid[:24])
+    except ValueError:
+        return None
+    code = int.from_bytes(raw[8:10], 'big')
+    letters = ''.join(chr(((code >> shift) & 0x1F) + 64) for shift in (10, 5, 0))
+    return f"{letters}{int.from_bytes(raw[10:12], 'little'):04X}"
+
+
+def identity(entry):
+    """Join key of an output or brightness display: 'edid:<hex>', 'pnp:<id>' or None."""
+    edid = edid_base(entry.get('edid'))
+    if edid:
+        return f"edid:{edid}"
+    if entry.get('pnp'):
+        return f"pnp:{entry['pnp'].upper()}"
+    return None
+
+
+class Display:
+    """One monitor id: its capture region joined to its brightness handle."""
+    __slots__ = ('monitor_id', 'region', 'key', 'handle', 'name', 'joined_by')
+
+    def __init__(self, monitor_id, region=None, info=None, joined_by=None):
+        self.monitor_id = monitor_id
+        self.region = region  # mss-style dict, or None for a display the capture backend does not show
+        self.key = identity(info or {}) or identity(region or {})
+        self.handle = info.get('handle') if info else None
+        self.name = info.get('name') if info else None
+        self.joined_by = joined_by  # 'edid', 'pnp', 'order' or None (no brightness control)
+
+
+def join(outputs, infos):
+    """
+    Pairs capture outputs (monitor id order) with brightness displays: by
+    EDID first, then by PnP id (identical models pair in listing order),
+    then whatever is left by position, which is what the old index-based
+    mapping did for everything. Displays without a capture output get the
+    ids after the outputs. Returns a list of Display.
+    """
+    remaining = list(infos)
+    matched = [None] * len(outputs)
+    for kind in ('edid', 'pnp'):
+        for i, output in enumerate(outputs):
+            if matched[i] is not None:
+                continue
+            if kind == 'edid':
+                key = edid_base(output.get('edid'))
+                candidates = [info for info in remaining if key and edid_base(info.get('edid')) == key]
+            else:
+                key = (output.get('pnp') or edid_pnp(output.get('edid')) or '').upper()
+                candidates = [info for info in remaining if key and edid_pnp(info.get('edid')) == key]
+            if candidates:
+                matched[i] = (candidates[0], kind)
+                remaining.remove(candidates[0])
+    for i in range(len(outputs)):
+        if matched[i] is None and remaining:
+            matched[i] = (remaining.pop(0), 'order')
+    displays = [Display(i, output, *(matched[i] or (None, None))) for i, output in enumerate(outputs)]
+    displays += [Display(len(displays) + i, None, info, 'order') for i, info in enumerate(remaining)]
+    return displays
+
+
+class DisplayTopology:
+    """
+    Which display each monitor id captures from and writes to.
+
+    Monitor ids start out in the capture backend's monitor order (mss:
+    monitor id + 1 in sct.monitors) and then stick to their display for
+    the session (see _assign_ids()). Each capture output is joined to its
+    brightness handle by EDID or PnP id, so the two orderings no longer
+    have to agree (see join()).
+
+    Enumerating brightness displays is the slow part (seconds over
+    DDC/CI), so it happens once: results are kept per identity, and also
+    saved to `cache_path` so a restart on the same displays skips it. A
+    refresh re-reads only the cheap capture outputs and enumerates again
+    only when an output it has never seen appears, or when outputs carry
+    no identity. check() compares the backend's topology fingerprint and
+    refreshes only when it changed; the watcher thread calls it every
+    `poll_interval` seconds. When a display stops answering the controller
+    calls request_refresh() instead, which forgets that display's handle
+    and enumerates again even though the fingerprint is unchanged. `version` changes whenever a region or handle
+    does; listeners get the monitor ids now backed by a different display
+    (or none).
+    """
+    def __init__(self, capture_backend, brightness_backend, cache_path='', poll_interval=2.0):
+        self.capture_backend = capture_backend
+        self.brightness_backend = brightness_backend
+        self.cache_path = cache_path
+        self.poll_interval = poll_interval
+        self.displays = []
+        self.version = 0
+        self.listeners = []  # listener(changed_monitor_ids), called on the refreshing thread
+        self.refreshes = 0
+        self.enumerations = 0
+        self._known = {}  # identity -> brightness display info
+        self._ids = {}  # identity -> monitor id, kept for the session
+        self._fingerprint = None
+        self._captured = False  # whether the capture backend has ever reported outputs
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._checking = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._load_cache()
+
+    def _load_cache(self):
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path) as f:
+                infos = json.load(f).get('displays', [])
+        except (OSError, ValueError, AttributeError):
+            return
+        for info in infos:
+            key = identity(info)
+            if key and isinstance(info, dict) and 'handle' in info:
+                self._known[key] = info
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'displays': list(self._known.values())}, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except (OSError, TypeError) as e:
+            print(f"Failed to save display topology to {self.cache_path}: {e}")
+
+    def refresh(self):
+        """
+        Re-reads the outputs and re-joins them, enumerating brightness
+        displays only when needed. Returns the ids whose region or handle changed.
+        """
+        with self._lock:
+            try:
+                self._fingerprint = self.capture_backend.topology_fingerprint()
+                outputs = self.capture_backend.outputs()
+            except Exception as e:
+                print(f"Failed to list capture outputs: {e}")
+                outputs = []
+            keys = [identity(output) for output in outputs]
+            known = [self._lookup(key) for key in keys]
+            if outputs and all(known):
+                infos = known
+            else:
+                infos = self._enumerate()
+            self._captured = self._captured or bool(outputs)
+            displays = self._assign_ids(join(outputs, infos))
+            previous = self.displays
+            moved = [d.monitor_id for d in displays
+                     if d.monitor_id >= len(previous) or d.region != previous[d.monitor_id].region
+                     or d.handle != previous[d.monitor_id].handle]
+            moved += list(range(len(displays), len(previous)))
+            # Only a different display (or none) behind an id invalidates what was learnt about it.
+            changed = [monitor_id for monitor_id in moved
+                       if monitor_id >= len(displays) or monitor_id >= len(previous)
+                       or displays[monitor_id].handle != previous[monitor_id].handle]
+            self.refreshes += 1
+            if moved or not self._ready.is_set():
+                self.displays = displays
+                self.version += 1
+        self._ready.set()
+        if moved and previous:
+            print(f"Display topology changed: monitors {moved}.")
+            for listener in list(self.listeners):
+                listener(changed)
+        return moved
+
+    def _assign_ids(self, displays):
+        """
+        Keeps every display on the monitor id it first got this session, so
+        unplugging one monitor does not shift the others. Ids of displays
+        that are gone stay reserved (disconnected placeholders) until they
+        return; new displays take the lowest free id. On the first refresh
+        this is simply the capture order.
+        """
+        taken = {}
+        for display in displays:
+            monitor_id = self._ids.get(display.key)
+            if monitor_id is not None and monitor_id not in taken:
+                taken[monitor_id] = display
+        reserved = set(self._ids.values())
+        for position, display in enumerate(displays):
+            if any(d is display for d in taken.values()):
+                continue
+            if display.key is None and position not in taken and position not in reserved:
+                monitor_id = position  # no identity: keep the old positional mapping
+            else:
+                monitor_id = next(i for i in range(len(displays) + len(reserved) + 1)
+                                  if i not in taken and i not in reserved)
+            taken[monitor_id] = display
+            if display.key is not None:
+                self._ids[display.key] = monitor_id
+                reserved.add(monitor_id)
+        result = [Display(i) for i in range(max(taken, default=-1) + 1)]
+        for monitor_id, display in taken.items():
+            display.monitor_id = monitor_id
+            result[monitor_id] = display
+        return result
+
+    def _lookup(self, key):
+        if key is None:
+            return None
+        if key.startswith('pnp:'):
+            # Windows outputs only carry the PnP id; an EDID-keyed entry of that model matches.
+            matches = [info for info in self._known.values() if edid_pnp(info.get('edid')) == key[4:]]
+            return matches[0] if len(matches) == 1 else None
+        return self._known.get(key)
+
+    def _enumerate(self):
+        """Lists the brightness displays (slow) and remembers them by identity."""
+        try:
+            infos = self.brightness_backend.list_monitors_info()
+        except Exception as e:
+            print(f"Failed to enumerate monitors: {e}")
+            return []
+        self.enumerations += 1
+        for info in infos:
+            key = identity(info)
+            if key:
+                self._known[key] = info
+        self._save_cache()
+        return infos
+
+    def check(self):
+        """Refreshes if the topology fingerprint changed (cheap otherwise); returns the ids that moved."""
+        try:
+            fingerprint = self.capture_backend.topology_fingerprint()
+        except Exception:
+            return []
+        if fingerprint == self._fingerprint:
+            return []
+        return self.refresh()
+
+    def forget(self, monitor_id):
+        """Drops the remembered brightness display of a monitor id, so the next refresh enumerates it again."""
+        displays = self.displays
+        if not 0 <= monitor_id < len(displays):
+            return
+        display = displays[monitor_id]
+        with self._lock:
+            for key, info in list(self._known.items()):
+                if key == display.key or (display.handle is not None and info.get('handle') == display.handle):
+                    del self._known[key]
+
+    def request_refresh(self, monitor_id):
+        """
+        After a display stopped answering: forgets its handle and refreshes on
+        a background thread, never blocking. A stale handle (e.g. the display
+        was re-plugged) is then replaced even though the outputs look the same.
+        """
+        if self._checking.is_set():
+            return
+        self._checking.set()
+
+        def run():
+            try:
+                self.forget(monitor_id)
+                self.refresh()
+            finally:
+                self._checking.clear()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def wait(self, timeout=None):
+        """Blocks until the first refresh has finished."""
+        return self._ready.wait(timeout)
+
+    def display(self, monitor_id):
+        """The Display for a monitor id, or None (waits for the first refresh)."""
+        self._ready.wait()
+        displays = self.displays
+        return displays[monitor_id] if 0 <= monitor_id < len(displays) else None
+
+    def region(self, monitor_id, default=None):
+        """
+        Current capture region of a monitor id. Returns `default` until the
+        first refresh or while the capture backend has never reported
+        outputs (e.g. replays), and None when the monitor is disconnected.
+        """
+        displays = self.displays
+        if not self._captured:
+            return default
+        if 0 <= monitor_id < len(displays):
+            return displays[monitor_id].region
+        return None
+
+    def handles(self):
+        self._ready.wait()
+        return [d.handle for d in self.displays]
+
+    def configure(self, cache_path=None, poll_interval=None):
+        """Changes cache file and polling; a poll_interval of 0 stops the watcher."""
+        if cache_path is not None and cache_path != self.cache_path:
+            self.cache_path = cache_path
+            with self._lock:
+                self._load_cache()
+                if self.enumerations:
+                    self._save_cache()
+        if poll_interval is not None:
+            self.poll_interval = poll_interval
+        if self.poll_interval:
+            self.start()
+        else:
+            self.stop()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self):
+        self._ready.wait()
+        while not self._stop_event.wait(self.poll_interval or 1):
+            if self.poll_interval:
+                self.check()
+
+    def stats(self):
+        displays = self.displays
+        return {
+            'version': self.version,
+            'displays': {str(d.monitor_id): {'name': d.name, 'joined_by': d.joined_by, 'captured': d.region is not None}
+                         for d in displays},
+            'refreshes': self.refreshes,
+            'enumerations': self.enumerations,
+        }
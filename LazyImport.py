@@ -0,0 +1,49 @@
+"""
+Deferred imports. Heavy third-party modules (numpy, yaml, mss,
+screen_brightness_control) are bound with lazy_module() at module level
+throughout the app instead of imported, so launching the GUI, the daemon or
+a CLI's --help costs only what it actually uses; the import happens on the
+first attribute access.
+"""
+import importlib
+import threading
+
+_import_lock = threading.Lock()
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Lets modules keep `np.`/`sbc.`/`mss.` call sites unchanged while moving the
+    import cost off the startup path. The first access is serialised so
+    worker threads racing to use the module import it exactly once.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        """
+        Imports the module now. Underscored so it cannot shadow a module
+        attribute of the same name (numpy.load, yaml.load).
+        """
+        module = self._module
+        if module is None:
+            with _import_lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+                module = self._module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_module(name):
+    """Returns a LazyModule for `name`."""
+    return LazyModule(name)
@@ -0,0 +1,77 @@
+import LazyImport as LI
+
+np = LI.lazy_module('numpy')
+
+# Rec.709 luma weights laid out for mss' BGRA channel order (B, G, R).
+REC709_BGR = (0.0722, 0.7152, 0.2126)
+# Same weights in 8.8 fixed point so integer sums stay exact (54 + 183 + 19 = 256).
+REC709_BGR_FIXED = (19, 183, 54)
+
+# accuracy-vs-speed presets: (sampling, step, accumulation)
+ANALYSIS_MODES = {
+    'accurate': ('block', 1, 'int'),
+    'balanced': ('stride', 4, 'int'),
+    'fast': ('stride', 8, 'float32'),
+}
+
+
+class LuminanceEngine:
+    """
+    Computes mean Rec.709 luma of BGRA frames on a subsampled grid.
+
+    sampling='stride' reads every `step`-th pixel in both directions (cheapest),
+    sampling='block' averages every pixel of each step x step block, which is
+    exact but touches the whole frame. The alpha channel is summed alongside
+    (rows reduce faster with it in place) but never weighted.
+    """
+    def __init__(self, mode='balanced', step=None, sampling=None, accumulation=None):
+        self.configure(mode, step, sampling, accumulation)
+
+    def configure(self, mode='balanced', step=None, sampling=None, accumulation=None):
+        """Apply a preset from ANALYSIS_MODES, optionally overriding single fields."""
+        if mode not in ANALYSIS_MODES:
+            print(f"Unknown analysis mode '{mode}', falling back to 'balanced'.")
+            mode = 'balanced'
+        preset_sampling, preset_step, preset_accumulation = ANALYSIS_MODES[mode]
+        self.mode = mode
+        self.sampling = sampling or preset_sampling
+        self.step = max(1, int(step or preset_step))
+        self.accumulation = accumulation or preset_accumulation
+
+    def subsample(self, img):
+        """Returns the view that will be reduced. Stride sampling never copies."""
+        if self.sampling == 'stride' or self.step == 1:
+            return img[::self.step, ::self.step]
+        h, w = img.shape[:2]
+        # Crop to whole blocks; block means then equal the mean of the cropped frame.
+        return img[:h - h % self.step or h, :w - w % self.step or w]
+
+    def channel_sums(self, img):
+        """Returns (per-channel sums, pixel count) of the sampled pixels."""
+        sample = self.subsample(img)
+        count = sample.shape[0] * sample.shape[1]
+        # Reduce rows first: adding whole rows vectorises far better than a
+        # per-pixel reduction, and uint32 column sums cannot overflow below 16M rows.
+        if self.accumulation == 'float32':
+            sums = sample.sum(axis=0, dtype=np.float32).sum(axis=0)
+        else:
+            sums = sample.sum(axis=0, dtype=np.uint32).sum(axis=0, dtype=np.uint64)
+        return sums, count
+
+    def mean_luma(self, img):
+        """Calculates the mean luma (0-255) of a BGRA or BGR frame."""
+        sums, count = self.channel_sums(img)
+        if count == 0:
+            return 0.0
+        if self.accumulation == 'float32':
+            return float(np.dot(sums[:3], REC709_BGR)) / count
+        # Luma is linear, so the mean of per-pixel luma equals luma of the channel sums.
+        weighted = int(sums[0]) * REC709_BGR_FIXED[0] + int(sums[1]) * REC709_BGR_FIXED[1] \
+            + int(sums[2]) * REC709_BGR_FIXED[2]
+        return weighted / (256 * count)
+
+    @staticmethod
+    def center_view(img):
+        """Returns the center quarter of a frame as a view (no copy)."""
+        h, w = img.shape[:2]
+        return img[h//4:3*h//4, w//4:3*w//4]
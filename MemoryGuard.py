@@ -0,0 +1,141 @@
+import ctypes
+import gc
+import os
+import sys
+import threading
+
+MB = 1024 * 1024
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where it cannot be read."""
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == 'win32':
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                    'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+    return None
+
+
+def trim_heap():
+    """Returns freed heap pages to the OS where the C library supports it (glibc)."""
+    if not sys.platform.startswith('linux'):
+        return
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass  # musl and others have no malloc_trim
+
+
+class MemoryGuard:
+    """
+    Keeps this process's resident memory under `budget_mb`.
+
+    Every `interval` seconds the RSS is read. Over budget, the guard first
+    sheds what can be rebuilt: it calls `release` (the controller drops its
+    analysis scratch buffers and layouts), runs the garbage collector and
+    trims the C heap. If the process is still over budget for `grace`
+    consecutive checks, `on_exceeded(rss_bytes)` is called - the daemon exits
+    so its service manager restarts it, the GUI shows a warning. Analysis
+    worker processes (analysis_workers) are not counted. A budget of 0
+    disables the guard.
+    """
+    def __init__(self, release=None, budget_mb=0, interval=10.0, grace=3, on_exceeded=None):
+        self.release = release
+        self.budget_mb = budget_mb
+        self.interval = interval
+        self.grace = grace
+        self.on_exceeded = on_exceeded
+        self.rss = None
+        self.peak = 0
+        self.releases = 0
+        self.exceeded = 0
+        self._over = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def configure(self, budget_mb=None, interval=None):
+        """Changes budget and check interval; None keeps the current value. Starts or stops the thread."""
+        if budget_mb is not None:
+            self.budget_mb = budget_mb
+        if interval is not None:
+            self.interval = interval
+        if self.budget_mb:
+            self.start()
+        else:
+            self.stop()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        if current_rss() is None:
+            print("Memory budget is not supported on this platform; ignoring memory_budget_mb.")
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            if self.budget_mb:
+                self.check()
+
+    def check(self):
+        """Reads the RSS and enforces the budget once; returns the RSS in bytes."""
+        rss = current_rss()
+        if rss is None:
+            return None
+        budget = self.budget_mb * MB
+        if rss > budget:
+            self.releases += 1
+            if self.release:
+                try:
+                    self.release()
+                except Exception as e:
+                    print(f"Failed to release caches: {e}")
+            gc.collect()
+            trim_heap()
+            rss = current_rss() or rss
+        self.rss = rss
+        self.peak = max(self.peak, rss)
+        if rss <= budget:
+            self._over = 0
+            return rss
+        self._over += 1
+        if self._over >= self.grace:
+            self._over = 0
+            self.exceeded += 1
+            print(f"Memory use {rss / MB:.0f} MB is over the {self.budget_mb} MB budget.")
+            if self.on_exceeded:
+                self.on_exceeded(rss)
+        return rss
+
+    def stats(self):
+        return {
+            'budget_mb': self.budget_mb,
+            'rss_mb': round(self.rss / MB, 1) if self.rss else None,
+            'peak_mb': round(self.peak / MB, 1),
+            'releases': self.releases,
+            'exceeded': self.exceeded,
+        }
@@ -0,0 +1,201 @@
+import bisect
+import contextlib
+import http.server
+import json
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets; the last one catches the rest.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf'))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with count, sum and max."""
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """Upper bucket bound below which a fraction `q` of samples fall."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+            'buckets': {str(bound): n for bound, n in zip(LATENCY_BUCKETS, self.buckets)},
+        }
+
+
+class MetricsRegistry:
+    """
+    Per-monitor counters and stage latency histograms.
+
+    Stages recorded by BrightnessController: capture, analysis,
+    brightness_read and brightness_write. Components can register a stats()
+    callable with add_source() to have it included in snapshots.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (monitor_id, stage) -> Histogram
+        self._counters = {}    # (monitor_id, name) -> int
+        self._sources = {}
+        self.started = time.time()
+
+    def observe(self, stage, monitor_id, seconds):
+        with self._lock:
+            histogram = self._histograms.get((monitor_id, stage))
+            if histogram is None:
+                histogram = self._histograms[(monitor_id, stage)] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, monitor_id, n=1):
+        with self._lock:
+            self._counters[(monitor_id, name)] = self._counters.get((monitor_id, name), 0) + n
+
+    @contextlib.contextmanager
+    def timed(self, stage, monitor_id):
+        """Times the block as `stage`; exceptions also bump `<stage>_errors`."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.increment(f"{stage}_errors", monitor_id)
+            raise
+        finally:
+            self.observe(stage, monitor_id, time.perf_counter() - start)
+
+    def add_source(self, name, stats_fn):
+        """Includes stats_fn() under `name` in every snapshot."""
+        self._sources[name] = stats_fn
+
+    def snapshot(self):
+        """Returns all metrics as a JSON-serialisable dict."""
+        with self._lock:
+            monitors = {}
+            for (monitor_id, stage), histogram in self._histograms.items():
+                entry = monitors.setdefault(str(monitor_id), {'stages': {}, 'counters': {}})
+                entry['stages'][stage] = histogram.to_dict()
+            for (monitor_id, name), value in self._counters.items():
+                entry = monitors.setdefault(str(monitor_id), {'stages': {}, 'counters': {}})
+                entry['counters'][name] = value
+        result = {'timestamp': time.time(), 'uptime': time.time() - self.started, 'monitors': monitors}
+        for name, stats_fn in self._sources.items():
+            try:
+                result[name] = stats_fn()
+            except Exception as e:
+                result[name] = {'error': str(e)}
+        return result
+
+    def to_json(self, indent=None):
+        return json.dumps(self.snapshot(), indent=indent, default=str)
+
+
+class MetricsServer:
+    """Serves registry snapshots as JSON on http://127.0.0.1:<port>/metrics."""
+    def __init__(self, registry, port, host='127.0.0.1'):
+        registry_ref = registry
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry_ref.to_json().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep stdout for the app's own messages
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsDumper:
+    """Writes a registry snapshot to a JSON file every `interval` seconds."""
+    def __init__(self, registry, path, interval=60):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def dump(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.registry.to_json(indent=2))
+        os.replace(tmp_path, self.path)  # readers never see a half-written file
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.dump()
+            except OSError as e:
+                print(f"Failed to write metrics to {self.path}: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(timeout=1)
+        try:
+            self.dump()
+        except OSError:
+            pass
+
+
+def start_exporters(registry, config):
+    """Starts the endpoint/dumper enabled in config; returns them for stop()."""
+    exporters = []
+    port = config.get('metrics_port', 0)
+    if port:
+        try:
+            exporters.append(MetricsServer(registry, port).start())
+        except OSError as e:
+            print(f"Failed to start metrics endpoint on port {port}: {e}")
+    path = config.get('metrics_dump_path')
+    if path:
+        exporters.append(MetricsDumper(registry, path, config.get('metrics_dump_interval', 60)).start())
+    return exporters
@@ -1,38 +1,59 @@
 import threading
-import time
 
 class MonitorThread(threading.Thread):
-    def __init__(self, controller, monitor, monitor_id, config_frame, update_status_callback):
+    def __init__(self, controller, monitor, monitor_id, config_publisher, update_status_callback, scheduler=None):
         super().__init__(daemon=True)
         self.controller = controller
         self.monitor = monitor
         self.monitor_id = monitor_id
-        self.config_frame = config_frame
+        self.config_publisher = config_publisher  # ConfigPublisher, read without locks
         # self.use_center = use_center
         # self.interval = interval
         self.update_status_callback = update_status_callback
+        self.scheduler = scheduler  # AdaptiveScheduler, or None for fixed-interval polling
         self._running = True
+        self._stop_event = threading.Event()
 
     def run(self):
-        import mss  # Local import for thread safety with mss
-        with mss.mss() as sct:
+        last_config = None
+        config_version = None
+        try:
             while self._running:
                 try:
-                    config = self.config_frame.get_config()
-                    self.controller.update_user_config(config)
-
+                    config = last_config = self.config_publisher.current
+                    # Follows the display across hot-plugs; left out while it is disconnected.
+                    config_version, regions = self.controller.begin_tick(
+                        config, [self.scheduler] if self.scheduler else [], config_version,
+                        {self.monitor_id: self.monitor})
+                    if regions is None or self.monitor_id not in regions:
+                        if self.update_status_callback:
+                            state = 'paused' if regions is None else 'disconnected'
+                            self.update_status_callback(self.monitor_id, f"Monitor {self.monitor_id}: {state}")
+                        self._stop_event.wait(self.next_interval(last_config))
+                        continue
                     summary = self.controller.process_monitor(
-                        monitor=self.monitor,
+                        monitor=regions[self.monitor_id],
                         monitor_id=self.monitor_id,
-                        use_center=config['use_center']
+                        use_center=config.get('use_center', True),
+                        scheduler=self.scheduler
                     )
                     if self.update_status_callback:
                         status_text = f"Monitor {self.monitor_id}: {int(summary['desired_brightness'])} (auto)"
                         self.update_status_callback(self.monitor_id, status_text)
                 except Exception as e:
+                    self.controller.metrics.increment('errors', self.monitor_id)
                     if self.update_status_callback:
                         self.update_status_callback(self.monitor_id, f"Error: {e}")
-                time.sleep(config['interval'])
+                self._stop_event.wait(self.next_interval(last_config))
+        finally:
+            self.controller.capture.close()  # release this thread's capture session
+
+    def next_interval(self, config):
+        """Seconds to sleep before the next tick."""
+        if self.scheduler:
+            return self.scheduler.interval
+        return config.get('interval', 1) if config else 1
 
     def stop(self):
         self._running = False
+        self._stop_event.set()
@@ -0,0 +1,77 @@
+import threading
+
+class MultiplexThread(threading.Thread):
+    """
+    Drives every selected monitor from a single capture per tick.
+
+    Grabs the bounding box of the selected monitors once (sct.monitors[0] when
+    all are selected), slices per-monitor views out of it without copying and
+    hands them to the controller in one pass, replacing one MonitorThread and
+    one capture call per monitor. The box is recomputed when the display
+    topology changes; disconnected monitors are left out until they return.
+    """
+    def __init__(self, controller, monitors, config_publisher, update_status_callback, schedulers=None):
+        super().__init__(daemon=True)
+        self.controller = controller
+        self.monitors = monitors  # {monitor_id: mss monitor dict}
+        self.config_publisher = config_publisher  # ConfigPublisher, read without locks
+        self.update_status_callback = update_status_callback
+        self.schedulers = schedulers or {}  # {monitor_id: AdaptiveScheduler}
+        self._running = True
+        self._stop_event = threading.Event()
+
+    def run(self):
+        monitors = region = None
+        last_config = None
+        config_version = None
+        try:
+            while self._running:
+                try:
+                    config = last_config = self.config_publisher.current
+                    config_version, regions = self.controller.begin_tick(
+                        config, self.schedulers.values(), config_version, self.monitors)
+                    if regions is None:
+                        if self.update_status_callback:
+                            for monitor_id in self.monitors:
+                                self.update_status_callback(monitor_id, f"Monitor {monitor_id}: paused")
+                        self._stop_event.wait(self.next_interval(last_config))
+                        continue
+                    if regions != monitors:
+                        # Hot-plug: recompute the capture box from the monitors still connected.
+                        monitors = regions
+                        region = self.controller.capture.bounding_region(list(monitors.values())) if monitors else None
+                    if self.update_status_callback:
+                        for monitor_id in self.monitors.keys() - monitors.keys():
+                            self.update_status_callback(monitor_id, f"Monitor {monitor_id}: disconnected")
+                    if not monitors:
+                        self._stop_event.wait(self.next_interval(last_config))
+                        continue
+
+                    frame = self.controller.grab_region(region)
+                    views = {
+                        monitor_id: self.controller.capture.split(frame, region, monitor, config.get('use_center', True))
+                        for monitor_id, monitor in monitors.items()
+                    }
+                    summaries = self.controller.process_frames(views, self.schedulers)
+                    if self.update_status_callback:
+                        for monitor_id, summary in summaries.items():
+                            status_text = f"Monitor {monitor_id}: {int(summary['desired_brightness'])} (auto)"
+                            self.update_status_callback(monitor_id, status_text)
+                except Exception as e:
+                    self.controller.metrics.increment('errors', 'all')
+                    if self.update_status_callback:
+                        for monitor_id in self.monitors:
+                            self.update_status_callback(monitor_id, f"Error: {e}")
+                self._stop_event.wait(self.next_interval(last_config))
+        finally:
+            self.controller.capture.close()  # release this thread's capture session
+
+    def next_interval(self, config):
+        """Seconds to sleep; the most active monitor sets the pace."""
+        if self.schedulers:
+            return min(scheduler.interval for scheduler in self.schedulers.values())
+        return config.get('interval', 1) if config else 1
+
+    def stop(self):
+        self._running = False
+        self._stop_event.set()
@@ -0,0 +1,116 @@
+import copy
+import LazyImport as LI
+
+np = LI.lazy_module('numpy')
+
+LEVELS = 256
+
+
+def lightness(luminance):
+    """CIE L* of relative luminance (0-1), scaled to 0-1; works on scalars and arrays."""
+    if isinstance(luminance, float):
+        if luminance > 216 / 24389:
+            return 1.16 * luminance ** (1 / 3) - 0.16
+        return luminance * 24389 / 2700
+    return np.where(luminance > 216 / 24389, 1.16 * np.cbrt(luminance) - 0.16, luminance * 24389 / 2700)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def valid_curves(curves):
+    """Config check for response_curves: {monitor id or 'default': {gamma, backlight, table}}."""
+    for key, spec in curves.items():
+        if key != 'default' and not (isinstance(key, int) or (isinstance(key, str) and key.isdigit())):
+            return False
+        if not isinstance(spec, dict) or set(spec) - {'gamma', 'backlight', 'table'}:
+            return False
+        if 'gamma' in spec and not (_is_number(spec['gamma']) and spec['gamma'] > 0):
+            return False
+        points = spec.get('backlight', [[0, 0], [100, 1]])
+        if (not isinstance(points, (list, tuple)) or len(points) < 2
+                or not all(isinstance(p, (list, tuple)) and len(p) == 2 and all(map(_is_number, p)) for p in points)):
+            return False
+        settings, outputs = [p[0] for p in points], [p[1] for p in points]
+        if (any(b <= a for a, b in zip(settings, settings[1:])) or any(b < a for a, b in zip(outputs, outputs[1:]))
+                or outputs[0] < 0 or outputs[-1] <= outputs[0] or settings[0] < 0 or settings[-1] > 100):
+            return False
+        table = spec.get('table')
+        if table is not None and (len(table) != LEVELS or not all(isinstance(v, int) and 0 <= v <= 100 for v in table)):
+            return False
+    return True
+
+
+class ResponseCurve:
+    """
+    One monitor's calibrated mapping from screen content to a brightness
+    setting, as two 256-entry tables built when the settings change.
+
+    `luminance[v]` is the light the panel emits for pixel level v, relative
+    to white: (v / 255) ** gamma. A frame's tile means go through it (one
+    np.take), are averaged under the metering weights as light rather than
+    as pixel values, and the result's CIE lightness gives the perceived
+    level, 0-255. Averaging pixel values instead underrates bright detail on
+    dark backgrounds, which is what made thresholds need to be high.
+
+    `target[level]` is the setting to use for content of that level: the
+    backlight's perceived lightness falls linearly from max_brightness (black
+    content) to min_brightness (white), mapped back to settings through the
+    panel's measured `backlight` response, [[setting, relative light], ...]
+    (default: light proportional to the setting). A calibration tool can
+    supply the 256 settings directly as `table`; they are clamped to
+    min/max_brightness.
+    """
+    def __init__(self, min_brightness=0, max_brightness=100, gamma=2.2, backlight=None, table=None):
+        self.gamma = gamma
+        self.luminance = (np.arange(LEVELS) / (LEVELS - 1)) ** gamma
+        if table is None:
+            table = self.build_targets(min_brightness, max_brightness, backlight or [[0, 0], [100, 1]])
+        self.target = tuple(min(max(int(value), min_brightness), max_brightness) for value in table)
+        self._rounded = self._index = self._light = None  # per-monitor scratch, shaped like the tile grid
+
+    @classmethod
+    def from_config(cls, spec, min_brightness, max_brightness):
+        return cls(min_brightness, max_brightness, spec.get('gamma', 2.2), spec.get('backlight'), spec.get('table'))
+
+    @staticmethod
+    def build_targets(min_brightness, max_brightness, backlight):
+        """Settings for each perceived content level (see the class docstring)."""
+        points = np.asarray(backlight, dtype=np.float64)
+        settings = np.arange(101, dtype=np.float64)
+        light = np.interp(settings, points[:, 0], points[:, 1]) / points[-1, 1]
+        perceived = np.maximum.accumulate(lightness(np.clip(light, 0.0, 1.0)))
+        high, low = perceived[max_brightness], perceived[min_brightness]
+        wanted = high - np.arange(LEVELS) / (LEVELS - 1) * (high - low)
+        # The inverse of the backlight response; flat stretches map to their first setting.
+        levels, first = np.unique(perceived, return_index=True)
+        return np.rint(np.interp(wanted, levels, settings[first])).astype(int)
+
+    def fork(self):
+        """The same tables with scratch buffers of its own, for another monitor's thread."""
+        curve = copy.copy(self)
+        curve._rounded = curve._index = curve._light = None
+        return curve
+
+    def level(self, metered):
+        """
+        Perceived lightness (0-255) of a frame's metered tiles and weights.
+        Statistics without tiles (a replayed trace records levels) are taken
+        as a level already. Allocates nothing once the tile grid is known.
+        """
+        tiles, weights = metered.get('tiles'), metered.get('weights')
+        if tiles is None or weights is None:
+            return metered['mean']
+        if self._index is None or self._index.shape != tiles.shape:
+            self._rounded = np.empty(tiles.shape, dtype=np.float64)
+            self._index = np.empty(tiles.shape, dtype=np.uint8)
+            self._light = np.empty(tiles.shape, dtype=np.float64)
+        np.rint(tiles, out=self._rounded)
+        np.copyto(self._index, self._rounded, casting='unsafe')
+        np.take(self.luminance, self._index, out=self._light)
+        return (LEVELS - 1) * lightness(float(np.vdot(self._light, weights)))
+
+    def target_for(self, level):
+        """Brightness setting for a perceived level: one table lookup."""
+        return self.target[min(LEVELS - 1, max(0, int(level + 0.5)))]
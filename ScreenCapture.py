@@ -0,0 +1,70 @@
+import threading
+import Backends as BK
+
+
+class ScreenCapture:
+    """
+    Grabs monitor regions as BGRA numpy views through a CaptureBackend
+    (mss by default). With use_center only the center quarter is requested
+    from the backend, a quarter of the full-frame bytes.
+    """
+    def __init__(self, backend=None):
+        self.backend = backend or BK.MssCaptureBackend()
+        self._lock = threading.Lock()
+        self.grabs = 0
+        self.bytes_captured = 0
+
+    def monitors(self):
+        """Returns mss-style monitor dicts; index 0 is the combined virtual screen."""
+        return self.backend.monitors()
+
+    def close(self):
+        """Releases the calling thread's capture session, if it has one."""
+        self.backend.close()
+
+    @staticmethod
+    def center_region(monitor):
+        """Returns the center quarter of a monitor as an mss region."""
+        w, h = monitor['width'], monitor['height']
+        return {
+            'left': monitor['left'] + w // 4,
+            'top': monitor['top'] + h // 4,
+            'width': 3 * w // 4 - w // 4,
+            'height': 3 * h // 4 - h // 4,
+        }
+
+    def grab(self, monitor, use_center=False, sct=None):
+        """Captures the monitor (or its center quarter) without copying the pixels."""
+        region = self.center_region(monitor) if use_center else monitor
+        frame = self.backend.grab(region, sct)
+        with self._lock:
+            self.grabs += 1
+            self.bytes_captured += frame.nbytes
+        return frame
+
+    @staticmethod
+    def bounding_region(monitors):
+        """Returns the smallest region covering all the given mss monitors."""
+        left = min(m['left'] for m in monitors)
+        top = min(m['top'] for m in monitors)
+        right = max(m['left'] + m['width'] for m in monitors)
+        bottom = max(m['top'] + m['height'] for m in monitors)
+        return {'left': left, 'top': top, 'width': right - left, 'height': bottom - top}
+
+    def split(self, frame, region, monitor, use_center=False):
+        """Returns one monitor's (or its center quarter's) view into a combined grab."""
+        if use_center:
+            monitor = self.center_region(monitor)
+        top = monitor['top'] - region['top']
+        left = monitor['left'] - region['left']
+        return frame[top:top + monitor['height'], left:left + monitor['width']]
+
+    def stats(self):
+        """Returns capture counters, including average bytes per grab."""
+        with self._lock:
+            grabs, captured = self.grabs, self.bytes_captured
+        return {
+            'grabs': grabs,
+            'bytes_captured': captured,
+            'bytes_per_grab': captured / grabs if grabs else 0,
+        }
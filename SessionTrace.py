@@ -0,0 +1,179 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import LazyImport as LI
+
+np = LI.lazy_module('numpy')
+
+TRACE_MAGIC = b'ABTRACE1'
+# magic, header size, record size, record count, creation time (epoch seconds)
+HEADER_FORMAT = '<8sIIQd'
+HEADER_SIZE = 64
+COUNT_OFFSET = struct.calcsize('<8sII')
+GROW_RECORDS = 4096  # records added to the file each time it fills up
+
+# One tick (40 bytes); an unchanged frame that was not re-analysed repeats the
+# previous luma. written is -1 when the control law left the display alone;
+# write_latency is NaN until the display has completed a write; flags is
+# reserved and always 0 in version 1. For monitors with a response curve, luma
+# is the perceived level the curve's table was indexed with.
+TRACE_FIELDS = [
+    ('time', '<f8'),
+    ('monitor', '<i4'),
+    ('luma', '<f4'),
+    ('p10', '<f4'),
+    ('p50', '<f4'),
+    ('p90', '<f4'),
+    ('current', '<i2'),
+    ('desired', '<i2'),
+    ('written', '<i2'),
+    ('flags', '<u2'),
+    ('write_latency', '<f4'),
+]
+
+
+def trace_dtype():
+    return np.dtype(TRACE_FIELDS)
+
+
+class TraceRecorder:
+    """
+    Appends one fixed-size record per tick to a memory-mapped file.
+
+    The file is grown GROW_RECORDS at a time and the record count in the
+    header is updated after every record, so a trace cut short by a crash is
+    still readable up to its last complete tick. Reopening an existing trace
+    appends to it.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.dtype = trace_dtype()
+        self._lock = threading.Lock()
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE
+        self._file = open(path, 'r+b' if exists else 'w+b')
+        if exists:
+            magic, header_size, record_size, self.count, _ = struct.unpack_from(
+                HEADER_FORMAT, self._file.read(HEADER_SIZE))
+            if magic != TRACE_MAGIC or header_size != HEADER_SIZE or record_size != self.dtype.itemsize:
+                self._file.close()
+                raise ValueError(f"{path} is not a compatible brightness trace.")
+        else:
+            self.count = 0
+            self._file.write(struct.pack(HEADER_FORMAT, TRACE_MAGIC, HEADER_SIZE, self.dtype.itemsize, 0,
+                                         time.time()).ljust(HEADER_SIZE, b'\0'))
+        self._map(max(self.count + GROW_RECORDS, GROW_RECORDS))
+
+    def _map(self, capacity):
+        """(Re)maps the file with room for `capacity` records."""
+        self._records = None
+        if getattr(self, '_mmap', None) is not None:
+            self._mmap.close()
+        self._file.truncate(HEADER_SIZE + capacity * self.dtype.itemsize)
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        self.capacity = capacity
+        self._records = np.ndarray((capacity,), dtype=self.dtype, buffer=self._mmap, offset=HEADER_SIZE)
+
+    def record(self, monitor_id, summary, written=None, write_latency=None, timestamp=None):
+        """Appends one tick from a process_frame summary."""
+        percentiles = summary.get('percentiles') or {}
+        row = (
+            time.time() if timestamp is None else timestamp,
+            monitor_id,
+            summary['Screen_background'],
+            percentiles.get(10, np.nan),
+            percentiles.get(50, np.nan),
+            percentiles.get(90, np.nan),
+            summary['current_brightness'],
+            summary['desired_brightness'],
+            -1 if written is None else written,
+            0,
+            np.nan if write_latency is None else write_latency,
+        )
+        with self._lock:
+            if self._mmap is None:
+                return
+            if self.count == self.capacity:
+                self._map(self.capacity + GROW_RECORDS)
+            self._records[self.count] = row
+            self.count += 1
+            struct.pack_into('<Q', self._mmap, COUNT_OFFSET, self.count)
+
+    def stats(self):
+        return {'path': self.path, 'records': self.count, 'bytes': HEADER_SIZE + self.count * self.dtype.itemsize}
+
+    def close(self):
+        """Trims the preallocated tail and closes the file."""
+        with self._lock:
+            if self._mmap is None:
+                return
+            self._records = None
+            self._mmap.close()
+            self._mmap = None
+            self._file.truncate(HEADER_SIZE + self.count * self.dtype.itemsize)
+            self._file.close()
+
+
+def load(path):
+    """Returns the records of a trace as a read-only structured numpy array (memory-mapped)."""
+    with open(path, 'rb') as f:
+        magic, header_size, record_size, count, _ = struct.unpack_from(HEADER_FORMAT, f.read(HEADER_SIZE))
+    dtype = trace_dtype()
+    if magic != TRACE_MAGIC or record_size != dtype.itemsize:
+        raise ValueError(f"{path} is not a compatible brightness trace.")
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=header_size, shape=(count,))
+
+
+class ReplayClock:
+    """Clock for the control law during replay; set to each record's timestamp."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def replay(records, controller, display, closed_loop=False, speed=None):
+    """
+    Feeds recorded ticks back through `controller` (built on `display`, a
+    SimulatedDisplay with one entry per recorded monitor) and returns
+    (desired, written) arrays aligned with `records`, written being -1 where
+    the replayed control law did not write.
+
+    Open loop (default), every tick sees the recorded current brightness, so
+    with the recorded settings the decisions must match the recording exactly.
+    Closed loop, each monitor starts at its first recorded brightness and then
+    follows the replayed decisions, with fades applied instantly; use it to
+    see what other settings would have done. Runs as fast as possible unless
+    `speed` (x real time) is given.
+    """
+    clock = ReplayClock()
+    controller.control_law.clock = clock
+    controller.actuator.fade_interval = 0
+    controller.actuator.min_spacing = 0
+    desired = np.empty(len(records), dtype=np.int16)
+    written = np.full(len(records), -1, dtype=np.int16)
+    started = {}
+    wall_start = time.perf_counter()
+    first_time = float(records['time'][0]) if len(records) else 0.0
+    for i, record in enumerate(records):
+        monitor_id = int(record['monitor'])
+        clock.now = float(record['time'])
+        if speed:
+            delay = (clock.now - first_time) / speed - (time.perf_counter() - wall_start)
+            if delay > 0:
+                time.sleep(delay)
+        if not closed_loop or monitor_id not in started:
+            started[monitor_id] = True
+            display.brightness[display.names[monitor_id]] = int(record['current'])
+            controller.brightness_cache.set(monitor_id, int(record['current']))
+        percentiles = {10: float(record['p10']), 50: float(record['p50']), 90: float(record['p90'])}
+        summary = controller.apply_metered({'mean': float(record['luma']), 'percentiles': percentiles}, monitor_id)
+        controller.actuator.wait_idle()
+        desired[i] = summary['desired_brightness']
+        if summary['written'] is not None:
+            written[i] = summary['written']
+    return desired, written
@@ -0,0 +1,209 @@
+import hashlib
+import threading
+import time
+import Backends as BK
+import LazyImport as LI
+
+np = LI.lazy_module('numpy')
+
+# (height, width) of common panel resolutions
+RESOLUTIONS = {
+    '1080p': (1080, 1920),
+    '1440p': (1440, 2560),
+    '4K': (2160, 3840),
+    '5K': (2880, 5120),
+    '8K': (4320, 7680),
+}
+
+
+def simulated_edid(name):
+    """A 128-byte EDID (hex) with manufacturer 'SIM' and product/serial derived from `name`."""
+    digest = hashlib.sha1(name.encode()).digest()
+    manufacturer = ((ord('S') - 64) << 10 | (ord('I') - 64) << 5 | (ord('M') - 64)).to_bytes(2, 'big')
+    edid = bytes.fromhex('00ffffffffffff00') + manufacturer + digest[:6]
+    return (edid + bytes(128 - len(edid))).hex()
+
+
+def solid_frame(height, width, level):
+    """Opaque BGRA frame filled with one gray level."""
+    frame = np.empty((height, width, 4), dtype=np.uint8)
+    frame[..., :3] = level
+    frame[..., 3] = 255
+    return frame
+
+
+class FrameSource:
+    """Synthetic screen content for one monitor; frame(t) returns a BGRA array."""
+    def __init__(self, resolution='1080p'):
+        self.height, self.width = RESOLUTIONS.get(resolution, resolution)
+
+    def frame(self, t):
+        raise NotImplementedError
+
+
+class StaticFrameSource(FrameSource):
+    """Content that never changes (an idle desktop)."""
+    def __init__(self, resolution='1080p', level=200):
+        super().__init__(resolution)
+        self._frame = solid_frame(self.height, self.width, level)
+
+    def frame(self, t):
+        return self._frame
+
+
+class GradientFrameSource(FrameSource):
+    """Static horizontal dark-to-bright gradient."""
+    def __init__(self, resolution='1080p'):
+        super().__init__(resolution)
+        ramp = np.linspace(0, 255, self.width, dtype=np.float32).astype(np.uint8)
+        self._frame = np.empty((self.height, self.width, 4), dtype=np.uint8)
+        self._frame[..., :3] = ramp[None, :, None]
+        self._frame[..., 3] = 255
+
+    def frame(self, t):
+        return self._frame
+
+
+class FlickerFrameSource(FrameSource):
+    """
+    Video-like content: cuts between gray `levels` every `scene_length`
+    seconds, each scene offset by up to +/-`flicker` levels. One frame per
+    scene is pre-rendered so generating content does not show up in pipeline
+    measurements (and 8K stays within a few hundred MB).
+    """
+    def __init__(self, resolution='1080p', levels=(30, 220, 90, 160), scene_length=2.0,
+                 flicker=12, seed=0):
+        super().__init__(resolution)
+        rng = np.random.default_rng(seed)
+        self.scene_length = scene_length
+        self._frames = []
+        for level in levels:
+            jitter = int(rng.integers(-flicker, flicker + 1)) if flicker else 0
+            self._frames.append(solid_frame(self.height, self.width, int(np.clip(level + jitter, 0, 255))))
+
+    def frame(self, t):
+        scene = int(t / self.scene_length) % len(self._frames)
+        return self._frames[scene]
+
+
+class SimulatedCapture(BK.CaptureBackend):
+    """
+    Capture backend over FrameSources laid out left to right.
+
+    Regions inside a single monitor are returned as views of the source frame
+    (zero-copy, like the mss backend); regions spanning monitors are composed
+    into a new array. `clock` supplies the content time in seconds. Outputs
+    carry the EDID of the SimulatedDisplay entry with the same name, and
+    set_sources() swaps monitors in and out like a hot-plug.
+    """
+    def __init__(self, sources, clock=None, names=None):
+        self.clock = clock or time.monotonic
+        self.set_sources(sources, names)
+
+    def set_sources(self, sources, names=None):
+        """Replaces the monitors; `names` default to SimulatedDisplay's 'Simulated Display <i>'."""
+        sources = list(sources)
+        monitors = []
+        left = 0
+        for source in sources:
+            monitors.append({'left': left, 'top': 0, 'width': source.width, 'height': source.height})
+            left += source.width
+        monitors.insert(0, {
+            'left': 0, 'top': 0, 'width': left,
+            'height': max((s.height for s in sources), default=0),
+        })
+        self.names = list(names) if names is not None else [f"Simulated Display {i}" for i in range(len(sources))]
+        self.sources, self._monitors = sources, monitors
+
+    def monitors(self):
+        return self._monitors
+
+    def outputs(self):
+        return [dict(monitor, edid=simulated_edid(name)) for monitor, name in zip(self._monitors[1:], self.names)]
+
+    def grab(self, region, sct=None):
+        t = self.clock()
+        right, bottom = region['left'] + region['width'], region['top'] + region['height']
+        pieces = []
+        for monitor, source in zip(self._monitors[1:], self.sources):
+            x0, x1 = max(region['left'], monitor['left']), min(right, monitor['left'] + monitor['width'])
+            y0, y1 = max(region['top'], monitor['top']), min(bottom, monitor['top'] + monitor['height'])
+            if x0 < x1 and y0 < y1:
+                pieces.append((monitor, source, x0, x1, y0, y1))
+        if len(pieces) == 1:
+            monitor, source, x0, x1, y0, y1 = pieces[0]
+            if (x0, x1, y0, y1) == (region['left'], right, region['top'], bottom):
+                return source.frame(t)[y0 - monitor['top']:y1 - monitor['top'],
+                                       x0 - monitor['left']:x1 - monitor['left']]
+        out = np.zeros((region['height'], region['width'], 4), dtype=np.uint8)
+        for monitor, source, x0, x1, y0, y1 in pieces:
+            out[y0 - region['top']:y1 - region['top'], x0 - region['left']:x1 - region['left']] = \
+                source.frame(t)[y0 - monitor['top']:y1 - monitor['top'], x0 - monitor['left']:x1 - monitor['left']]
+        return out
+
+
+class SimulatedDisplay(BK.BrightnessBackend):
+    """
+    In-memory brightness hardware for `count` displays.
+
+    Each read/write sleeps for the configured latency, like a DDC/CI round
+    trip, and is counted so benchmarks can report hardware traffic. Names
+    added to `failing` raise on every write; writes to names in `hung` block
+    until `release` is set, like a display that stopped answering. plug()
+    and unplug() add and remove displays.
+    """
+    def __init__(self, count=1, brightness=50, read_latency=0.0, write_latency=0.0):
+        self.names = [f"Simulated Display {i}" for i in range(count)]
+        self.brightness = {name: brightness for name in self.names}
+        self.read_latency = read_latency
+        self.write_latency = write_latency
+        self.reads = 0
+        self.writes = 0
+        self.enumerations = 0
+        self.failing = set()
+        self.hung = set()
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def list_monitors(self):
+        return list(self.names)
+
+    def list_monitors_info(self):
+        with self._lock:
+            self.enumerations += 1
+        return [{'handle': name, 'name': name, 'serial': simulated_edid(name)[16:32], 'edid': simulated_edid(name)}
+                for name in list(self.names)]
+
+    def plug(self, name, brightness=50):
+        with self._lock:
+            self.names.append(name)
+            self.brightness[name] = brightness
+
+    def unplug(self, name):
+        with self._lock:
+            self.names.remove(name)
+            self.brightness.pop(name, None)
+
+    def _check(self, display):
+        if display not in self.brightness:
+            raise ValueError(f"Display {display} not found.")
+
+    def get_brightness(self, display):
+        self._check(display)
+        if self.read_latency:
+            time.sleep(self.read_latency)
+        with self._lock:
+            self.reads += 1
+            return self.brightness[display]
+
+    def set_brightness(self, value, display):
+        self._check(display)
+        if display in self.hung:
+            self.release.wait()
+        if display in self.failing:
+            raise ValueError(f"Display {display} did not acknowledge the write.")
+        if self.write_latency:
+            time.sleep(self.write_latency)
+        with self._lock:
+            self.writes += 1
+            self.brightness[display] = max(0, min(100, int(value)))
@@ -0,0 +1,219 @@
+import threading
+import LazyImport as LI
+import LuminanceEngine as LE
+
+np = LI.lazy_module('numpy')
+
+METERING_MODES = ('average', 'center', 'center_weighted', 'exclude_edges', 'exclude_taskbar')
+
+
+def metering_mask(metering, rows, cols):
+    """Relative (rows, cols) tile weights of a metering mode, before pixel counts are applied."""
+    weights = np.ones((rows, cols), dtype=np.float64)
+    if metering == 'center':
+        # Middle half of the tiles in each direction: the old center quarter.
+        weights[:] = 0.0
+        weights[rows//4:rows - rows//4, cols//4:cols - cols//4] = 1.0
+    elif metering == 'center_weighted':
+        y = (np.arange(rows) + 0.5) / rows - 0.5
+        x = (np.arange(cols) + 0.5) / cols - 0.5
+        weights = np.exp(-(y[:, None] ** 2 + x[None, :] ** 2) / (2 * 0.25 ** 2))
+    elif metering == 'exclude_edges':
+        if rows > 2 and cols > 2:
+            weights[[0, -1], :] = 0.0
+            weights[:, [0, -1]] = 0.0
+    elif metering == 'exclude_taskbar':
+        if rows > 1:
+            weights[-1, :] = 0.0
+    return weights
+
+
+class TileLayout:
+    """Tile boundaries, pixel counts and normalised metering weights for one sample size."""
+    __slots__ = ('row_starts', 'row_ends', 'col_starts', 'counts', 'weights', 'active', 'active_weights')
+
+    def __init__(self, height, width, rows, cols, metering):
+        rows, cols = max(1, min(rows, height)), max(1, min(cols, width))
+        self.row_starts = (np.arange(rows) * height) // rows
+        self.col_starts = (np.arange(cols) * width) // cols
+        self.row_ends = tuple(int(end) for end in np.append(self.row_starts[1:], height))
+        row_sizes = np.diff(np.append(self.row_starts, height))
+        col_sizes = np.diff(np.append(self.col_starts, width))
+        self.counts = np.outer(row_sizes, col_sizes).astype(np.float64)
+        # Weighting by pixel count makes 'average' exactly the full-frame mean.
+        weights = metering_mask(metering, rows, cols) * self.counts
+        if not weights.any():
+            weights = self.counts.copy()
+        self.weights = weights / weights.sum()
+        self.active = np.flatnonzero(self.weights)  # tiles that take part in percentiles
+        self.active_weights = self.weights.ravel()[self.active]
+
+
+class TileStats:
+    """Result of TileAnalyser.analyse; also readable as stats['mean'] etc."""
+    __slots__ = ('mean', 'percentiles', 'tiles', 'weights')
+
+    def __init__(self, mean=0.0, percentiles=None, tiles=None, weights=None):
+        self.mean = mean
+        self.percentiles = {} if percentiles is None else percentiles
+        self.tiles = tiles
+        self.weights = weights  # the layout's metering weights of `tiles` (sum to 1)
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+
+class TileScratch:
+    """
+    Buffers for analysing one caller's frames of one layout: every
+    intermediate array is written with out=, and the same TileStats (with
+    the same percentiles dict) is returned each time.
+    """
+    __slots__ = ('layout', 'bands', 'band_views', 'sums', 'coefficients', 'luma', 'divisor', 'tiles', 'values', 'scaled',
+                 'keys', 'indices', 'order', 'sorted_values', 'sorted_weights', 'cumulative', 'stats')
+
+    def __init__(self, layout, width, channels, dtype):
+        rows, cols = layout.counts.shape
+        exact = dtype is not np.float32
+        self.layout = layout
+        self.bands = np.empty((rows, width, channels), dtype=dtype)
+        self.band_views = [self.bands[i] for i in range(rows)]
+        # Tiles are summed in the band dtype, so reduceat never casts the bands.
+        self.sums = np.empty((rows, cols, channels), dtype=dtype)
+        self.coefficients = np.asarray(LE.REC709_BGR_FIXED if exact else LE.REC709_BGR,
+                                       dtype=np.uint64 if exact else np.float32)
+        self.luma = np.empty((rows, cols), dtype=self.coefficients.dtype)
+        # 8.8 fixed point sums carry a factor of 256
+        self.divisor = layout.counts * 256.0 if exact else layout.counts
+        self.tiles = np.empty((rows, cols), dtype=np.float64)
+        active = len(layout.active)
+        self.values = np.empty(active, dtype=np.float64)
+        self.scaled = np.empty(active, dtype=np.float64)
+        self.keys = np.empty(active, dtype=np.int64)
+        self.indices = np.arange(active, dtype=np.int64)
+        self.order = np.empty(active, dtype=np.int64)
+        self.sorted_values = np.empty(active, dtype=np.float64)
+        self.sorted_weights = np.empty(active, dtype=np.float64)
+        self.cumulative = np.empty(active, dtype=np.float64)
+        self.stats = TileStats(tiles=self.tiles, weights=layout.weights)
+
+
+class TileAnalyser:
+    """
+    Per-tile mean luma of a frame in one reduction pass, on the same sampled
+    grid as the LuminanceEngine.
+
+    Rows are summed into one band per tile row and bands into tiles with
+    np.add.reduceat, touching each sampled pixel once, like
+    LuminanceEngine.channel_sums. Metering masks (center, center-weighted, no edges, no taskbar) then weight
+    the tile means instead of the pixels, and percentiles are taken over the
+    weighted tile means. Layouts are cached per sample size, so switching
+    masks or monitors never recomputes them on the hot path.
+
+    Callers that pass a `key` (the controller passes the monitor id) get
+    steady-state analysis: scratch buffers are kept per key and layout, so
+    after the first frame a tick allocates no arrays, and the returned
+    TileStats is reused - it is only valid until that key's next frame.
+    """
+    def __init__(self, engine, grid=(8, 8), metering='average', percentiles=(10, 50, 90)):
+        self.engine = engine
+        self._layouts = {}
+        self._scratch = {}
+        self._lock = threading.Lock()
+        self.configure(grid, metering, percentiles)
+
+    def configure(self, grid=None, metering=None, percentiles=None):
+        """Changes grid, mask or percentiles; cached layouts stay valid per key."""
+        if grid is not None:
+            self.grid = (max(1, int(grid[0])), max(1, int(grid[1])))
+        if metering is not None:
+            if metering not in METERING_MODES:
+                print(f"Unknown metering mode '{metering}', falling back to 'average'.")
+                metering = 'average'
+            self.metering = metering
+        if percentiles is not None:
+            self.percentiles = tuple(percentiles)
+        # Scratch of the old settings would never be used again.
+        self._scratch = {}
+
+    def release(self):
+        """Drops cached layouts and scratch buffers; they are rebuilt on the next frame."""
+        with self._lock:
+            self._layouts = {}
+            self._scratch = {}
+
+    def cache_bytes(self):
+        """Bytes held by scratch buffers."""
+        with self._lock:
+            scratches = list(self._scratch.values())
+        return sum(scratch.bands.nbytes + scratch.sums.nbytes for scratch in scratches)
+
+    def layout(self, height, width):
+        """Returns the cached TileLayout for a sample of this size."""
+        key = (height, width, self.grid, self.metering)
+        layout = self._layouts.get(key)
+        if layout is None:
+            with self._lock:
+                layout = self._layouts.get(key)
+                if layout is None:
+                    layout = self._layouts[key] = TileLayout(height, width, *self.grid, self.metering)
+        return layout
+
+    def scratch(self, key, layout, sample, dtype):
+        """Returns `key`'s buffers for this layout, or fresh ones when key is None."""
+        if key is None:
+            return TileScratch(layout, sample.shape[1], sample.shape[2], dtype)
+        scratch_key = (key, sample.shape, dtype)
+        scratch = self._scratch.get(scratch_key)
+        if scratch is None or scratch.layout is not layout:
+            scratch = TileScratch(layout, sample.shape[1], sample.shape[2], dtype)
+            with self._lock:
+                self._scratch[scratch_key] = scratch
+        return scratch
+
+    def tile_luma(self, img, key=None):
+        """Returns ((rows, cols) mean luma per tile, layout, scratch) for a BGRA or BGR frame."""
+        sample = self.engine.subsample(img)
+        layout = self.layout(sample.shape[0], sample.shape[1])
+        if self.engine.accumulation == 'float32':
+            dtype = np.float32
+        else:
+            # uint32 holds a whole tile's sums below 16M pixels per tile.
+            dtype = np.uint32 if layout.counts.max() * 255 < 2 ** 32 else np.uint64
+        scratch = self.scratch(key, layout, sample, dtype)
+        for band, start, end in zip(scratch.band_views, layout.row_starts, layout.row_ends):
+            # Plain row sums per band: as fast as the full-frame reduction, where
+            # np.add.reduceat over rows is several times slower on large frames.
+            sample[start:end].sum(axis=0, dtype=dtype, out=band)
+        np.add.reduceat(scratch.bands, layout.col_starts, axis=1, out=scratch.sums)
+        np.matmul(scratch.sums[..., :3], scratch.coefficients, out=scratch.luma)
+        np.divide(scratch.luma, scratch.divisor, out=scratch.tiles)
+        return scratch.tiles, layout, scratch
+
+    def analyse(self, img, key=None):
+        """Returns the TileStats (mean, percentiles, tiles, weights) of the frame under the current mask."""
+        tiles, layout, scratch = self.tile_luma(img, key)
+        stats = scratch.stats
+        stats.mean = float(np.vdot(tiles, layout.weights))
+        # Weighted percentiles over the active tiles, sorted in place: each key
+        # packs a tile's luma (to 1/65536) above its index, so sorting the keys
+        # orders the tiles without the index array np.argsort would allocate.
+        np.take(tiles, layout.active, out=scratch.values)
+        np.multiply(scratch.values, 65536.0, out=scratch.scaled)
+        np.copyto(scratch.keys, scratch.scaled, casting='unsafe')
+        np.left_shift(scratch.keys, 24, out=scratch.keys)
+        np.bitwise_or(scratch.keys, scratch.indices, out=scratch.keys)
+        scratch.keys.sort()
+        np.bitwise_and(scratch.keys, 0xFFFFFF, out=scratch.order)
+        np.take(scratch.values, scratch.order, out=scratch.sorted_values)
+        np.take(layout.active_weights, scratch.order, out=scratch.sorted_weights)
+        np.add.accumulate(scratch.sorted_weights, out=scratch.cumulative)
+        last = len(scratch.cumulative) - 1
+        total = scratch.cumulative[last]
+        for q in self.percentiles:
+            index = min(int(scratch.cumulative.searchsorted(q / 100.0 * total)), last)
+            stats.percentiles[q] = float(scratch.sorted_values[index])
+        return stats
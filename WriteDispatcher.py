@@ -0,0 +1,292 @@
+import concurrent.futures
+import queue
+import threading
+import time
+import Metrics as MX
+
+
+class WriteError(ValueError):
+    """A brightness write failed, timed out, or was refused for a quarantined display."""
+
+
+class DisplayQuarantined(WriteError):
+    """The display's circuit breaker is open; no hardware call was made."""
+
+
+class DisplayDisconnected(WriteError):
+    """The display is not connected; write_fn raises it instead of trying the hardware."""
+
+
+class CircuitBreaker:
+    """
+    Per-display failure gate.
+
+    Closed: calls go through. After `failure_threshold` consecutive failures
+    it opens and refuses calls for `cooldown` seconds, then lets one probe
+    through (half-open). A successful probe closes it; a failed one reopens
+    it with the cooldown doubled, up to `max_cooldown`.
+    """
+    def __init__(self, failure_threshold=3, cooldown=5.0, max_cooldown=300.0, clock=None):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock or time.monotonic
+        self.state = 'closed'
+        self.failures = 0
+        self.trips = 0
+        self.current_cooldown = cooldown
+        self.opened_at = None
+        self._probing = False
+
+    def allow(self):
+        """Returns True if a call may be made now."""
+        if self.state == 'open':
+            if self.clock() - self.opened_at < self.current_cooldown:
+                return False
+            self.state = 'half_open'
+        if self.state == 'half_open':
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def configure(self, failure_threshold, cooldown):
+        """Changes the settings; an open breaker keeps its doublings at the new cooldown."""
+        self.failure_threshold = failure_threshold
+        self.current_cooldown = min(self.current_cooldown / self.cooldown * cooldown, self.max_cooldown)
+        self.cooldown = cooldown
+
+    def release(self):
+        """Ends a probe that never reached the hardware, so it counts neither way."""
+        self._probing = False
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+        self.current_cooldown = self.cooldown
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open':
+            self.current_cooldown = min(self.current_cooldown * 2, self.max_cooldown)
+            self._open()
+        elif self.state == 'closed' and self.failures >= self.failure_threshold:
+            self.trips += 1
+            self._open()
+
+    def _open(self):
+        self.state = 'open'
+        self.opened_at = self.clock()
+        self._probing = False
+
+
+class _CallThread:
+    """
+    Daemon thread running one call at a time. Unlike ThreadPoolExecutor
+    workers it is not joined at exit, so a call stuck in hardware cannot
+    keep the process alive.
+    """
+    def __init__(self, name):
+        self._queue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name=name, daemon=True).start()
+
+    def submit(self, fn, *args):
+        future = concurrent.futures.Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def stop(self):
+        self._queue.put(None)
+
+
+class _DisplayWrites:
+    """Call thread, breaker and latency histogram for one display."""
+    def __init__(self, monitor_id, breaker):
+        # One hardware call at a time per display; a hung call only ties up this thread.
+        self.calls = _CallThread(f"brightness-write-{monitor_id}")
+        self.breaker = breaker
+        self.latency = MX.Histogram()
+        self.in_flight = None
+        self.last_latency = None
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.disconnected = 0
+
+
+class WriteDispatcher:
+    """
+    Runs hardware writes for every display on that display's own call
+    thread, with a deadline per call, exponential backoff between retries and
+    a circuit breaker that quarantines a failing display and probes it again
+    later. A display that hangs or keeps failing costs the others nothing.
+    A disconnected display is not a failing one: its writes raise
+    DisplayDisconnected without retries and leave the breaker alone.
+
+    A call that misses its deadline keeps running in the background (Python
+    cannot cancel it); until it returns, further writes to that display fail
+    fast instead of queueing behind it.
+    """
+    def __init__(self, write_fn, timeout=2.0, retries=3, backoff=0.05, max_backoff=1.0,
+                 failure_threshold=3, cooldown=5.0, max_cooldown=300.0, clock=None):
+        self.write_fn = write_fn  # write_fn(monitor_id, value), raises on failure
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self._displays = {}
+        self._lock = threading.Lock()
+
+    def configure(self, timeout=None, retries=None, failure_threshold=None, cooldown=None):
+        """Updates deadlines, retries and breaker settings, including existing displays'."""
+        if timeout is not None:
+            self.timeout = timeout
+        if retries is not None:
+            self.retries = retries
+        if failure_threshold is not None:
+            self.failure_threshold = failure_threshold
+        if cooldown is not None:
+            self.cooldown = cooldown
+        with self._lock:
+            displays = list(self._displays.values())
+        for display in displays:
+            with display.lock:
+                display.breaker.configure(self.failure_threshold, self.cooldown)
+
+    def last_latency(self, monitor_id):
+        """Seconds the display's most recent write took, or None before its first write."""
+        display = self._displays.get(monitor_id)
+        return display.last_latency if display else None
+
+    def available(self, monitor_id):
+        """False while a display is quarantined and not yet due for a probe."""
+        display = self._displays.get(monitor_id)
+        if display is None or display.breaker.state != 'open':
+            return True
+        breaker = display.breaker
+        return breaker.clock() - breaker.opened_at >= breaker.current_cooldown
+
+    def reset(self, monitor_id):
+        """Closes a display's breaker, e.g. when a different display now has that monitor id."""
+        display = self._displays.get(monitor_id)
+        if display is not None:
+            with display.lock:
+                display.breaker.record_success()
+
+    def _display(self, monitor_id):
+        with self._lock:
+            display = self._displays.get(monitor_id)
+            if display is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.cooldown, self.max_cooldown, self.clock)
+                display = self._displays[monitor_id] = _DisplayWrites(monitor_id, breaker)
+            return display
+
+    def write(self, monitor_id, value):
+        """Writes one value to one display; raises WriteError if it could not be applied."""
+        display = self._display(monitor_id)
+        # display.lock guards the breaker and counters only; waits and backoff sleeps run without it.
+        with display.lock:
+            if not display.breaker.allow():
+                display.rejected += 1
+                raise DisplayQuarantined(f"Monitor {monitor_id} is quarantined after repeated write failures.")
+            was_probe = display.breaker.state == 'half_open'
+        start = time.perf_counter()
+        try:
+            self._attempt(monitor_id, display, value)
+        except DisplayDisconnected:
+            with display.lock:
+                display.disconnected += 1
+                display.breaker.release()
+            raise
+        except WriteError:
+            with display.lock:
+                display.errors += 1
+                display.breaker.record_failure()
+                if display.breaker.state == 'open' and not was_probe:
+                    print(f"Monitor {monitor_id}: quarantined after {display.breaker.failures} failed writes, "
+                          f"probing again in {display.breaker.current_cooldown:g}s.")
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            with display.lock:
+                display.last_latency = latency
+                display.latency.observe(latency)
+        with display.lock:
+            if was_probe:
+                print(f"Monitor {monitor_id}: writes are working again.")
+            display.writes += 1
+            display.breaker.record_success()
+
+    def _attempt(self, monitor_id, display, value):
+        delay = self.backoff
+        error = None
+        for attempt in range(max(1, self.retries)):
+            if attempt:
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+            with display.lock:
+                if display.in_flight is not None and not display.in_flight.done():
+                    raise WriteError(f"Monitor {monitor_id}: previous write is still blocked in hardware.")
+                call = display.in_flight = display.calls.submit(self.write_fn, monitor_id, value)
+            try:
+                call.result(timeout=self.timeout)
+                return
+            except concurrent.futures.TimeoutError:
+                with display.lock:
+                    display.timeouts += 1
+                # The call is still running; retrying would only queue behind it.
+                raise WriteError(f"Monitor {monitor_id}: write timed out after {self.timeout:g}s.")
+            except DisplayDisconnected:
+                raise  # retrying cannot bring it back; the topology watcher will
+            except Exception as e:
+                error = e
+        raise WriteError(f"Failed to set brightness to {value} on monitor {monitor_id}: {error}")
+
+    def stats(self):
+        """Per-display breaker state, counters and caller-observed write latency (seconds)."""
+        with self._lock:
+            displays = dict(self._displays)
+        result = {}
+        for monitor_id, display in displays.items():
+            latency = display.latency
+            result[str(monitor_id)] = {
+                'state': display.breaker.state,
+                'trips': display.breaker.trips,
+                'writes': display.writes,
+                'errors': display.errors,
+                'timeouts': display.timeouts,
+                'rejected': display.rejected,
+                'disconnected': display.disconnected,
+                'p50': latency.percentile(0.5),
+                'p95': latency.percentile(0.95),
+                'p99': latency.percentile(0.99),
+                'max': latency.max,
+            }
+        return result
+
+    def close(self):
+        """Stops the call threads without waiting on calls stuck in hardware."""
+        with self._lock:
+            displays = list(self._displays.values())
+        for display in displays:
+            display.calls.stop()
@@ -0,0 +1,84 @@
+"""
+bench_analysis_pool.py
+
+Compares frame throughput of in-thread analysis (one MonitorThread-style
+loop per monitor, all sharing the GIL) with the AnalysisPool process mode,
+for a growing number of simulated monitors. Every tick runs the real
+process_monitor pipeline; only capture and brightness hardware are simulated.
+
+Usage:
+    python benchmarks/bench_analysis_pool.py [--monitors 1,2,4] [--resolution 4K]
+        [--analysis-mode accurate] [--workers N] [--duration 3]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import BrightnessController as BNC
+import SimulatedBackends as SIM
+
+
+def build(count, args):
+    sources = [SIM.StaticFrameSource(args.resolution, level=40 + 50 * i) for i in range(count)]
+    controller = BNC.BrightnessController(
+        min_brightness=10, max_brightness=90, analysis_mode=args.analysis_mode, refresh_interval=0,
+        capture_backend=SIM.SimulatedCapture(sources), brightness_backend=SIM.SimulatedDisplay(count),
+    )
+    controller.actuator.fade_interval = 0
+    return controller
+
+
+def run(count, workers, args):
+    """Returns frames analysed per second across `count` monitor loops."""
+    controller = build(count, args)
+    controller.set_analysis_workers(workers)
+    monitors = controller.capture.monitors()[1:]
+    stop = threading.Event()
+    ticks = [0] * count
+
+    def loop(i):
+        while not stop.is_set():
+            controller.process_monitor(monitors[i], i, use_center=False)
+            ticks[i] += 1
+
+    # One untimed tick per monitor primes caches, rings and worker processes.
+    for i in range(count):
+        controller.process_monitor(monitors[i], i, use_center=False)
+    threads = [threading.Thread(target=loop, args=(i,)) for i in range(count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    controller.close()
+    return sum(ticks) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--monitors", default="1,2,4", help="Comma-separated monitor counts")
+    parser.add_argument("--resolution", default="4K", choices=list(SIM.RESOLUTIONS))
+    parser.add_argument("--analysis-mode", default="accurate")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: min(monitors, cores))")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds measured per case")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    print(f"{args.resolution} frames, analysis_mode={args.analysis_mode}, {cores} cores")
+    print(f"{'monitors':>8}{'workers':>9}{'threaded fps':>14}{'process fps':>13}{'speedup':>9}")
+    for count in (int(n) for n in args.monitors.split(',')):
+        workers = args.workers or min(count, cores)
+        threaded = run(count, 0, args)
+        pooled = run(count, workers, args)
+        print(f"{count:>8}{workers:>9}{threaded:>14.1f}{pooled:>13.1f}{pooled / threaded:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
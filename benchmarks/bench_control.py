@@ -0,0 +1,141 @@
+"""
+bench_control.py
+
+Replays synthetic luminance sequences through BrightnessController.process_frame
+with each control law and reports, per simulated hour:
+
+- law writes (targets sent to the actuator) and hardware writes (incl. fades),
+- writes avoided by the law,
+- mean |displayed - desired| tracking error,
+- mean settle time after sustained scene changes (responsiveness).
+
+Each law runs twice: polled every second, and through AdaptiveScheduler
+(skipping unchanged frames and backing off as the daemon does by default
+with adaptive_polling), where stateful laws must still converge on frames
+that are not re-analysed.
+
+Usage:
+    python benchmarks/bench_control.py [--seconds 3600] [--fade] [--laws threshold,ema,rate,pid]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import AdaptiveScheduler as AS
+import BrightnessController as BNC
+import SimulatedBackends as SIM
+
+# The shipped defaults (default_config.yaml) of each law.
+LAW_CONFIGS = {
+    'threshold': {'control_law': 'threshold'},
+    'ema': {'control_law': 'ema', 'control_time_constant': 60, 'control_deadband': 8, 'control_hold': 10},
+    'rate': {'control_law': 'rate', 'control_max_rate': 8, 'control_deadband': 8},
+    'pid': {'control_law': 'pid', 'control_kp': 0.8, 'control_ki': 0.05, 'control_kd': 0.0, 'control_deadband': 8},
+}
+
+
+def video_trace(seconds, rng):
+    """Scene cuts every 2-8 s between random levels, with per-second flicker."""
+    levels = np.empty(seconds)
+    t = 0
+    while t < seconds:
+        length = int(rng.integers(2, 9))
+        levels[t:t + length] = rng.integers(20, 231)
+        t += length
+    return np.clip(levels + rng.normal(0, 15, seconds), 0, 255)
+
+
+def office_trace(seconds, rng):
+    """Mostly static content switching every 1-5 minutes, with slight noise."""
+    levels = np.empty(seconds)
+    t = 0
+    while t < seconds:
+        length = int(rng.integers(60, 301))
+        levels[t:t + length] = rng.choice([40, 120, 235])
+        t += length
+    return np.clip(levels + rng.normal(0, 2, seconds), 0, 255)
+
+
+TRACES = {'video': video_trace, 'office': office_trace}
+
+
+def settle_times(displayed, desired, tolerance, min_hold=30):
+    """Seconds until displayed comes within tolerance of each target held >= min_hold s."""
+    times = []
+    start = 0
+    for t in range(1, len(desired) + 1):
+        if t == len(desired) or abs(desired[t] - desired[start]) > 2 * tolerance:
+            if t - start >= min_hold:
+                hits = np.nonzero(np.abs(displayed[start:t] - desired[start]) <= tolerance)[0]
+                times.append(hits[0] if len(hits) else t - start)
+            start = t
+    return times
+
+
+def run(trace, law_config, adaptive, args):
+    clock = [0.0]
+    display = SIM.SimulatedDisplay(1, brightness=50)
+    controller = BNC.BrightnessController(min_brightness=10, max_brightness=90, threshold=args.threshold,
+                                          refresh_interval=0, capture_backend=SIM.SimulatedCapture([]),
+                                          brightness_backend=display)
+    controller.update_user_config(law_config)
+    controller.control_law.clock = lambda: clock[0]
+    controller.actuator.fade_interval = 0
+    if not args.fade:
+        controller.actuator.submit = lambda mid, value, current=None, fade=True, submit=controller.actuator.submit: \
+            submit(mid, value, current, fade=False)
+    scheduler = AS.AdaptiveScheduler(min_interval=1, max_interval=30) if adaptive else None
+    name = display.names[0]
+    frame = np.empty((8, 8, 4), dtype=np.uint8)
+    displayed, desired = [], []
+    next_tick = 0.0
+    for t, level in enumerate(trace):
+        frame[...] = int(level)
+        if t >= next_tick:
+            clock[0] = float(t)
+            controller.process_frame(frame, 0, scheduler)
+            controller.actuator.wait_idle()
+            next_tick = t + (scheduler.interval if scheduler else 1)
+        # What the content asks for this second, whether or not it was polled.
+        desired.append(controller.max_brightness - controller.scale_brightness(int(level)))
+        displayed.append(display.brightness[name])
+    controller.close()
+    displayed, desired = np.array(displayed), np.array(desired)
+    hours = len(trace) / 3600
+    stats = controller.control_law.stats()
+    settle = settle_times(displayed, desired, tolerance=args.threshold)
+    return {
+        'law_writes': stats['writes'] / hours,
+        'hw_writes': display.writes / hours,
+        'avoided': stats['writes_avoided'] / hours,
+        'error': float(np.mean(np.abs(displayed - desired))),
+        'settle': float(np.mean(settle)) if settle else float('nan'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=int, default=3600, help="Simulated seconds (one tick per second)")
+    parser.add_argument("--laws", default=",".join(LAW_CONFIGS), help="Comma-separated control laws")
+    parser.add_argument("--threshold", type=int, default=8, help="Threshold for the 'threshold' law")
+    parser.add_argument("--fade", action="store_true", help="Count every fade step as a hardware write")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for trace_name, make_trace in TRACES.items():
+        trace = make_trace(args.seconds, np.random.default_rng(args.seed))
+        print(f"\n{trace_name} trace ({args.seconds} s)")
+        print(f"{'law':<20}{'writes/h':>10}{'hw writes/h':>13}{'avoided/h':>11}{'error':>8}{'settle s':>10}")
+        for law, adaptive in [(law, adaptive) for law in args.laws.split(',') for adaptive in (False, True)]:
+            r = run(trace, LAW_CONFIGS[law], adaptive, args)
+            label = f"{law}/adaptive" if adaptive else law
+            print(f"{label:<20}{r['law_writes']:>10.0f}{r['hw_writes']:>13.0f}{r['avoided']:>11.0f}"
+                  f"{r['error']:>8.2f}{r['settle']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
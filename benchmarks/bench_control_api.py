@@ -0,0 +1,83 @@
+"""
+bench_control_api.py
+
+Drives the control API of a controller on simulated displays from several
+concurrent clients, each sending batches (brightness for every display plus
+a state query) back to back over one connection, and reports requests/s and
+round-trip latency percentiles. A monitor thread keeps analysing frames
+meanwhile, as in the app.
+
+Usage:
+    python benchmarks/bench_control_api.py [--clients 4] [--requests 2000] [--displays 2] [--tcp]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import BrightnessController as BNC
+import ConfigSnapshot as CS
+import ControlAPI as CAPI
+import MonitorThread as MT
+import SimulatedBackends as SIM
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent connections")
+    parser.add_argument("--requests", type=int, default=2000, help="Batches per client")
+    parser.add_argument("--displays", type=int, default=2)
+    parser.add_argument("--tcp", action="store_true", help="Use a loopback port instead of a Unix socket")
+    args = parser.parse_args()
+
+    capture = SIM.SimulatedCapture([SIM.FlickerFrameSource() for _ in range(args.displays)])
+    controller = BNC.BrightnessController(
+        min_brightness=10, max_brightness=90, threshold=8, refresh_interval=0,
+        capture_backend=capture, brightness_backend=SIM.SimulatedDisplay(args.displays))
+    publisher = CS.ConfigPublisher({'interval': 0.05, 'use_center': True, 'monitors': list(range(args.displays))})
+    controller.update_user_config(publisher.current)
+    path = '' if args.tcp else os.path.join(tempfile.mkdtemp(), 'control.sock')
+    server = CAPI.ControlServer(controller, publisher, path=path).start()
+    address = {'port': server.address[1]} if args.tcp else {'path': path}
+    thread = MT.MonitorThread(controller, capture.monitors()[1], 0, publisher, None)
+    thread.start()
+
+    latencies = [[] for _ in range(args.clients)]
+
+    def client(index):
+        with CAPI.ControlClient(**address) as connection:
+            for i in range(args.requests):
+                values = {str(mid): (i + mid) % 101 for mid in range(args.displays)}
+                start = time.perf_counter()
+                connection.call([{'cmd': 'set_brightness', 'values': values}, {'cmd': 'state'}])
+                latencies[index].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    clients = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    for t in clients:
+        t.start()
+    for t in clients:
+        t.join()
+    elapsed = time.perf_counter() - start
+    thread.stop()
+    thread.join()
+    server.stop()
+    controller.close()
+
+    samples = sorted(s for per_client in latencies for s in per_client)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{args.clients} clients x {args.requests} batches over {'TCP' if args.tcp else 'Unix socket'}, "
+          f"{args.displays} displays")
+    print(f"{len(samples) / elapsed:.0f} requests/s, round trip median {statistics.median(samples) * 1000:.3f} ms, "
+          f"p99 {p99 * 1000:.3f} ms, max {samples[-1] * 1000:.3f} ms")
+    stats = controller.actuator.stats()
+    print(f"display writes {stats['writes']}, coalesced targets {stats['coalesced']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+bench_luminance.py
+
+Compares the legacy np.mean grayscale analysis with LuminanceEngine presets
+and TileAnalyser metering masks on synthetic BGRA frames, reporting the
+measured value and time per call.
+
+Usage:
+    python benchmarks/bench_luminance.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import LuminanceEngine as LE
+import TileMetering as TM
+
+RESOLUTIONS = {
+    '1080p': (1080, 1920),
+    '4K': (2160, 3840),
+    '5K': (2880, 5120),
+}
+
+
+def legacy_avg(img):
+    """Old get_avg_brightness: float64 mean over all four channels."""
+    return np.mean(np.mean(img, axis=2))
+
+
+def legacy_center(img):
+    """Old get_center_brightness: float64 mean of the BGR center quarter."""
+    h, w = img.shape[:2]
+    return np.mean(np.mean(img[h//4:3*h//4, w//4:3*w//4, :3], axis=2))
+
+
+def make_frame(h, w, seed=0):
+    """Random BGRA frame with an opaque alpha channel, like an mss grab."""
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 256, size=(h, w, 4), dtype=np.uint8)
+    img[..., 3] = 255
+    return img
+
+
+def time_call(fn, img, repeat):
+    """Returns (value, best seconds per call) over `repeat` runs."""
+    best = float('inf')
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn(img)
+        best = min(best, time.perf_counter() - start)
+    return value, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    for name, (h, w) in RESOLUTIONS.items():
+        img = make_frame(h, w)
+        exact = LE.LuminanceEngine('accurate').mean_luma(img)
+        print(f"\n{name} ({w}x{h}), exact Rec.709 luma = {exact:.3f}")
+        print(f"{'method':<24}{'value':>10}{'error':>10}{'ms':>10}")
+        candidates = [('legacy avg (BGRA)', legacy_avg), ('legacy center', legacy_center)]
+        for mode in LE.ANALYSIS_MODES:
+            engine = LE.LuminanceEngine(mode)
+            candidates.append((f"engine {mode}", engine.mean_luma))
+            candidates.append((f"engine {mode} center",
+                               lambda img, e=engine: e.mean_luma(e.center_view(img))))
+        balanced = LE.LuminanceEngine('balanced')
+        for metering in TM.METERING_MODES:
+            analyser = TM.TileAnalyser(balanced, metering=metering)
+            candidates.append((f"tiles {metering}", lambda img, a=analyser: a.analyse(img, key=0)['mean']))
+        for label, fn in candidates:
+            value, seconds = time_call(fn, img, args.repeat)
+            print(f"{label:<24}{value:>10.3f}{value - exact:>10.3f}{seconds * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+bench_pipeline.py
+
+Runs the real BrightnessController.process_monitor pipeline against simulated
+capture and brightness backends, so it needs no displays. For each frame
+source x resolution x region it reports:
+
+- per-tick latency (p50 / p95 / max) of process_monitor,
+- CPU time per tick (whole process, including actuator threads),
+- bytes allocated per tick (tracemalloc peak, separate pass),
+- hardware reads/writes per hour at the simulated polling interval.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--ticks N] [--resolutions 1080p,4K,8K]
+        [--sources static,gradient,flicker] [--interval 5] [--write-latency 0.005]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import BrightnessController as BNC
+import SimulatedBackends as SIM
+
+SOURCES = {
+    'static': SIM.StaticFrameSource,
+    'gradient': SIM.GradientFrameSource,
+    'flicker': SIM.FlickerFrameSource,
+}
+
+
+class SimClock:
+    """Content time for the simulated capture, advanced one interval per tick."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def build(source, args, clock):
+    display = SIM.SimulatedDisplay(1, read_latency=args.read_latency, write_latency=args.write_latency)
+    controller = BNC.BrightnessController(
+        min_brightness=10, max_brightness=90, threshold=args.threshold,
+        analysis_mode=args.analysis_mode, refresh_interval=0,
+        capture_backend=SIM.SimulatedCapture([source], clock=clock),
+        brightness_backend=display,
+    )
+    controller.actuator.fade_interval = 0
+    return controller, display
+
+
+def run_case(source, use_center, args):
+    clock = SimClock()
+    controller, display = build(source, args, clock)
+    monitor = controller.capture.monitors()[1]
+
+    def tick(i):
+        clock.now = i * args.interval
+        controller.process_monitor(monitor, 0, use_center)
+
+    for i in range(args.warmup):
+        tick(i)
+        controller.actuator.wait_idle()
+    reads, writes = display.reads, display.writes
+
+    latencies = []
+    cpu_start = time.process_time()
+    for i in range(args.warmup, args.warmup + args.ticks):
+        start = time.perf_counter()
+        tick(i)
+        latencies.append(time.perf_counter() - start)
+        controller.actuator.wait_idle()
+    cpu_per_tick = (time.process_time() - cpu_start) / args.ticks
+    hours = args.ticks * args.interval / 3600
+    reads, writes = display.reads - reads, display.writes - writes
+
+    tracemalloc.start()
+    allocated = []
+    for i in range(args.warmup + args.ticks, args.warmup + args.ticks + args.alloc_ticks):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        tick(i)
+        allocated.append(tracemalloc.get_traced_memory()[1] - base)
+        controller.actuator.wait_idle()
+    tracemalloc.stop()
+    controller.close()
+
+    latencies.sort()
+    return {
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'cpu_ms': cpu_per_tick * 1000,
+        'alloc_kb': statistics.mean(allocated) / 1024 if allocated else 0.0,
+        'reads_per_hour': reads / hours,
+        'writes_per_hour': writes / hours,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ticks", type=int, default=100, help="Measured ticks per case")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured ticks per case")
+    parser.add_argument("--alloc-ticks", type=int, default=10, help="Ticks traced for allocations")
+    parser.add_argument("--resolutions", default="1080p,4K,8K", help="Comma-separated, see SimulatedBackends.RESOLUTIONS")
+    parser.add_argument("--sources", default="static,gradient,flicker", help="Comma-separated frame sources")
+    parser.add_argument("--interval", type=float, default=5, help="Simulated seconds between ticks")
+    parser.add_argument("--threshold", type=int, default=8)
+    parser.add_argument("--analysis-mode", default="balanced")
+    parser.add_argument("--read-latency", type=float, default=0.005, help="Simulated hardware read latency (s)")
+    parser.add_argument("--write-latency", type=float, default=0.005, help="Simulated hardware write latency (s)")
+    args = parser.parse_args()
+
+    header = f"{'source':<10}{'res':<7}{'region':<8}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}" \
+             f"{'cpu ms':>9}{'alloc KB':>10}{'reads/h':>9}{'writes/h':>10}"
+    print(header)
+    for source_name in args.sources.split(','):
+        for resolution in args.resolutions.split(','):
+            source = SOURCES[source_name](resolution)
+            for use_center in (True, False):
+                r = run_case(source, use_center, args)
+                print(f"{source_name:<10}{resolution:<7}{'center' if use_center else 'full':<8}"
+                      f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['max_ms']:>9.2f}{r['cpu_ms']:>9.2f}"
+                      f"{r['alloc_kb']:>10.1f}{r['reads_per_hour']:>9.0f}{r['writes_per_hour']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+bench_startup.py
+
+Measures BrightnessApp start-up so it can be kept from regressing:
+
+- import cost of the GUI module, and which heavy modules (numpy, mss,
+  screen_brightness_control, yaml) it pulls in before the window exists;
+- with --gui (needs a display): time-to-window and time-to-first-adjustment
+  reported by `BrightnessApp.py --startup-timing`.
+
+Exits non-zero when a median exceeds --max-import-ms / --max-window-ms.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N] [--gui] [--max-window-ms MS]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('numpy', 'mss', 'screen_brightness_control', 'yaml')
+
+IMPORT_PROBE = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import BrightnessApp\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({'import_s': elapsed,\n"
+    "                  'heavy_loaded': [m for m in %r if m in sys.modules]}))\n"
+) % (HEAVY_MODULES,)
+
+
+def run_json(cmd, env=None, timeout=60):
+    """Runs `cmd` from the repo root and returns the last JSON line it printed."""
+    result = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, timeout=timeout)
+    lines = [line for line in result.stdout.splitlines() if line.startswith('{')]
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"{' '.join(cmd)} failed:\n{result.stderr.strip()}")
+    return json.loads(lines[-1])
+
+
+def bench_import(runs):
+    samples = [run_json([sys.executable, '-c', IMPORT_PROBE]) for _ in range(runs)]
+    median_ms = statistics.median(s['import_s'] for s in samples) * 1000
+    print(f"import BrightnessApp: median {median_ms:.1f} ms over {runs} runs")
+    print(f"heavy modules loaded at import: {samples[-1]['heavy_loaded'] or 'none'}")
+    return median_ms
+
+
+def bench_gui(runs, config):
+    windows, adjustments = [], []
+    for _ in range(runs):
+        env = dict(os.environ, AUTOBRIGHT_STARTUP_T0=repr(time.time()))
+        timings = run_json([sys.executable, 'BrightnessApp.py', '--config', config, '--startup-timing'], env=env)
+        windows.append(timings['time_to_window'] * 1000)
+        if timings['time_to_first_adjustment'] is not None:
+            adjustments.append(timings['time_to_first_adjustment'] * 1000)
+    window_ms = statistics.median(windows)
+    print(f"time-to-window: median {window_ms:.1f} ms, min {min(windows):.1f} ms")
+    if adjustments:
+        print(f"time-to-first-adjustment: median {statistics.median(adjustments):.1f} ms")
+    else:
+        print("time-to-first-adjustment: no adjustment within the timeout")
+    return window_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="Launches per measurement")
+    parser.add_argument("--gui", action="store_true", help="Also launch the GUI (requires a display)")
+    parser.add_argument("--config", default="default_config.yaml", help="Config passed to BrightnessApp.py")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if the median import time exceeds this")
+    parser.add_argument("--max-window-ms", type=float, help="Fail if the median time-to-window exceeds this")
+    args = parser.parse_args()
+
+    failed = False
+    import_ms = bench_import(args.runs)
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"REGRESSION: import {import_ms:.1f} ms > {args.max_import_ms} ms")
+        failed = True
+    if args.gui:
+        window_ms = bench_gui(args.runs, args.config)
+        if args.max_window_ms is not None and window_ms > args.max_window_ms:
+            print(f"REGRESSION: time-to-window {window_ms:.1f} ms > {args.max_window_ms} ms")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+bench_writes.py
+
+Drives the WriteDispatcher against simulated displays where one display
+hangs and another rejects every write, and reports per-display tail latency,
+breaker state and the time each parallel write round took. Healthy displays
+should keep their normal latency while the bad ones are quarantined.
+
+Usage:
+    python benchmarks/bench_writes.py [--displays 4] [--rounds 200] [--write-latency 0.005]
+        [--timeout 0.2] [--cooldown 1]
+"""
+
+import argparse
+import concurrent.futures
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import SimulatedBackends as SIM
+import WriteDispatcher as WD
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--displays", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=200, help="Parallel write rounds to all displays")
+    parser.add_argument("--write-latency", type=float, default=0.005, help="Seconds per healthy write")
+    parser.add_argument("--timeout", type=float, default=0.2, help="Per-write deadline (seconds)")
+    parser.add_argument("--cooldown", type=float, default=1.0, help="Seconds before a quarantined display is probed")
+    args = parser.parse_args()
+
+    hardware = SIM.SimulatedDisplay(args.displays, write_latency=args.write_latency)
+    names = hardware.list_monitors()
+    hardware.hung.add(names[1])
+    if args.displays > 2:
+        hardware.failing.add(names[2])
+
+    def write(monitor_id, value):
+        hardware.set_brightness(value, names[monitor_id])
+
+    def write_quietly(monitor_id, value):
+        try:
+            dispatcher.write(monitor_id, value)
+        except WD.WriteError:
+            pass  # counted in the dispatcher's stats
+
+    dispatcher = WD.WriteDispatcher(write, timeout=args.timeout, cooldown=args.cooldown, backoff=0.01)
+    # One caller thread per display, as the actuator's display workers call the dispatcher.
+    callers = concurrent.futures.ThreadPoolExecutor(max_workers=args.displays)
+    rounds = []
+    for i in range(args.rounds):
+        start = time.perf_counter()
+        futures = [callers.submit(write_quietly, monitor_id, 20 + i % 60) for monitor_id in range(args.displays)]
+        concurrent.futures.wait(futures)
+        rounds.append(time.perf_counter() - start)
+    callers.shutdown()
+
+    print(f"{args.displays} displays, display 1 hangs, display 2 fails, {args.rounds} rounds")
+    print(f"round time: median {statistics.median(rounds) * 1000:.2f} ms, "
+          f"max {max(rounds) * 1000:.2f} ms, total {sum(rounds):.2f} s")
+    print(f"{'display':>8}{'state':>11}{'writes':>8}{'errors':>8}{'timeouts':>9}{'rejected':>9}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for monitor_id, stats in dispatcher.stats().items():
+        print(f"{monitor_id:>8}{stats['state']:>11}{stats['writes']:>8}{stats['errors']:>8}"
+              f"{stats['timeouts']:>9}{stats['rejected']:>9}{stats['p50'] * 1000:>9.2f}"
+              f"{stats['p99'] * 1000:>9.2f}{stats['max'] * 1000:>9.2f}")
+    hardware.release.set()
+    dispatcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+check_allocations.py
+
+Checks that BrightnessController.process_monitor reaches an allocation-free
+steady state: after a warmup, ticks over simulated capture and displays must
+not grow traced memory (tracemalloc) and must not allocate any frame, band
+or tile buffer while they run. What a tick may still hold at once is numpy's
+fixed-size iteration buffer for the casting row sums (np.getbufsize()
+elements, the same at any resolution) plus a few small Python objects such
+as array views. Exits with status 1 when a case fails, so it can gate CI.
+
+Cases cover every analysis mode, full frame and center capture, adaptive
+polling off and on, and a response curve (tests/test_allocations.py runs
+the same cases under pytest). Frames are static, so the displays settle during warmup
+and the measured ticks are the steady state (no hardware writes, which
+start actuator threads by design).
+
+Usage:
+    python benchmarks/check_allocations.py [--ticks 400] [--warmup 300] [--resolution 4K]
+        [--max-transient BYTES]
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import AdaptiveScheduler as AS
+import BrightnessController as BNC
+import LuminanceEngine as LE
+import SimulatedBackends as SIM
+
+# (analysis mode, center capture, adaptive polling, response curves)
+CASES = [(mode, use_center, adaptive, None)
+         for mode in LE.ANALYSIS_MODES for use_center in (True, False) for adaptive in (False, True)]
+# Response curves add a table lookup over the tiles; it must allocate nothing either.
+CASES += [('balanced', use_center, False, {'default': {'gamma': 2.2}}) for use_center in (True, False)]
+# numpy's uint32 iteration buffer plus 4 KiB of small objects.
+MAX_TRANSIENT = np.getbufsize() * 4 + 4096
+
+
+def run_case(mode, use_center, adaptive, args, curves=None):
+    """
+    Returns (bytes retained per tick over the second half of the measured
+    ticks, largest per-tick peak above the baseline). The first half fills
+    CPython's freelists, whose blocks tracemalloc counts as live. A leak of
+    even one object per tick retains 16 bytes or more per tick.
+    """
+    display = SIM.SimulatedDisplay(1)
+    controller = BNC.BrightnessController(
+        min_brightness=10, max_brightness=90, threshold=8, analysis_mode=mode, refresh_interval=0,
+        capture_backend=SIM.SimulatedCapture([SIM.StaticFrameSource(args.resolution, level=120)]),
+        brightness_backend=display)
+    controller.actuator.fade_interval = 0
+    if curves:
+        # Without polling off, the update would start the topology watcher, whose allocations tracemalloc also sees.
+        controller.update_user_config({'response_curves': curves, 'topology_poll_interval': 0})
+    scheduler = AS.AdaptiveScheduler() if adaptive else None
+    monitor = controller.capture.monitors()[1]
+    try:
+        for _ in range(args.warmup):
+            controller.process_monitor(monitor, 0, use_center, scheduler=scheduler)
+            controller.actuator.wait_idle()
+        tracemalloc.start()
+        try:
+            start = worst = 0
+            for i in range(args.ticks):
+                if i == args.ticks // 2:
+                    start = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                controller.process_monitor(monitor, 0, use_center, scheduler=scheduler)
+                worst = max(worst, tracemalloc.get_traced_memory()[1] - base)
+            retained = (tracemalloc.get_traced_memory()[0] - start) / (args.ticks - args.ticks // 2)
+        finally:
+            tracemalloc.stop()
+    finally:
+        controller.close()
+    return retained, worst
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ticks", type=int, default=400, help="Measured ticks per case")
+    parser.add_argument("--warmup", type=int, default=300,
+                        help="Unmeasured ticks per case (takes counters past CPython's small-int cache)")
+    parser.add_argument("--resolution", default="4K", help="See SimulatedBackends.RESOLUTIONS")
+    parser.add_argument("--max-transient", type=int, default=MAX_TRANSIENT,
+                        help="Largest bytes a tick may hold at once (default: numpy's uint32 iteration buffer + 4 KiB)")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'mode':<10}{'region':<8}{'adaptive':<10}{'curve':<7}{'retained B/tick':>17}{'peak B/tick':>13}")
+    for mode, use_center, adaptive, curves in CASES:
+        retained, worst = run_case(mode, use_center, adaptive, args, curves)
+        ok = retained < 1 and worst <= args.max_transient
+        failed = failed or not ok
+        print(f"{mode:<10}{'center' if use_center else 'full':<8}{'on' if adaptive else 'off':<10}"
+              f"{'on' if curves else 'off':<7}{retained:>17.2f}{worst:>13}  {'ok' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+brightness_ctl.py
+
+Client for the control API of a running BrightnessApp or brightness_tool
+(enable it with api_socket or api_port). Commands joined with '+' are sent
+as one batch in one round trip and applied atomically: if any of them is
+invalid, none is applied.
+
+Usage:
+    python brightness_ctl.py [--socket PATH | --port N | --config CONFIG_PATH --user-config USER_CONFIG_PATH]
+        COMMAND [+ COMMAND ...]
+
+Commands:
+    set VALUE [MONITOR ...]      brightness 0-100 for the listed (default: configured) monitors
+    set MONITOR=VALUE ...        a different brightness per monitor
+    pause | resume               automatic adjustment
+    config KEY=VALUE ...         change settings (values are YAML scalars)
+    state                        monitors, brightness, pause flag and config
+    batch [FILE]                 send a JSON list of commands from FILE or stdin
+
+Examples:
+    python brightness_ctl.py --socket /tmp/autobright.sock pause + set 30 0 1
+    python brightness_ctl.py --port 8766 config threshold=5 min_brightness=20 + resume
+"""
+
+import argparse
+import json
+import sys
+import ConfigLoader as CFL
+import ControlAPI as CAPI
+
+
+def parse_command(words):
+    """Turns one command's words into a control API command object."""
+    verb, args = words[0], words[1:]
+    if verb == 'set':
+        if args and all('=' in arg for arg in args):
+            return {'cmd': 'set_brightness',
+                    'values': {mid: int(value) for mid, _, value in (arg.partition('=') for arg in args)}}
+        if not args or any('=' in arg for arg in args):
+            raise ValueError("usage: set VALUE [MONITOR ...] | set MONITOR=VALUE ...")
+        command = {'cmd': 'set_brightness', 'value': int(args[0])}
+        if args[1:]:
+            command['monitors'] = [int(mid) for mid in args[1:]]
+        return command
+    if verb in ('pause', 'resume', 'state'):
+        if args:
+            raise ValueError(f"{verb} takes no arguments")
+        return {'cmd': verb}
+    if verb == 'config':
+        if not args or not all('=' in arg for arg in args):
+            raise ValueError("usage: config KEY=VALUE ...")
+        pairs = (arg.partition('=') for arg in args)
+        return {'cmd': 'config', 'values': {key.strip(): CFL.yaml.safe_load(value) for key, _, value in pairs}}
+    raise ValueError(f"unknown command {verb!r}")
+
+
+def parse_commands(words):
+    """Splits the command line on '+' into a batch."""
+    commands, current = [], []
+    for word in words + ['+']:
+        if word != '+':
+            current.append(word)
+        elif current:
+            if current[0] == 'batch':
+                path = current[1] if len(current) > 1 else '-'
+                with (sys.stdin if path == '-' else open(path)) as f:
+                    batch = json.load(f)
+                commands.extend(batch if isinstance(batch, list) else [batch])
+            else:
+                commands.append(parse_command(current))
+            current = []
+    return commands
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", help="Unix socket of the control API (default: api_socket from config)")
+    parser.add_argument("--port", type=int, help="Loopback port of the control API (default: api_port from config)")
+    parser.add_argument("--config", help="Path to default config file")
+    parser.add_argument("--user-config", help="Path to user config file")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Seconds to wait for the reply")
+    parser.add_argument("words", nargs=argparse.REMAINDER, help="Commands, joined with '+'")
+    args = parser.parse_args()
+
+    if not args.words:
+        parser.error("no command given")
+    try:
+        commands = parse_commands(args.words)
+    except (ValueError, OSError) as e:
+        sys.exit(f"Invalid command: {e}")
+
+    path, port = args.socket, args.port
+    if not path and not port:
+        config = CFL.ConfigLoader(args.config, args.user_config)
+        path, port = config.get('api_socket', ''), config.get('api_port', 0)
+    if not path and not port:
+        sys.exit("No control API address: pass --socket/--port or set api_socket/api_port in the config.")
+
+    try:
+        with CAPI.ControlClient(path or '', port or 0, timeout=args.timeout) as client:
+            reply = client.request(commands)
+    except OSError as e:
+        sys.exit(f"Cannot reach the control API at {path or port}: {e}")
+    if not reply.get('ok'):
+        sys.exit(f"Rejected: {reply.get('error')}")
+    for result in reply['results']:
+        print(json.dumps(result, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
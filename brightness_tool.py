@@ -1,154 +1,229 @@
-import mss
-import numpy as np
-import screen_brightness_control as sbc
-import argparse
-import yaml
-import time
-import sys
+"""
+brightness_tool.py
+
+Headless adaptive brightness daemon for servers and kiosk machines.
 
-class ConfigLoader:
-    def __init__(self, default_config_path=None, user_config_path=None):
-        self.default_config_path = default_config_path
-        self.user_config_path = user_config_path
-        self.config = self.load_and_merge_configs()
+Runs the same BrightnessController pipeline as BrightnessApp on an asyncio
+loop: every monitor is a concurrent task whose capture and analysis run in a
+thread pool, while hardware writes go through the controller's actuator.
+Never imports tkinter. SIGINT/SIGTERM stop all tasks and the background
+workers cleanly. Changes to the config files are picked up while running
+(see config_watch_interval). When memory_budget_mb is set and the daemon
+stays over it after dropping its caches, it exits with status 3, so a
+service manager (e.g. systemd Restart=on-failure) can restart it.
+Scripts can drive it through the control API (api_socket /
+api_port, see brightness_ctl.py).
 
-    def load_yaml(self, filename):
-        """Load YAML from a file gracefully, returning empty dict if file not found or empty."""
+Usage:
+    python brightness_tool.py [--config CONFIG_PATH] [--user-config USER_CONFIG_PATH] [--simulate N]
+
+--simulate N swaps mss and screen_brightness_control for N simulated
+monitors showing video-like content, for trying the daemon without displays.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import signal
+import sys
+import AdaptiveScheduler as ASCH
+import BrightnessController as BNC
+import ConfigLoader as CFL
+import ConfigSnapshot as CS
+import ControlAPI as CAPI
+import Metrics as MX
+
+EXIT_OVER_BUDGET = 3
+
+
+def log_summary(monitor_id, summary):
+    print(f"Monitor {monitor_id} - Screen background: {summary['Screen_background']:.2f} "
+          f"(Scaled: {summary['scaled']}), current: {summary['current_brightness']}, "
+          f"desired: {summary['desired_brightness']}")
+
+
+async def sleep_or_stop(stop_event, seconds):
+    """Sleeps for `seconds`, returning early when the daemon is stopping."""
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def monitor_task(controller, monitor, monitor_id, publisher, scheduler, executor, stop_event):
+    """Capture/analyse loop for one monitor."""
+    loop = asyncio.get_running_loop()
+    version = None
+    connected = True
+    while not stop_event.is_set():
+        config = publisher.current
+        interval = config.get('interval', 1)
         try:
-            with open(filename, 'r') as f:
-                content = yaml.safe_load(f)
-                return content if content is not None else {}
-        except FileNotFoundError:
-            return {}
-
-    def load_and_merge_configs(self):
-        """Merge user config over default config with fallback for missing keys."""
-        default_config = self.load_yaml(self.default_config_path)
-        user_config = self.load_yaml(self.user_config_path)
-        # Merge: user values override default values
-        merged_config = {**default_config, **user_config}
-        return merged_config
-
-    def get(self, key, default=None):
-        """Safe getter for configuration values."""
-        return self.config.get(key, default)
-
-
-class BrightnessController:
-    def __init__(self, min_brightness=0, max_brightness=100, threshold=10):
-        self.threshold = threshold
-        self.min_brightness = min_brightness
-        self.max_brightness = max_brightness
-        self.monitors = sbc.list_monitors()
-
-    def getMonitor(self, monitor_id):
-        """Fetches the monitor object by ID."""
-        if monitor_id < len(self.monitors):
-            return self.monitors[monitor_id]
-        print(f"Monitor {monitor_id} not found.")
-        return None
-
-    def default_brightness(self):
-        """Returns the default brightness value."""
-        return (self.min_brightness + self.max_brightness) // 2
-    
-    def scale_brightness(self, value, min_value=0, max_value=255):
-        """Scale the value from 0-255 to min_brightness-max_brightness range."""
-        scaled = (value - min_value) / (max_value - min_value)
-        return int(scaled * (self.max_brightness - self.min_brightness) + self.min_brightness)
-
-    def get_current_brightness(self, monitor_id):
-        """Fetches the current brightness setting."""
+            # Follows the display across hot-plugs; left out while it is disconnected.
+            version, regions = controller.begin_tick(config, [scheduler] if scheduler else [], version,
+                                                     {monitor_id: monitor})
+            if regions is None:
+                await sleep_or_stop(stop_event, interval)
+                continue
+            if monitor_id not in regions:
+                if connected:
+                    print(f"Monitor {monitor_id}: disconnected")
+                connected = False
+                await sleep_or_stop(stop_event, interval)
+                continue
+            connected = True
+            summary = await loop.run_in_executor(executor, controller.process_monitor, regions[monitor_id],
+                                                 monitor_id, config.get('use_center', True), None, scheduler)
+            log_summary(monitor_id, summary)
+        except Exception as e:
+            controller.metrics.increment('errors', monitor_id)
+            print(f"Monitor {monitor_id}: Error: {e}")
+        await sleep_or_stop(stop_event, scheduler.interval if scheduler else interval)
+
+
+async def multiplex_task(controller, monitors, publisher, schedulers, executor, stop_event):
+    """Capture/analyse loop driving all monitors from one grab per tick."""
+    loop = asyncio.get_running_loop()
+    version = None
+    connected = region = None
+    while not stop_event.is_set():
+        config = publisher.current
+        interval = config.get('interval', 1)
         try:
-            return sbc.get_brightness()[monitor_id]
-        except ValueError:
-            print(f"Monitor {monitor_id} not found or brightness control not supported.")
-            return self.default_brightness()
-        
-    def adjust_brightness_(self, value, monitor_id=0, attemptCount=0):
-        """Adjusts system brightness with fading."""
+            version, regions = controller.begin_tick(config, schedulers.values(), version, monitors)
+            if regions is None:
+                await sleep_or_stop(stop_event, interval)
+                continue
+            if regions != connected:
+                # Hot-plug: recompute the capture box from the monitors still connected.
+                connected = regions
+                region = controller.capture.bounding_region(list(connected.values())) if connected else None
+                missing = sorted(monitors.keys() - connected.keys())
+                if missing:
+                    print(f"Monitors {missing} disconnected")
+            if not connected:
+                await sleep_or_stop(stop_event, interval)
+                continue
+            frame = await loop.run_in_executor(executor, controller.grab_region, region)
+            use_center = config.get('use_center', True)
+            views = {
+                monitor_id: controller.capture.split(frame, region, monitor, use_center)
+                for monitor_id, monitor in connected.items()
+            }
+            summaries = await loop.run_in_executor(executor, controller.process_frames, views, schedulers)
+            for monitor_id, summary in summaries.items():
+                log_summary(monitor_id, summary)
+        except Exception as e:
+            controller.metrics.increment('errors', 'all')
+            print(f"Error: {e}")
+        await sleep_or_stop(stop_event, min((s.interval for s in schedulers.values()), default=interval))
+
+
+def install_signal_handlers(loop, stop_event):
+    for sig in (signal.SIGINT, signal.SIGTERM):
         try:
-            sbc.fade_brightness(value, interval=0.01, increment=1, display=self.getMonitor(monitor_id))
-            attemptCount += 1
-        except ValueError:
-            if(attemptCount < 3):
-                print(f"Failed to set brightness to {value}. Retrying...")
-                self.adjust_brightness_(value, monitor_id, attemptCount)
-            else:
-                print(f"Failed to set brightness to {value}.")
-                sys.exit(1)
-
-    def adjust_brightness_with_hysterisis(self, current, target, threshold = 10):
-        """Adjusts brightness with hysteresis to avoid flickering."""
-        if(abs(current - target) > threshold):
-            self.adjust_brightness_(target)
-
-    def get_avg_brightness(self, img):
-        """Calculates the mean brightness across the screenshot."""
-        gray_img = np.mean(img, axis=2)  # Simple grayscale approximation
-        return np.mean(gray_img)
-
-    def get_center_brightness(self, img):
-        """Calculates mean brightness in the center region of the screenshot."""
-        h, w = img.shape[:2]
-        center = img[h//4:3*h//4, w//4:3*w//4, :3]
-        gray_center = np.mean(center, axis=2)
-        return np.mean(gray_center)
-
-    def process_monitor(self, monitor, monitor_id, use_center=False):
-        """Handles the workflow for a single monitor."""
-        screenshot = np.array(mss.mss().grab(monitor))
-        if use_center:
-            Screen_background = self.get_center_brightness(screenshot)
-        else:
-            Screen_background = self.get_avg_brightness(screenshot)
-        scaled = self.scale_brightness(Screen_background)
-        current_brightness = self.get_current_brightness(monitor_id)
-        desired_brightness = self.max_brightness - scaled  # Inversion logic
-        self.adjust_brightness_with_hysterisis(current_brightness, desired_brightness, self.threshold)
-        return {
-            "Screen_background": Screen_background,
-            "scaled": scaled,
-            "current_brightness": current_brightness,
-            "desired_brightness": desired_brightness
-        }
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows event loops have no add_signal_handler
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop_event.set))
+
+
+def select_monitors(controller, monitor_ids):
+    """Maps config monitor indices to capture monitor dicts, skipping invalid ones."""
+    capture_monitors = controller.capture.monitors()
+    available = len(capture_monitors) - 1  # mss uses 1-based indexing
+    selected = {mid: capture_monitors[mid + 1] for mid in monitor_ids if 0 <= mid < available}
+    invalid = [mid for mid in monitor_ids if mid not in selected]
+    if invalid:
+        print(f"Ignoring invalid monitor indices {invalid}; available monitors: 0 to {available-1}")
+    return selected
+
+
+async def run(controller, config_loader):
+    """Runs until stopped; returns the exit status."""
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+    install_signal_handlers(loop, stop_event)
+    over_budget = []
+
+    def on_over_budget(rss):
+        # Called on the guard's thread once dropping caches did not help.
+        print("Stopping: memory use stays over memory_budget_mb.")
+        over_budget.append(rss)
+        loop.call_soon_threadsafe(stop_event.set)
+
+    controller.memory.on_exceeded = on_over_budget
+
+    publisher = CS.ConfigPublisher(config_loader.config)
+    controller.update_user_config(publisher.current)
+    monitors = select_monitors(controller, controller.monitor_list)
+    if not monitors:
+        print("No valid monitors selected, exiting.")
+        controller.close()
+        return 0
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(monitors) + 1,
+                                                     thread_name_prefix='brightness')
+    schedulers = {}
+    for mid in monitors:
+        scheduler = ASCH.AdaptiveScheduler.from_config(config_loader)
+        if scheduler:
+            schedulers[mid] = scheduler
+    if config_loader.get('capture_mode', 'threaded') == 'multiplexed':
+        tasks = [multiplex_task(controller, monitors, publisher, schedulers, executor, stop_event)]
+    else:
+        tasks = [
+            monitor_task(controller, monitor, mid, publisher, schedulers.get(mid), executor, stop_event)
+            for mid, monitor in monitors.items()
+        ]
+    exporters = MX.start_exporters(controller.metrics, config_loader)
+    control = CAPI.start_server(controller, publisher, config_loader)
+    # Edits to the config files are published on the event loop to the running tasks, without restarting them.
+    watcher = CFL.start_watcher(config_loader, lambda changed: loop.call_soon_threadsafe(publisher.publish, changed))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        if watcher:
+            watcher.stop()
+        if control:
+            control.stop()
+        for exporter in exporters:
+            exporter.stop()
+        executor.shutdown(wait=True)
+        controller.close()
+        print("Exiting brightness adjustment loop.")
+    return EXIT_OVER_BUDGET if over_budget else 0
+
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", help="Path to default config file")
     parser.add_argument("--user-config", help="Path to user config file")
+    parser.add_argument("--simulate", type=int, metavar="N", help="Use N simulated monitors instead of real hardware")
     args = parser.parse_args()
 
-    print("Default config file:", args.config)
-    print("User config file:", args.user_config)
+    config_loader = CFL.ConfigLoader(args.config, args.user_config)
+    if config_loader.errors:
+        sys.exit(f"Invalid settings: {'; '.join(config_loader.errors)}")
 
-    config_loader = ConfigLoader(args.config, args.user_config)
+    capture_backend = brightness_backend = None
+    if args.simulate:
+        import SimulatedBackends as SIM
+        capture_backend = SIM.SimulatedCapture([SIM.FlickerFrameSource() for _ in range(args.simulate)])
+        brightness_backend = SIM.SimulatedDisplay(args.simulate)
 
-    controller = BrightnessController(
+    controller = BNC.BrightnessController(
         min_brightness=config_loader.get('min_brightness', 0),
         max_brightness=config_loader.get('max_brightness', 100),
-        threshold=config_loader.get('threshold', 10)
+        threshold=config_loader.get('threshold', 10),
+        analysis_mode=config_loader.get('analysis_mode', 'balanced'),
+        refresh_interval=config_loader.get('brightness_refresh_interval', 30),
+        capture_backend=capture_backend,
+        brightness_backend=brightness_backend,
+        topology_cache=config_loader.get('topology_cache_path', '')
     )
-
-    interval = config_loader.get('interval')
-    use_center = config_loader.get('use_center')
-    monitors = config_loader.get('monitors')
-
-    with mss.mss() as sct:
-        try:
-            while True:
-            # for monitor_id in monitors:
-                for monitor_id, monitor in enumerate(sct.monitors[1:], start=1):
-                    summary = controller.process_monitor(monitor, monitor_id - 1, use_center)
-                    print(f"Monitor {monitor_id} - Screen background: {summary['Screen_background']:.2f} "
-                            f"(Scaled: {summary['scaled']})")
-                    print(f"Current Brightness: {summary['current_brightness']}")
-                    print(f"Brightness adjusted to: {summary['desired_brightness']}")
-
-                time.sleep(interval)
-        except KeyboardInterrupt:
-            print("Exiting brightness adjustment loop.")
+    sys.exit(asyncio.run(run(controller, config_loader)))
 
 
 if __name__ == "__main__":
-   main()
+    main()
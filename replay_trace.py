@@ -0,0 +1,105 @@
+"""
+replay_trace.py
+
+Replays a brightness trace recorded with `trace_path` through a
+BrightnessController backed by simulated displays, faster than real time,
+and compares the replayed decisions with the recorded ones.
+
+By default every tick is replayed against the recorded current brightness
+(open loop), so with the recorded settings the replay reproduces the recorded
+writes exactly; use --check to fail on any difference, e.g. in regression
+tests. With --set overrides (or --closed-loop) the simulated displays follow
+the replayed decisions instead, showing what other settings would have done
+on the same session. threshold only affects the threshold control law; for
+ema, rate and pid sessions vary control_deadband or set control_law=threshold.
+
+Usage:
+    python replay_trace.py TRACE [--config CONFIG_PATH] [--user-config USER_CONFIG_PATH]
+        [--set threshold=5 --set max_brightness=80 ...] [--closed-loop] [--speed X] [--check] [--show N]
+"""
+
+import argparse
+import sys
+import BrightnessController as BNC
+import ConfigLoader as CFL
+import SessionTrace as ST
+import SimulatedBackends as SIM
+
+
+def parse_overrides(pairs):
+    """Turns key=value strings into a config dict, parsing values as YAML scalars."""
+    overrides = {}
+    for pair in pairs:
+        key, _, value = pair.partition('=')
+        overrides[key.strip()] = CFL.yaml.safe_load(value)
+    return overrides
+
+
+def build_controller(config, monitor_count):
+    display = SIM.SimulatedDisplay(monitor_count)
+    controller = BNC.BrightnessController(
+        min_brightness=config.get('min_brightness', 0),
+        max_brightness=config.get('max_brightness', 100),
+        threshold=config.get('threshold', 10),
+        analysis_mode=config.get('analysis_mode', 'balanced'),
+        refresh_interval=0,
+        capture_backend=SIM.SimulatedCapture([]),
+        brightness_backend=display
+    )
+    # Never record the replay into a trace or the display cache, and keep analysis in-process.
+    controller.update_user_config({**config, 'trace_path': '', 'analysis_workers': 0,
+                                   'topology_cache_path': '', 'topology_poll_interval': 0})
+    return controller, display
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("trace", help="Trace file recorded with trace_path")
+    parser.add_argument("--config", help="Path to default config file")
+    parser.add_argument("--user-config", help="Path to user config file")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override a config value for the replay")
+    parser.add_argument("--closed-loop", action="store_true",
+                        help="Let displays follow the replayed writes (implied by --set)")
+    parser.add_argument("--speed", type=float, help="Pace the replay at X times real time (default: as fast as possible)")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if replayed writes differ from the recording")
+    parser.add_argument("--show", type=int, default=10, help="Print up to N ticks where the decisions differ")
+    args = parser.parse_args()
+
+    config = dict(CFL.ConfigLoader(args.config, args.user_config).config)
+    config.update(parse_overrides(args.set))
+    errors = CFL.validate_config(config)
+    if errors:
+        sys.exit(f"Invalid settings: {'; '.join(errors)}")
+
+    records = ST.load(args.trace)
+    if len(records) == 0:
+        sys.exit(f"{args.trace} has no records.")
+    monitor_count = int(records['monitor'].max()) + 1
+    controller, display = build_controller(config, monitor_count)
+    try:
+        desired, written = ST.replay(records, controller, display, closed_loop=args.closed_loop or bool(args.set),
+                                     speed=args.speed)
+    finally:
+        controller.close()
+
+    duration = float(records['time'][-1] - records['time'][0])
+    hours = max(duration, 1.0) / 3600
+    recorded_writes = int((records['written'] >= 0).sum())
+    replayed_writes = int((written >= 0).sum())
+    different = (written != records['written']).nonzero()[0]
+    print(f"{len(records)} ticks from {monitor_count} monitor(s) over {duration:.1f} s")
+    print(f"writes: recorded {recorded_writes} ({recorded_writes / hours:.0f}/h), "
+          f"replayed {replayed_writes} ({replayed_writes / hours:.0f}/h)")
+    print(f"ticks with different decisions: {len(different)}")
+    for i in different[:args.show]:
+        record = records[i]
+        print(f"  t=+{record['time'] - records['time'][0]:.1f}s monitor {record['monitor']}: "
+              f"luma {record['luma']:.1f}, desired {record['desired']} -> {desired[i]}, "
+              f"written {record['written']} -> {written[i]}")
+    if args.check and len(different):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 #!/bin/bash
 
-# Name of the Python file
+# Name of the Python file (--headless runs the daemon without the GUI)
 SCRIPT="BrightnessApp.py"
+if [ "$1" == "--headless" ]; then
+  SCRIPT="brightness_tool.py"
+fi
 # Other variables
 DEFAULT_CONFIG="default_config.yaml"
 USER_CONFIG="user_config.yaml"
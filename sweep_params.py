@@ -0,0 +1,219 @@
+"""
+sweep_params.py
+
+Offline parameter sweep for the brightness decision logic.
+
+Meters a directory of screenshots / exported video frames (or takes the luma
+of a recorded trace), then runs the controller's decisions - scale_brightness,
+the inversion against max_brightness and threshold hysteresis - for every
+combination of min_brightness x max_brightness x threshold at once. Time is
+stepped in Python, but each step updates all configurations with a handful
+of numpy operations, so thousands of combinations cost about as much as one.
+
+For each configuration it reports hardware writes per hour, tracking error
+(mean |desired - current|) and oscillations (direction reversals between
+consecutive writes) per hour.
+
+Usage:
+    python sweep_params.py FRAMES_DIR [--interval 5] [--metering average] [--analysis-mode balanced]
+    python sweep_params.py --trace session.trace [--monitor 0]
+        [--min-brightness 0:40:5] [--max-brightness 60:100:5] [--threshold 1:20]
+        [--sort writes|error|oscillation] [--max-error 10] [--top 20] [--csv results.csv] [--verify 3]
+
+Ranges are start:stop[:step] (stop included) or comma-separated values.
+Frames can be .npy arrays (BGR/BGRA) or images (PNG/JPEG/..., needs Pillow).
+"""
+
+import argparse
+import csv
+import os
+import sys
+import LazyImport as LI
+import LuminanceEngine as LE
+import TileMetering as TM
+
+np = LI.lazy_module('numpy')
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+
+
+def parse_range(spec):
+    """'a:b[:s]' (b included) or 'x,y,z' -> list of ints."""
+    if ':' in spec:
+        parts = [int(p) for p in spec.split(':')]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1
+        return list(range(start, stop + 1, step))
+    return [int(p) for p in spec.split(',') if p.strip()]
+
+
+def load_frame(path):
+    """Returns a BGR(A) uint8 array for a .npy file or an image."""
+    if path.endswith('.npy'):
+        return np.load(path)
+    try:
+        from PIL import Image
+    except ImportError:
+        sys.exit("Reading images needs Pillow (pip install pillow); .npy frames work without it.")
+    with Image.open(path) as image:
+        return np.asarray(image.convert('RGB'))[..., ::-1]  # RGB -> BGR view
+
+
+def frame_luma(directory, args):
+    """Meters every frame in `directory` (sorted by name) the way the controller does."""
+    names = sorted(n for n in os.listdir(directory) if n.lower().endswith(IMAGE_EXTENSIONS + ('.npy',)))
+    if not names:
+        sys.exit(f"No frames found in {directory}.")
+    analyser = TM.TileAnalyser(LE.LuminanceEngine(args.analysis_mode), metering=args.metering)
+    luma = np.empty(len(names), dtype=np.float64)
+    for i, name in enumerate(names):
+        frame = load_frame(os.path.join(directory, name))
+        if args.use_center:
+            frame = LE.LuminanceEngine.center_view(frame)
+        luma[i] = analyser.analyse(frame, key=0).mean
+    times = np.arange(len(names)) * args.interval
+    return luma, times
+
+
+def trace_luma(path, monitor):
+    import SessionTrace as ST
+    records = ST.load(path)
+    records = records[records['monitor'] == monitor]
+    if len(records) == 0:
+        sys.exit(f"{path} has no records for monitor {monitor}.")
+    return records['luma'].astype(np.float64), records['time'] - records['time'][0]
+
+
+def build_grid(min_values, max_values, thresholds):
+    """Flattened (min, max, threshold) arrays of every valid combination (min < max)."""
+    mins, maxs, thresholds = np.meshgrid(np.array(min_values), np.array(max_values), np.array(thresholds),
+                                         indexing='ij')
+    valid = mins < maxs
+    return mins[valid], maxs[valid], thresholds[valid]
+
+
+def simulate(luma, mins, maxs, thresholds, initial=50):
+    """
+    Runs the threshold decision logic over `luma` for every configuration.
+    Returns per-configuration (writes, mean tracking error, reversals).
+    """
+    count = len(mins)
+    current = np.full(count, initial, dtype=np.int64)
+    writes = np.zeros(count, dtype=np.int64)
+    reversals = np.zeros(count, dtype=np.int64)
+    last_direction = np.zeros(count, dtype=np.int64)
+    error = np.zeros(count, dtype=np.float64)
+    span = maxs - mins
+    # Scratch buffers reused every step
+    scaled = np.empty(count, dtype=np.float64)
+    desired = np.empty(count, dtype=np.int64)
+    diff = np.empty(count, dtype=np.int64)
+    for value in luma:
+        # scale_brightness: int((value / 255) * (max - min) + min), then desired = max - scaled
+        np.multiply(span, value / 255.0, out=scaled)
+        scaled += mins
+        np.trunc(scaled, out=scaled)
+        np.subtract(maxs, scaled, out=desired, casting='unsafe')
+        np.subtract(desired, current, out=diff)
+        # hysteresis: write when the target is more than `threshold` away
+        write = np.abs(diff) > thresholds
+        direction = np.sign(diff) * write
+        reversals += write & (last_direction != 0) & (direction != last_direction)
+        np.copyto(last_direction, direction, where=write)
+        np.copyto(current, desired, where=write)
+        writes += write
+        error += np.abs(desired - current)
+    return writes, error / max(len(luma), 1), reversals
+
+
+def verify(luma, times, mins, maxs, thresholds, indices, initial=50):
+    """Replays the configurations at `indices` through the real BrightnessController, yielding (index, writes)."""
+    import BrightnessController as BNC
+    import SessionTrace as ST
+    import SimulatedBackends as SIM
+    for i in indices:
+        display = SIM.SimulatedDisplay(1, brightness=initial)
+        controller = BNC.BrightnessController(
+            min_brightness=int(mins[i]), max_brightness=int(maxs[i]), threshold=int(thresholds[i]),
+            refresh_interval=0, capture_backend=SIM.SimulatedCapture([]), brightness_backend=display)
+        controller.update_user_config({'control_law': 'threshold'})
+        clock = ST.ReplayClock()
+        controller.control_law.clock = clock
+        controller.actuator.fade_interval = 0
+        controller.brightness_cache.set(0, initial)
+        writes = 0
+        try:
+            for t, value in zip(times, luma):
+                clock.now = float(t)
+                summary = controller.apply_metered({'mean': float(value), 'percentiles': {}}, 0)
+                controller.actuator.wait_idle()
+                writes += summary['written'] is not None
+        finally:
+            controller.close()
+        yield i, writes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("frames", nargs='?', help="Directory of screenshots or exported video frames")
+    parser.add_argument("--trace", help="Use the luma of a recorded trace instead of frames")
+    parser.add_argument("--monitor", type=int, default=0, help="Trace monitor to use")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between frames")
+    parser.add_argument("--analysis-mode", default="balanced", choices=list(LE.ANALYSIS_MODES))
+    parser.add_argument("--metering", default="average", choices=list(TM.METERING_MODES))
+    parser.add_argument("--use-center", action="store_true", help="Meter only the center quarter of each frame")
+    parser.add_argument("--min-brightness", default="0:40:5")
+    parser.add_argument("--max-brightness", default="60:100:5")
+    parser.add_argument("--threshold", default="1:20")
+    parser.add_argument("--initial", type=int, default=50, help="Display brightness before the first frame")
+    parser.add_argument("--sort", default="writes", choices=("writes", "error", "oscillation"))
+    parser.add_argument("--max-error", type=float, help="Only list configurations with at most this tracking error")
+    parser.add_argument("--top", type=int, default=20, help="Configurations to print")
+    parser.add_argument("--csv", help="Write every configuration's results to this CSV file")
+    parser.add_argument("--verify", type=int, default=3,
+                        help="Cross-check this many configurations against BrightnessController (0 disables)")
+    args = parser.parse_args()
+
+    if args.trace:
+        luma, times = trace_luma(args.trace, args.monitor)
+    elif args.frames:
+        luma, times = frame_luma(args.frames, args)
+    else:
+        parser.error("give a frames directory or --trace")
+
+    mins, maxs, thresholds = build_grid(parse_range(args.min_brightness), parse_range(args.max_brightness),
+                                        parse_range(args.threshold))
+    if len(mins) == 0:
+        sys.exit("No valid combinations (min_brightness must be below max_brightness).")
+    writes, error, reversals = simulate(luma, mins, maxs, thresholds, args.initial)
+    hours = max(float(times[-1] - times[0]), 1.0) / 3600
+
+    if args.verify:
+        indices = np.linspace(0, len(mins) - 1, min(args.verify, len(mins))).astype(int)
+        for i, controller_writes in verify(luma, times, mins, maxs, thresholds, indices, args.initial):
+            if controller_writes != writes[i]:
+                sys.exit(f"Vectorized sweep disagrees with BrightnessController for min={mins[i]} "
+                         f"max={maxs[i]} threshold={thresholds[i]}: {writes[i]} vs {controller_writes} writes.")
+
+    print(f"{len(luma)} frames over {times[-1] - times[0]:.0f} s, {len(mins)} configurations")
+    keys = {'writes': writes, 'error': error, 'oscillation': reversals}
+    order = np.lexsort((error, keys[args.sort]))
+    if args.max_error is not None:
+        order = order[error[order] <= args.max_error]
+    print(f"{'min':>5}{'max':>5}{'thresh':>8}{'writes/h':>10}{'error':>8}{'osc/h':>8}")
+    for i in order[:args.top]:
+        print(f"{mins[i]:>5}{maxs[i]:>5}{thresholds[i]:>8}{writes[i] / hours:>10.1f}{error[i]:>8.2f}"
+              f"{reversals[i] / hours:>8.1f}")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['min_brightness', 'max_brightness', 'threshold', 'writes', 'writes_per_hour',
+                             'tracking_error', 'oscillations_per_hour'])
+            for i in range(len(mins)):
+                writer.writerow([mins[i], maxs[i], thresholds[i], writes[i], writes[i] / hours,
+                                 round(float(error[i]), 4), reversals[i] / hours])
+
+
+if __name__ == "__main__":
+    main()
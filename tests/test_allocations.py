@@ -0,0 +1,21 @@
+"""Steady-state ticks allocate no buffers and retain no memory (see benchmarks/check_allocations.py)."""
+
+import os
+import sys
+import types
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+import check_allocations as CA
+
+# Fewer measured ticks than the script; the warmup must still pass CPython's small-int cache.
+ARGS = types.SimpleNamespace(ticks=100, warmup=300, resolution='4K')
+
+
+@pytest.mark.parametrize('mode, use_center, adaptive, curves', CA.CASES)
+def test_steady_state_tick_allocations(mode, use_center, adaptive, curves):
+    retained, worst = CA.run_case(mode, use_center, adaptive, ARGS, curves)
+    assert retained < 1, f"{retained:.2f} bytes retained per tick"
+    assert worst <= CA.MAX_TRANSIENT, f"a tick held {worst} bytes at once"